@@ -1,10 +1,17 @@
 # Flask Application Code
-from flask import Flask, render_template, jsonify
-from twitter_scraper import TwitterScraper
+from flask import Blueprint, Flask, Response, render_template, jsonify, request
+from job_queue import TrendJobQueue, JobQueueFull
+from metrics import get_metrics
+from scraper_runtime import get_runtime, READY
 from bson import json_util
 from dotenv import load_dotenv
 import json
 import os
+from datetime import datetime
+import sys
+import atexit
+import signal
+import time
 import logging
 from typing import Dict, Any
 
@@ -22,39 +29,123 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
+routes = Blueprint('routes', __name__)
 
-# Initialize scraper with error handling
-try:
-    scraper = TwitterScraper()
-except Exception as e:
-    logger.error(f"Failed to initialize TwitterScraper: {str(e)}")
-    scraper = None
+# The scraper (MongoDB, browsers, login) is built on a background thread the
+# first time it is needed, so importing this module stays cheap and fork-safe.
+runtime = get_runtime()
+STARTED_AT = time.time()
 
-@app.route('/')
+def get_scraper():
+    """Return the scraper once it is ready; None while it is starting or after a failed start."""
+    return runtime.get()
+
+def _scrape_trends(force: bool = False) -> Dict[str, Any]:
+    scraper = get_scraper()
+    if scraper is None:
+        return {"status": "error", "message": runtime.describe()}
+    return scraper.get_trends(force=force)
+
+def _force_refresh() -> bool:
+    return request.args.get('fresh', 'false').lower() in ('1', 'true')
+
+job_queue = TrendJobQueue(_scrape_trends)
+
+def _job_payload(job) -> Dict[str, Any]:
+    return json.loads(json_util.dumps(job.to_dict()))
+
+def shutdown():
+    """Release drivers and the MongoDB client when the process exits."""
+    job_queue.shutdown()
+    runtime.shutdown()
+
+# Runs on normal interpreter exit, including a graceful stop by the WSGI server
+# (gunicorn workers exit via sys.exit on SIGTERM). The server owns its signal
+# handlers, so none are installed at import.
+atexit.register(shutdown)
+
+@routes.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/status')
+@routes.route('/healthz')
+def liveness():
+    """Liveness: the process is up and serving, whatever the scraper is doing."""
+    return jsonify({"status": "alive", "uptime": round(time.time() - STARTED_AT, 1)})
+
+@routes.route('/readyz')
+def readiness():
+    """Readiness: 200 once the scraper is up with a logged-in driver, 503 with the reason otherwise.
+
+    An initialized scraper whose backend has no logged-in driver (or worker)
+    reports "degraded": requests would only get scrape errors.
+    """
+    runtime.ensure_started()
+    status = runtime.status()
+    scraper = runtime.scraper
+    status["twitter_connected"] = scraper.twitter_connected if scraper is not None else False
+    if status["state"] == READY and not status["twitter_connected"]:
+        status["state"] = "degraded"
+        status["error"] = scraper.connection_error
+    return jsonify(status), 200 if status["state"] == READY else 503
+
+@routes.route('/status')
 def check_status():
-    if scraper is None:
-        return jsonify({
-            "twitter_connected": False,
-            "proxy_connected": False,
-            "error": "Twitter scraper initialization failed"
-        })
-    return jsonify(scraper.get_connection_status())
+    """Serve the health monitor's snapshot. With If-None-Match and ?wait=N, long-poll for a change."""
+    client_etag = request.headers.get('If-None-Match')
+    try:
+        wait = min(float(request.args.get('wait', 0)), 60)
+    except ValueError:
+        wait = 0
+    if client_etag and wait > 0:
+        snapshot, etag = runtime.health_monitor.wait_for_change(client_etag, wait)
+    else:
+        snapshot, etag = runtime.health_monitor.get()
+    if client_etag == etag:
+        response = Response(status=304)
+    else:
+        response = jsonify(snapshot)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@routes.route('/status/stream')
+def stream_status():
+    """Server-sent events: one `status` event per health change, keepalive comments in between."""
+    def events():
+        etag = None
+        while True:
+            snapshot, new_etag = runtime.health_monitor.wait_for_change(etag, timeout=15)
+            if new_etag == etag:
+                yield ": keepalive\n\n"
+                continue
+            etag = new_etag
+            yield f"event: status\nid: {etag}\ndata: {json.dumps(_as_json(snapshot))}\n\n"
 
-@app.route('/retry_twitter')
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@routes.route('/metrics')
+def metrics():
+    scraper = runtime.scraper
+    if scraper is not None:
+        try:
+            scraper.export_metrics()
+        except Exception as e:
+            logger.error(f"Error collecting metrics: {str(e)}")
+    return Response(get_metrics().render(), mimetype='text/plain; version=0.0.4')
+
+@routes.route('/retry_twitter')
 def retry_twitter():
+    scraper = get_scraper()
     if scraper is None:
         return jsonify({
             "twitter_connected": False,
-            "error": "Twitter scraper not initialized"
+            "error": runtime.describe()
         })
 
     try:
-        scraper._init_connection()
+        scraper.ensure_connection()
+        runtime.health_monitor.refresh()
         return jsonify({
             "twitter_connected": scraper.twitter_connected,
             "error": scraper.connection_error
@@ -66,7 +157,7 @@ def retry_twitter():
             "error": str(e)
         })
 
-# @app.route('/retry_proxymesh')
+# @routes.route('/retry_proxymesh')
 # def retry_proxymesh():
 #     if scraper is None:
 #         return jsonify({
@@ -87,16 +178,17 @@ def retry_twitter():
 #             "error": str(e)
 #         })
 
-@app.route('/trends')
+@routes.route('/trends')
 def get_trends():
+    scraper = get_scraper()
     if scraper is None:
         return jsonify({
             "status": "error",
-            "message": "Twitter scraper not initialized"
-        }), 500
+            "message": runtime.describe()
+        }), 503
 
     try:
-        trends = scraper.get_trending_topics()
+        trends = scraper.get_trends(force=_force_refresh())
         if trends.get("status") == "error":
             return jsonify(trends), 500
 
@@ -111,22 +203,148 @@ def get_trends():
             "message": str(e)
         }), 500
 
-@app.teardown_appcontext
-def cleanup(exception=None):
-    if scraper and scraper.driver:
-        try:
-            scraper.driver.quit()
-        except Exception as e:
-            logger.error(f"Error cleaning up driver: {str(e)}")
+@routes.route('/trends/jobs', methods=['POST'])
+def create_trend_job():
+    try:
+        job = job_queue.submit(force=_force_refresh())
+    except JobQueueFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 429
+    return jsonify(_job_payload(job)), 202
+
+@routes.route('/trends/jobs/<job_id>')
+def get_trend_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(_job_payload(job))
+
+@routes.route('/trends/jobs/<job_id>/stream')
+def stream_trend_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+
+    def events():
+        last_status = None
+        while True:
+            status = job_queue.wait(job, last_status, timeout=15)
+            if status == last_status:
+                yield ": keepalive\n\n"
+                continue
+            last_status = status
+            yield f"event: {status}\ndata: {json.dumps(_job_payload(job))}\n\n"
+            if job.done:
+                break
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def _rollups_or_error():
+    scraper = get_scraper()
+    if scraper is None or scraper.rollups is None:
+        return None, (jsonify({"status": "error", "message": "Trend history is unavailable"}), 503)
+    return scraper.rollups, None
+
+def _as_json(data):
+    return json.loads(json_util.dumps(data))
+
+@routes.route('/trends/history')
+def trend_history():
+    from trend_rollups import parse_window
+    rollups, error = _rollups_or_error()
+    if error:
+        return error
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        window = request.args.get('window')
+        since = datetime.now() - parse_window(window) if window else None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "data": _as_json(rollups.history(limit=limit, since=since))})
+
+@routes.route('/trends/top')
+def top_trends():
+    from trend_rollups import parse_window
+    rollups, error = _rollups_or_error()
+    if error:
+        return error
+    try:
+        window = parse_window(request.args.get('window', '24h'))
+        limit = min(int(request.args.get('limit', 20)), 500)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "data": _as_json(rollups.top(window, limit=limit))})
+
+@routes.route('/trends/<path:name>/timeline')
+def trend_timeline(name):
+    from trend_rollups import parse_window
+    rollups, error = _rollups_or_error()
+    if error:
+        return error
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ('hour', 'day'):
+        return jsonify({"status": "error", "message": "granularity must be 'hour' or 'day'"}), 400
+    try:
+        window = parse_window(request.args.get('window', '7d'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "data": _as_json(rollups.timeline(name, window, granularity))})
+
+@routes.route('/trends/state')
+def trend_state():
+    scraper = get_scraper()
+    if scraper is None or scraper.storage is None:
+        return jsonify({"status": "error", "message": "Trend history is unavailable"}), 503
+    try:
+        at = request.args.get('at')
+        when = datetime.fromisoformat(at) if at else datetime.now()
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    state = scraper.storage.state_at(when, request.args.get('account'), request.args.get('region'))
+    if state is None:
+        return jsonify({"status": "error", "message": "No trends stored before that time"}), 404
+    return jsonify({"status": "success", "data": _as_json(state)})
+
+@routes.route('/export')
+def export_trends():
+    scraper = get_scraper()
+    if scraper is None or scraper.db is None:
+        return jsonify({"status": "error", "message": "Trend history is unavailable"}), 503
+    from trend_export import TrendExporter, FORMATS, parse_datetime
+    fmt = request.args.get('format', 'jsonl')
+    source = request.args.get('source', 'points')
+    trends = [name for value in request.args.getlist('trend') for name in value.split(',') if name] or None
+    try:
+        since = parse_datetime(request.args.get('since'))
+        until = parse_datetime(request.args.get('until'))
+        chunks = TrendExporter(scraper.db).stream(fmt, source, since, until, trends)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"status": "error", "message": str(e)}), 501
+    mimetype, extension = FORMATS[fmt]
+    return Response(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=trends-{source}.{extension}',
+        'Cache-Control': 'no-cache',
+    })
+
+def create_app() -> Flask:
+    """Build the Flask app. The scraper starts on the first request, not here."""
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(routes)
+    flask_app.before_request(runtime.ensure_started)
+    return flask_app
+
+app = create_app()
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
 
+    # Running the dev server ourselves: turn SIGTERM into a normal exit so atexit runs.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Begin logging in while the server binds rather than on the first request.
+    runtime.ensure_started()
     try:
         app.run(host='0.0.0.0', port=port, debug=debug)
     except Exception as e:
         logger.error(f"Failed to start Flask app: {str(e)}")
-    finally:
-        if scraper and scraper.driver:
-            scraper.driver.quit()
@@ -0,0 +1,161 @@
+# benchmarks/fake_twitter.py
+import os
+import time
+import random
+import threading
+import logging
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# path -> (fixture file, content type, requires a logged-in session)
+ROUTES = {
+    '/i/flow/login': ('login.html', 'text/html; charset=utf-8', False),
+    '/home': ('home.html', 'text/html; charset=utf-8', True),
+    '/explore': ('explore.html', 'text/html; charset=utf-8', True),
+    '/i/api/2/guide.json': ('guide.json', 'application/json', True),
+}
+
+
+class FakeTwitterServer:
+    """Serves recorded login, home and explore pages plus guide.json on localhost.
+
+    Every response is delayed by `latency` seconds (plus up to `jitter`), and a
+    `failure_rate` fraction of requests get an HTTP 503. Pages behind the login
+    redirect to the login flow unless the request carries the cookies the fake
+    login page sets; guide.json answers 403 instead.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._fixtures: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        for name, _, _ in ROUTES.values():
+            with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+                self._fixtures[name] = f.read()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> 'FakeTwitterServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-twitter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "failures": self.failures}
+
+    def _respond(self, path: str, headers) -> Tuple[int, Dict[str, str], bytes]:
+        with self._lock:
+            self.requests += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if random.random() < self.failure_rate:
+            with self._lock:
+                self.failures += 1
+            return 503, {'Content-Type': 'text/plain'}, b'injected failure'
+
+        if path == '/robots.txt':
+            return 200, {'Content-Type': 'text/plain'}, b'User-agent: *\nDisallow:\n'
+        route = ROUTES.get(path) or (ROUTES['/explore'] if path.startswith('/explore/') else None)
+        if route is None:
+            return 404, {'Content-Type': 'text/plain'}, b'not found'
+
+        name, content_type, private = route
+        if private and not self._authenticated(path, headers):
+            if content_type == 'application/json':
+                return 403, {'Content-Type': 'application/json'}, b'{"errors":[{"code":353}]}'
+            return 302, {'Location': '/i/flow/login'}, b''
+        return 200, {'Content-Type': content_type}, self._fixtures[name]
+
+    @staticmethod
+    def _authenticated(path: str, headers) -> bool:
+        cookie = SimpleCookie()
+        cookie.load(headers.get('Cookie', ''))
+        if 'auth_token' not in cookie or 'ct0' not in cookie:
+            return False
+        if path.startswith('/i/api/'):
+            return headers.get('x-csrf-token') == cookie['ct0'].value
+        return True
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, headers, body = fake._respond(urlsplit(self.path).path, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve recorded Twitter pages locally.")
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeTwitterServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                               failure_rate=args.failure_rate).start()
+    print(f"Fake Twitter listening on http://{server.address[0]}:{server.address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
+
+
+def session_cookies(token: str) -> List[Dict[str, Any]]:
+    """Cookies the fake server accepts as a logged-in session."""
+    return [{"name": "auth_token", "value": token, "path": "/"},
+            {"name": "ct0", "value": f"{token}csrf", "path": "/"}]
+
+
+class CookieDriver:
+    """Just enough of a WebDriver for SessionStore.save to write a session with these cookies."""
+
+    def __init__(self, cookies: List[Dict[str, Any]]):
+        self.cookies = cookies
+
+    def get_cookies(self) -> List[Dict[str, Any]]:
+        return self.cookies
+
+    def execute_script(self, script, *args):
+        return {}
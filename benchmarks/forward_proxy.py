@@ -0,0 +1,172 @@
+# benchmarks/forward_proxy.py
+import time
+import random
+import select
+import socket
+import threading
+import logging
+import http.client
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-connection', 'proxy-authorization', 'te', 'trailer',
+              'transfer-encoding', 'upgrade'}
+
+
+class ForwardProxy:
+    """A local HTTP proxy standing in for the public proxy list.
+
+    Whatever host a request names, it is forwarded to `upstream` (the fake
+    Twitter server), so Chrome and httpx can be pointed at a made-up hostname
+    and still go through a real proxy hop. `latency` delays each request and
+    `failure_rate` drops that fraction of connections with a 502. `stats()`
+    also reports the most requests it ever had in flight at once.
+    """
+
+    def __init__(self, upstream: Tuple[str, int], host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, failure_rate: float = 0.0):
+        self.upstream = upstream
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def proxy(self) -> str:
+        """host:port, the format the proxy registry and drivers expect."""
+        return f"{self.address[0]}:{self.address[1]}"
+
+    def start(self) -> 'ForwardProxy':
+        threading.Thread(target=self._server.serve_forever, name="forward-proxy", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "failures": self.failures,
+                    "peak_in_flight": self.peak_in_flight}
+
+    @contextmanager
+    def _tracked(self):
+        """Count a request as in flight until its response (or tunnel) is done."""
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _admit(self) -> bool:
+        """Apply injected latency and decide whether this request fails."""
+        with self._lock:
+            self.requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            with self._lock:
+                self.failures += 1
+            return False
+        return True
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_CONNECT(self):
+                with proxy._tracked():
+                    self._connect()
+
+            def _forward(self):
+                with proxy._tracked():
+                    self._relay()
+
+            def _connect(self):
+                if not proxy._admit():
+                    self.send_error(502, "injected failure")
+                    return
+                try:
+                    upstream = socket.create_connection(proxy.upstream, timeout=10)
+                except OSError as e:
+                    self.send_error(502, str(e))
+                    return
+                self.send_response(200, 'Connection Established')
+                self.end_headers()
+                self._tunnel(self.connection, upstream)
+                self.close_connection = True
+
+            def _relay(self):
+                if not proxy._admit():
+                    self.send_error(502, "injected failure")
+                    return
+                target = urlsplit(self.path)
+                path = target.path or '/'
+                if target.query:
+                    path = f"{path}?{target.query}"
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else None
+                headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+
+                connection = http.client.HTTPConnection(*proxy.upstream, timeout=30)
+                try:
+                    connection.request(self.command, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    payload = response.read()
+                except OSError as e:
+                    self.send_error(502, str(e))
+                    return
+                finally:
+                    connection.close()
+
+                self.send_response(response.status, response.reason)
+                for name, value in response.getheaders():
+                    if name.lower() not in HOP_BY_HOP and name.lower() != 'content-length':
+                        self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _forward
+
+            @staticmethod
+            def _tunnel(client, upstream):
+                sockets = [client, upstream]
+                try:
+                    while True:
+                        readable, _, errored = select.select(sockets, [], sockets, 30)
+                        if errored or not readable:
+                            break
+                        for sock in readable:
+                            data = sock.recv(65536)
+                            if not data:
+                                return
+                            (upstream if sock is client else client).sendall(data)
+                except OSError:
+                    pass
+                finally:
+                    upstream.close()
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
@@ -0,0 +1,366 @@
+# benchmarks/run.py
+"""Offline scrape benchmarks against a local fake Twitter and forwarding proxy.
+
+    python -m benchmarks.run [--only extraction,http_backend] [--iterations 50] [--concurrency 4]
+                             [--latency 0.02] [--failure-rate 0] [--proxy-failure-rate 0] [--profiles full,lean]
+                             [--output results.json] [--baseline previous.json]
+
+Every run writes a JSON report (benchmarks/results/<timestamp>.json by default);
+pass an earlier report as --baseline to print the p50/p95/throughput changes.
+Browser benchmarks are reported as skipped when Chrome/chromedriver is missing.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fake_twitter import FakeTwitterServer, CookieDriver, session_cookies, FIXTURES_DIR
+from benchmarks.forward_proxy import ForwardProxy
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = ('extraction', 'http_backend', 'trends_endpoint', 'login', 'selenium_backend')
+WEB_BASE = 'http://twitter.bench'  # any hostname works: the proxy sends everything to the fake server
+ACCOUNT = 'bench'
+PASSWORD = 'bench-password'
+
+
+class SkipBenchmark(Exception):
+    """Raised when a benchmark cannot run in this environment."""
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[int(round(p * (len(ordered) - 1)))]
+
+
+def summarize(durations: List[float], errors: List[str], wall: float, concurrency: int) -> Dict[str, Any]:
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "iterations": len(durations) + len(errors),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "concurrency": concurrency,
+        "mean_ms": ms(sum(durations) / len(durations)) if durations else None,
+        "p50_ms": ms(percentile(durations, 0.5)),
+        "p95_ms": ms(percentile(durations, 0.95)),
+        "max_ms": ms(max(durations)) if durations else None,
+        "throughput_per_s": round(len(durations) / wall, 3) if wall > 0 else None,
+    }
+
+
+def measure(fn: Callable[[], Any], iterations: int, concurrency: int = 1) -> Dict[str, Any]:
+    """Call `fn` `iterations` times on `concurrency` threads and summarize the latencies."""
+    durations: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            fn()
+        except SkipBenchmark:
+            raise
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {str(e)[:200]}")
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            durations.append(elapsed)
+
+    wall_start = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(iterations):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(one, range(iterations)))
+    return summarize(durations, errors, time.perf_counter() - wall_start, concurrency)
+
+
+class BenchEnvironment:
+    """Starts the fake server and proxy and points the scraper's configuration at them."""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix='trend-bench-')
+        self.server = FakeTwitterServer(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+        self.proxy_server = ForwardProxy(self.server.address, latency=args.proxy_latency,
+                                         failure_rate=args.proxy_failure_rate)
+
+    def __enter__(self) -> 'BenchEnvironment':
+        self.server.start()
+        self.proxy_server.start()
+        os.environ.update({
+            'TWITTER_WEB_BASE': WEB_BASE,
+            'TWITTER_WEB_BEARER_TOKEN': 'bench-token',
+            'PROXY_LIST': self.proxy,
+            'PROXY_TEST_URL': f"{WEB_BASE}/robots.txt",
+            'PROXY_SCORES_PATH': os.path.join(self.workdir, 'proxy_scores.json'),
+            'SESSION_STORE_DIR': os.path.join(self.workdir, 'sessions'),
+            'MONGO_SPILL_PATH': os.path.join(self.workdir, 'pending_writes.jsonl'),
+            'HUMAN_JITTER_SCALE': str(self.args.jitter_scale),
+            'TWITTER_USERNAME': ACCOUNT,
+            'TWITTER_PASSWORD': PASSWORD,
+            'MONGODB_URI': self.args.mongodb_uri,
+        })
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.proxy_server.stop()
+        self.server.stop()
+
+    @property
+    def proxy(self) -> str:
+        return self.proxy_server.proxy
+
+    def seed_session(self) -> None:
+        from session_store import SessionStore
+        SessionStore().save(CookieDriver(session_cookies(f"{random.getrandbits(64):x}")), ACCOUNT, self.proxy)
+
+    def traffic(self) -> Dict[str, Any]:
+        return {"server": self.server.stats(), "proxy": self.proxy_server.stats()}
+
+
+def bench_extraction(env: BenchEnvironment, args) -> Dict[str, Any]:
+    from trend_extractor import TrendExtractor
+    from cdp_capture import CdpTrendCapture
+
+    with open(os.path.join(FIXTURES_DIR, 'explore.html'), 'r', encoding='utf-8') as f:
+        html = f.read()
+    with open(os.path.join(FIXTURES_DIR, 'guide.json'), 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    return {
+        "dom": measure(lambda: TrendExtractor.from_html(html), args.iterations),
+        "json": measure(lambda: CdpTrendCapture.parse_payload(payload), args.iterations),
+    }
+
+
+def bench_http_backend(env: BenchEnvironment, args) -> Dict[str, Any]:
+    from scraper_backend import HttpBackend
+
+    env.seed_session()
+    backend = HttpBackend(account=ACCOUNT)
+    try:
+        return {
+            "sequential": measure(backend.fetch_trends, args.iterations),
+            "concurrent": measure(backend.fetch_trends, args.iterations, args.concurrency),
+        }
+    finally:
+        backend.close()
+
+
+def bench_trends_endpoint(env: BenchEnvironment, args) -> Dict[str, Any]:
+    """GET /trends through the Flask app, with the cache (as users see it) and with ?fresh=1."""
+    os.environ['SCRAPER_BACKEND'] = args.trends_backend
+    if args.trends_backend == 'http':
+        env.seed_session()
+    import app as web
+
+    if not web.runtime.wait_ready(timeout=300):
+        raise SkipBenchmark(web.runtime.describe())
+    client = web.app.test_client()
+
+    def get(path):
+        def call():
+            response = client.get(path)
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return call
+
+    try:
+        return {
+            "fresh": measure(get('/trends?fresh=1'), args.iterations, args.concurrency),
+            "cached": measure(get('/trends'), args.iterations, args.concurrency),
+        }
+    finally:
+        web.shutdown()
+
+
+def bench_login(env: BenchEnvironment, args) -> Dict[str, Any]:
+    from driver_manager import DriverManager
+    from session_store import SessionStore
+    from twitter_login import TwitterLogin
+    from scrape_errors import LoginUnreachable
+
+    results = {}
+    for profile in args.profiles:
+        launch: List[float] = []
+        login: List[float] = []
+        errors: List[str] = []
+        wall_start = time.perf_counter()
+        for _ in range(args.browser_iterations):
+            start = time.perf_counter()
+            driver, proxy = DriverManager.setup_driver(env.proxy, profile)
+            if driver is None:
+                raise SkipBenchmark("Chrome/chromedriver is not available")
+            launch.append(time.perf_counter() - start)
+            try:
+                start = time.perf_counter()
+                # A fresh store every time, so each iteration runs the typed flow rather than a restore.
+                store = SessionStore(directory=tempfile.mkdtemp(dir=env.workdir))
+                try:
+                    if TwitterLogin.login(driver, proxy=proxy, session_store=store, username=ACCOUNT,
+                                          password=PASSWORD):
+                        login.append(time.perf_counter() - start)
+                    else:
+                        errors.append("login failed")
+                except LoginUnreachable as e:
+                    errors.append(str(e))
+            finally:
+                driver.quit()
+        wall = time.perf_counter() - wall_start
+        results[profile] = {
+            "driver_launch": summarize(launch, [], wall, 1),
+            "login": summarize(login, errors, wall, 1),
+        }
+    return results
+
+
+def bench_selenium_backend(env: BenchEnvironment, args) -> Dict[str, Any]:
+    from config import twitter_url
+    from driver_pool import DriverPool
+    from scraper_backend import SeleniumBackend, EXPLORE_PATH
+
+    url = twitter_url(EXPLORE_PATH)
+    results = {}
+    for profile in args.profiles:
+        pool = DriverPool(size=args.concurrency, proxy=env.proxy, profile=profile,
+                          username=ACCOUNT, password=PASSWORD)
+        try:
+            pool.start()
+            if pool.ready_count() == 0:
+                raise SkipBenchmark(pool.last_error or "no driver could be started")
+            backend = SeleniumBackend(pool)
+            fetch = lambda: backend.fetch_trends(url)
+            results[profile] = {
+                "sequential": measure(fetch, args.browser_iterations),
+                "concurrent": measure(fetch, args.browser_iterations, args.concurrency),
+                "resources": pool.resource_usage(),
+            }
+        finally:
+            pool.close()
+    return results
+
+
+RUNNERS = {
+    'extraction': bench_extraction,
+    'http_backend': bench_http_backend,
+    'trends_endpoint': bench_trends_endpoint,
+    'login': bench_login,
+    'selenium_backend': bench_selenium_backend,
+}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Lines describing how each measured series moved relative to the baseline."""
+    lines = []
+
+    def walk(old, new, path):
+        if not isinstance(old, dict) or not isinstance(new, dict):
+            return
+        if "p50_ms" in new and "p50_ms" in old:
+            changes = []
+            for key in ("p50_ms", "p95_ms", "throughput_per_s"):
+                if old.get(key) and new.get(key) is not None:
+                    changes.append(f"{key} {old[key]} -> {new[key]} ({(new[key] - old[key]) / old[key] * 100:+.1f}%)")
+            if changes:
+                lines.append(f"{'.'.join(path)}: " + ", ".join(changes))
+            return
+        for key in new:
+            walk(old.get(key), new[key], path + [key])
+
+    walk(baseline.get("results", {}), current.get("results", {}), [])
+    return lines
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline scrape benchmarks.")
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help="comma-separated benchmarks to run")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--browser-iterations', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02, help="fake server delay per request, seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random server delay, seconds")
+    parser.add_argument('--proxy-latency', type=float, default=0.0, help="proxy delay per request, seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of server requests failing with 503")
+    parser.add_argument('--proxy-failure-rate', type=float, default=0.0, help="fraction of proxied requests failing")
+    parser.add_argument('--jitter-scale', type=float, default=0.0, help="HUMAN_JITTER_SCALE for browser benchmarks")
+    parser.add_argument('--profiles', default='full,lean', help="driver profiles for browser benchmarks")
+    parser.add_argument('--trends-backend', default='http', help="SCRAPER_BACKEND behind /trends")
+    parser.add_argument('--mongodb-uri', default=os.getenv('BENCH_MONGODB_URI', 'mongodb://127.0.0.1:27017'))
+    parser.add_argument('--output', help="report path (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', help="earlier report to compare against")
+    args = parser.parse_args(argv)
+    args.profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+
+    selected = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = [name for name in selected if name not in RUNNERS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    report: Dict[str, Any] = {
+        "started_at": datetime.now().isoformat(timespec='seconds'),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'mongodb_uri')},
+        "results": {},
+    }
+
+    with BenchEnvironment(args) as env:
+        for name in selected:
+            print(f"Running {name}...", flush=True)
+            start = time.perf_counter()
+            try:
+                report["results"][name] = RUNNERS[name](env, args)
+            except SkipBenchmark as e:
+                report["results"][name] = {"skipped": str(e)}
+            except Exception as e:
+                logger.error(f"Benchmark {name} failed: {str(e)}")
+                report["results"][name] = {"failed": f"{type(e).__name__}: {str(e)}"}
+            report["results"][name]["elapsed_s"] = round(time.perf_counter() - start, 3)
+        report["traffic"] = env.traffic()
+
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results',
+                                         f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            for line in compare(json.load(f), report) or ["No comparable series in the baseline"]:
+                print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# cdp_capture.py
+import re
+import json
+import time
+import base64
+import logging
+from typing import Dict, Any, Iterable, List, Optional
+from trend_extractor import POST_COUNT_RE, TrendExtractor
+
+logger = logging.getLogger(__name__)
+
+# Explore/guide endpoints whose JSON carries the trend timeline.
+TREND_RESPONSE_PATTERNS = [
+    re.compile(r'/i/api/2/guide\.json'),
+    re.compile(r'/i/api/graphql/[^/]+/(ExplorePage|ExploreSidebar|GenericTimelineById)'),
+]
+
+
+class CdpTrendCapture:
+    """Reads trend JSON straight from Chrome's network traffic via performance logs and CDP."""
+
+    @staticmethod
+    def enable(driver) -> None:
+        """Turn on network events for a driver started with performance logging."""
+        driver.execute_cdp_cmd('Network.enable', {})
+
+    @staticmethod
+    def capture(driver, url: str = "https://twitter.com/explore", timeout: float = 20) -> List[Dict[str, Any]]:
+        """Navigate to `url` and return the trends parsed from the first matching API responses."""
+        driver.get_log('performance')  # discard events from earlier pages
+        driver.get(url)
+
+        deadline = time.monotonic() + timeout
+        pending: Dict[str, str] = {}
+        finished = set()
+        while time.monotonic() < deadline:
+            events = CdpTrendCapture.parse_performance_log(driver.get_log('performance'))
+            for request_id, response_url in CdpTrendCapture.matching_responses(events):
+                pending[request_id] = response_url
+            finished.update(CdpTrendCapture.finished_requests(events))
+
+            ready = [rid for rid in pending if rid in finished]
+            if ready:
+                bodies = [CdpTrendCapture.response_body(driver, rid) for rid in ready]
+                trends = CdpTrendCapture.trends_from_bodies(b for b in bodies if b)
+                if trends:
+                    return trends
+                for rid in ready:
+                    pending.pop(rid)
+            time.sleep(0.25)
+
+        logger.error("No trend API response captured before timeout")
+        return []
+
+    @staticmethod
+    def parse_performance_log(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Decode raw `driver.get_log('performance')` entries into CDP event dicts."""
+        events = []
+        for entry in entries:
+            try:
+                events.append(json.loads(entry["message"])["message"])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return events
+
+    @staticmethod
+    def matching_responses(events: Iterable[Dict[str, Any]]) -> List[tuple]:
+        matches = []
+        for event in events:
+            if event.get("method") != "Network.responseReceived":
+                continue
+            params = event.get("params", {})
+            response_url = params.get("response", {}).get("url", "")
+            if any(pattern.search(response_url) for pattern in TREND_RESPONSE_PATTERNS):
+                matches.append((params.get("requestId"), response_url))
+        return matches
+
+    @staticmethod
+    def finished_requests(events: Iterable[Dict[str, Any]]) -> List[str]:
+        return [
+            event["params"]["requestId"] for event in events
+            if event.get("method") == "Network.loadingFinished" and "params" in event
+        ]
+
+    @staticmethod
+    def response_body(driver, request_id: str) -> Optional[str]:
+        try:
+            result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception as e:
+            logger.error(f"Could not read response body for {request_id}: {str(e)}")
+            return None
+        body = result.get("body", "")
+        if result.get("base64Encoded"):
+            body = base64.b64decode(body).decode('utf-8', errors='replace')
+        return body
+
+    @staticmethod
+    def trends_from_bodies(bodies: Iterable[str]) -> List[Dict[str, Any]]:
+        trends = []
+        seen = set()
+        for body in bodies:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                continue
+            for trend in CdpTrendCapture.parse_payload(payload):
+                if trend["name"] not in seen:
+                    seen.add(trend["name"])
+                    trends.append(trend)
+        return trends
+
+    @staticmethod
+    def parse_payload(payload: Any) -> List[Dict[str, Any]]:
+        """Find trend objects in guide.json (REST) or explore GraphQL responses, in document order."""
+        trends = []
+        for node in CdpTrendCapture._walk(payload):
+            metadata = node.get("trend_metadata") or node.get("trendMetadata")
+            if not isinstance(node.get("name"), str) or not isinstance(metadata, dict):
+                continue
+            description = metadata.get("meta_description") or metadata.get("metaDescription")
+            post_match = POST_COUNT_RE.match(description or "")
+            grouped = node.get("grouped_trends") or node.get("groupedTrends") or []
+            rank = node.get("rank")
+            trends.append({
+                "name": node["name"],
+                "rank": int(rank) if str(rank or "").isdigit() else len(trends) + 1,
+                "category": metadata.get("domain_context") or metadata.get("domainContext"),
+                "post_count": TrendExtractor.parse_count(post_match.group(1), post_match.group(2)) if post_match else None,
+                "post_count_text": description,
+                "context": "Trending with " + ", ".join(g.get("name", "") for g in grouped) if grouped else None,
+            })
+        return trends
+
+    @staticmethod
+    def _walk(node: Any):
+        if isinstance(node, dict):
+            yield node
+            for value in node.values():
+                yield from CdpTrendCapture._walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                yield from CdpTrendCapture._walk(value)
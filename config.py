@@ -2,6 +2,8 @@ import os
 import logging
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from trend_storage import TrendStorage, SCRAPES_COLLECTION
+from trend_rollups import TrendRollups
 
 # Configure logging
 logging.basicConfig(
@@ -22,13 +24,22 @@ def validate_env_variables():
     if missing_vars:
         raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
 
+def twitter_url(path: str = '') -> str:
+    """Absolute URL on the Twitter web app; TWITTER_WEB_BASE can point it at a local stand-in."""
+    return os.getenv('TWITTER_WEB_BASE', 'https://x.com').rstrip('/') + path
+
 def init_mongodb():
     """Initialize MongoDB connection."""
     try:
         client = MongoClient(os.getenv('MONGODB_URI'), serverSelectionTimeoutMS=5000)
         client.server_info()
         db = client['twitter_trends']
-        collection = db['trending_topics']
+        collection = db[SCRAPES_COLLECTION]
+        try:
+            TrendStorage(db).ensure_schema()
+            TrendRollups(db).ensure_indexes()
+        except Exception as e:
+            logger.error(f"Failed to prepare trend storage schema: {str(e)}")
         logger.info("MongoDB connection successful")
         return client, db, collection
     except Exception as e:
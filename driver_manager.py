@@ -1,22 +1,71 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+import os
 import random
 import logging
-from proxy_fetcher import get_all_proxies
+from proxy_registry import get_proxy_registry
+from proxy_validator import get_proxy_validator
+from cdp_capture import CdpTrendCapture
+from metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
+DRIVER_PROFILES = ('full', 'lean')
+
+# Requests the lean profile never makes: images, media, fonts and third-party trackers.
+LEAN_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.mp4', '*.webm', '*.m3u8', '*.m4s', '*.mp3',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*pbs.twimg.com/media/*', '*video.twimg.com/*', '*abs.twimg.com/emoji/*',
+    '*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*', '*ads-twitter.com/*',
+]
+
+PAGE_LOAD_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+return nav ? (nav.loadEventEnd || nav.domContentLoadedEventEnd || null) : null;
+"""
+
 class DriverManager:
     @staticmethod
-    def setup_driver():
-        """Set up Chrome driver with proxy and anti-detection measures."""
+    def select_proxy(max_attempts=5):
+        """Pick the best-ranked proxy that accepts a TCP connection, preferring validated ones."""
+        registry = get_proxy_registry()
+        known_good = set(get_proxy_validator().get_known_good())
+        unvalidated = set(registry.proxies()) - known_good if known_good else set()
+        tried = set()
+        for _ in range(max_attempts):
+            proxy = registry.select(exclude=tried | unvalidated)
+            if proxy is None and unvalidated:
+                unvalidated = set()
+                proxy = registry.select(exclude=tried)
+            if proxy is None:
+                break
+            tried.add(proxy)
+            latency = registry.check_connect(proxy)
+            if latency is not None:
+                get_metrics().observe('proxy_connect', latency, proxy, 'selenium')
+                return proxy
+            get_metrics().count_failure('proxy_connect', 'proxy', proxy, 'selenium')
+        return None
+
+    @staticmethod
+    def setup_driver(proxy=None, profile=None):
+        """Set up Chrome driver with proxy and anti-detection measures.
+
+        `profile` is 'full' (headed, loads everything) or 'lean' (headless, no
+        images/media/fonts, eager page loads); it defaults to DRIVER_PROFILE.
+        """
+        driver = None
         try:
-            working_proxies = get_all_proxies()
-            if not working_proxies:
+            profile = (profile or os.getenv('DRIVER_PROFILE', 'full')).lower()
+            if profile not in DRIVER_PROFILES:
+                raise ValueError(f"Unknown driver profile: {profile}")
+            current_proxy = proxy or DriverManager.select_proxy()
+            if not current_proxy:
                 logger.error("No working proxies found")
                 return None, None
 
-            current_proxy = random.choice(working_proxies)
             chrome_options = Options()
 
             # Proxy configuration
@@ -27,7 +76,8 @@ class DriverManager:
             chrome_options.add_argument('--disable-infobars')
             chrome_options.add_argument('--disable-notifications')
             chrome_options.add_argument('--disable-popup-blocking')
-            chrome_options.add_argument('--start-maximized')
+            if profile == 'full':
+                chrome_options.add_argument('--start-maximized')
             chrome_options.add_argument('--no-sandbox')
             chrome_options.add_argument('--disable-dev-shm-usage')
             chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
@@ -47,13 +97,96 @@ class DriverManager:
             user_agent = random.choice(user_agents)
             chrome_options.add_argument(f'--user-agent={user_agent}')
 
-            driver = webdriver.Chrome(options=chrome_options)
+            # Network capture mode reads trend JSON from the performance log
+            capture_network = os.getenv('TREND_CAPTURE_MODE', 'dom').lower() == 'network'
+            if capture_network:
+                chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
 
-            # Additional anti-detection
-            driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": user_agent})
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            if profile == 'lean':
+                DriverManager._apply_lean_options(chrome_options)
+
+            with get_metrics().timer('driver_launch', current_proxy, 'selenium'):
+                driver = webdriver.Chrome(options=chrome_options)
+
+                # Additional anti-detection
+                driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": user_agent})
+                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+                if capture_network:
+                    CdpTrendCapture.enable(driver)
+                if profile == 'lean':
+                    driver.execute_cdp_cmd('Network.enable', {})
+                    driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": LEAN_BLOCKED_URLS})
 
             return driver, current_proxy
         except Exception as e:
             logger.error(f"Driver setup failed: {str(e)}")
-            return None, None
\ No newline at end of file
+            if driver is not None:
+                # Chrome started but a CDP call failed; do not leave the browser running.
+                try:
+                    driver.quit()
+                except Exception as quit_error:
+                    logger.error(f"Error quitting driver after failed setup: {str(quit_error)}")
+            return None, None
+
+    @staticmethod
+    def _apply_lean_options(chrome_options):
+        """Headless, image-free Chrome with a shared disk cache and few renderer processes."""
+        cache_dir = os.path.abspath(os.getenv('DRIVER_DISK_CACHE_DIR', '.chrome-cache'))
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument(f'--disk-cache-dir={cache_dir}')
+        chrome_options.add_argument(f"--renderer-process-limit={os.getenv('DRIVER_RENDERER_LIMIT', '2')}")
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
+        chrome_options.page_load_strategy = 'eager'
+
+    @staticmethod
+    def page_load_ms(driver):
+        """Load time of the current page from the Navigation Timing API, in milliseconds."""
+        try:
+            value = driver.execute_script(PAGE_LOAD_JS)
+            return float(value) if value else None
+        except Exception as e:
+            logger.error(f"Failed to read page load time: {str(e)}")
+            return None
+
+    @staticmethod
+    def browser_rss(driver):
+        """Resident memory of chromedriver and every Chrome process it started, in bytes (Linux only)."""
+        try:
+            root = driver.service.process.pid
+            children = {}
+            for entry in os.listdir('/proc'):
+                if not entry.isdigit():
+                    continue
+                try:
+                    with open(f'/proc/{entry}/stat', 'r') as f:
+                        ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, ValueError, IndexError):
+                    continue
+                children.setdefault(ppid, []).append(int(entry))
+        except (AttributeError, OSError):
+            return None
+
+        total = 0
+        stack = [root]
+        while stack:
+            pid = stack.pop()
+            total += DriverManager._process_rss(pid)
+            stack.extend(children.get(pid, []))
+        return total
+
+    @staticmethod
+    def _process_rss(pid):
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return 0
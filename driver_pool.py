@@ -0,0 +1,323 @@
+# driver_pool.py
+import os
+import time
+import threading
+import logging
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+from driver_manager import DriverManager
+from metrics import get_metrics
+from proxy_registry import get_proxy_registry
+from twitter_login import TwitterLogin
+from scrape_errors import LoginRejected, LoginUnreachable
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPoolExhausted(Exception):
+    """Raised when no driver could be leased within the acquire timeout."""
+
+
+class PooledDriver:
+    """A logged-in Chrome driver owned by a DriverPool."""
+
+    def __init__(self, driver, proxy: str, profile: str = 'full'):
+        self.driver = driver
+        self.proxy = proxy
+        self.profile = profile
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.page_loads = 0
+        self.page_load_ms_total = 0.0
+        self.retired = False
+
+    def record_page_load(self, ms: Optional[float]) -> None:
+        if ms is not None:
+            self.page_loads += 1
+            self.page_load_ms_total += ms
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.error(f"Error quitting pooled driver: {str(e)}")
+
+
+class DriverPool:
+    """Keeps a fixed number of authenticated browsers warm and leases them out one scrape at a time."""
+
+    def __init__(self, size: Optional[int] = None, acquire_timeout: Optional[float] = None,
+                 max_waiters: Optional[int] = None, max_uses: Optional[int] = None,
+                 max_age: Optional[float] = None, username: Optional[str] = None,
+                 password: Optional[str] = None, proxy: Optional[str] = None,
+                 profile: Optional[str] = None):
+        self.size = size or int(os.getenv('DRIVER_POOL_SIZE', 2))
+        self.acquire_timeout = acquire_timeout or float(os.getenv('DRIVER_ACQUIRE_TIMEOUT', 60))
+        self.max_waiters = max_waiters or int(os.getenv('DRIVER_POOL_MAX_WAITERS', 10))
+        self.max_uses = max_uses or int(os.getenv('DRIVER_MAX_USES', 50))
+        self.max_age = max_age or float(os.getenv('DRIVER_MAX_AGE', 3600))
+        self.username = username
+        self.password = password
+        self.proxy = proxy  # pin every driver to this proxy instead of the registry's pick
+        self.profile = (profile or os.getenv('DRIVER_PROFILE', 'full')).lower()
+        self.last_error = None
+
+        self._cond = threading.Condition()
+        self._idle: List[PooledDriver] = []
+        self._leased = 0
+        self._total = 0  # idle + leased + being created
+        self._waiters = 0
+        self._closed = False
+
+    def start(self, wait: bool = True) -> None:
+        """Launch and log in browsers until the pool is full."""
+        threads = []
+        for _ in range(self.size):
+            if not self._reserve_slot():
+                break
+            thread = threading.Thread(target=self._fill_slot, daemon=True)
+            thread.start()
+            threads.append(thread)
+        if wait:
+            for thread in threads:
+                thread.join()
+        logger.info(f"Driver pool started with {len(self._idle)}/{self.size} drivers ready")
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledDriver:
+        """Lease a healthy driver, warming one in the background if the pool has spare capacity.
+
+        The caller only waits for the warm-up (Chrome launch and login) up to its
+        timeout; a driver that finishes later joins the idle list for the next
+        caller instead of being lost with the request.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._cond:
+                if self._waiters >= self.max_waiters:
+                    raise DriverPoolExhausted(f"Too many callers waiting for a driver ({self._waiters})")
+                self._waiters += 1
+                try:
+                    pooled = self._wait_for_driver(deadline)
+                finally:
+                    self._waiters -= 1
+
+            if not self._is_reusable(pooled):
+                self._discard(pooled, leased=True, replenish=True)
+                continue
+
+            pooled.uses += 1
+            pooled.last_used = time.time()
+            return pooled
+
+    def release(self, pooled: PooledDriver, healthy: bool = True) -> None:
+        """Return a leased driver; unhealthy or worn-out drivers are recycled."""
+        with self._cond:
+            keep = healthy and not self._closed and not pooled.retired and pooled.uses < self.max_uses
+            if keep:
+                self._leased -= 1
+                self._idle.append(pooled)
+                self._cond.notify()
+                return
+        self._discard(pooled, leased=True, replenish=True)
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None):
+        """Context manager that leases a driver for the duration of a scrape."""
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled
+        except Exception:
+            self.release(pooled, healthy=self._is_reusable(pooled))
+            raise
+        else:
+            self.release(pooled)
+
+    def retire(self, pooled: PooledDriver) -> None:
+        """Recycle a driver that just failed a scrape: now if it is idle, otherwise when its lease ends."""
+        with self._cond:
+            pooled.retired = True
+            if pooled not in self._idle:
+                return
+            self._idle.remove(pooled)
+        logger.info(f"Retiring driver on {pooled.proxy} after a failed scrape")
+        self._discard(pooled, leased=False, replenish=True)
+
+    @staticmethod
+    def is_healthy(pooled: PooledDriver) -> bool:
+        """Cheap round-trip to check the browser session is still usable."""
+        try:
+            return pooled.driver.execute_script("return document.readyState") is not None
+        except Exception:
+            return False
+
+    def prune(self) -> int:
+        """Probe idle drivers and replace any whose session has died."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._leased += len(idle)
+        dead = 0
+        for pooled in idle:
+            healthy = self._is_reusable(pooled)
+            if not healthy:
+                dead += 1
+            self.release(pooled, healthy=healthy)
+        if dead:
+            logger.info(f"Pruned {dead} dead driver(s) from the pool")
+        return dead
+
+    def ready_count(self) -> int:
+        with self._cond:
+            return len(self._idle) + self._leased
+
+    def stats(self, resources: bool = False) -> Dict[str, Any]:
+        """Pool counters; `resources` adds resource_usage(), which reads /proc for every idle browser."""
+        with self._cond:
+            stats = {
+                "size": self.size,
+                "profile": self.profile,
+                "idle": len(self._idle),
+                "leased": self._leased,
+                "starting": self._total - len(self._idle) - self._leased,
+                "waiting": self._waiters,
+                "proxies": [p.proxy for p in self._idle],
+            }
+        if resources:
+            stats["resources"] = self.resource_usage()
+        return stats
+
+    def resource_usage(self) -> Dict[str, Any]:
+        """Average browser RSS and page-load time of the idle drivers, for comparing profiles."""
+        with self._cond:
+            idle = list(self._idle)
+        rss = [r for r in (DriverManager.browser_rss(p.driver) for p in idle) if r]
+        loads = sum(p.page_loads for p in idle)
+        load_ms = sum(p.page_load_ms_total for p in idle)
+        return {
+            "profile": self.profile,
+            "sampled_drivers": len(idle),
+            "avg_rss_mb": round(sum(rss) / len(rss) / 2 ** 20, 1) if rss else None,
+            "avg_page_load_ms": round(load_ms / loads, 1) if loads else None,
+        }
+
+    def close(self) -> None:
+        """Quit every idle driver; leased drivers are quit when they are released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            pooled.quit()
+        logger.info("Driver pool closed")
+
+    def _wait_for_driver(self, deadline: float) -> PooledDriver:
+        # Must be called with self._cond held.
+        warming: Optional[Future] = None
+        while True:
+            if self._closed:
+                raise DriverPoolExhausted("Driver pool is closed")
+            if self._idle:
+                self._leased += 1
+                return self._idle.pop()
+            if warming is not None and warming.done() and warming.exception() is not None:
+                # The driver warmed for this caller failed; report why rather than time out.
+                raise warming.exception()
+            if (warming is None or warming.done()) and self._total < self.size:
+                self._total += 1
+                warming = Future()
+                threading.Thread(target=self._fill_slot, args=(warming,), daemon=True).start()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DriverPoolExhausted("Timed out waiting for a free driver")
+            self._cond.wait(remaining)
+
+    def _is_reusable(self, pooled: PooledDriver) -> bool:
+        if time.time() - pooled.created_at > self.max_age:
+            logger.info(f"Recycling driver on {pooled.proxy} after reaching max age")
+            return False
+        if self.proxy is None and not get_proxy_registry().is_healthy(pooled.proxy):
+            # The proxy is cooling down after failures; a replacement driver picks another one.
+            logger.info(f"Recycling driver on {pooled.proxy} while the proxy cools down")
+            return False
+        return self.is_healthy(pooled)
+
+    def _create(self) -> PooledDriver:
+        driver, proxy = DriverManager.setup_driver(self.proxy, self.profile)
+        if not driver:
+            self.last_error = "Driver setup failed"
+            raise Exception(self.last_error)
+        start = time.monotonic()
+        try:
+            logged_in = TwitterLogin.login(driver, proxy=proxy, username=self.username, password=self.password)
+        except LoginUnreachable as e:
+            # A dead proxy, not a bad account: cool the proxy down so the next driver picks another.
+            get_metrics().count_failure('login', 'proxy', proxy, 'selenium')
+            self._quit_quietly(driver)
+            self.last_error = str(e)
+            get_proxy_registry().record_failure(proxy, "login page unreachable")
+            raise
+        if not logged_in:
+            get_metrics().count_failure('login', 'auth', proxy, 'selenium')
+            self._quit_quietly(driver)
+            self.last_error = f"Twitter rejected the login for {self.username or 'the configured account'}"
+            raise LoginRejected(self.last_error)
+        get_metrics().observe('login', time.monotonic() - start, proxy, 'selenium')
+        self.last_error = None
+        logger.info(f"Created {self.profile} pooled driver on proxy {proxy}")
+        return PooledDriver(driver, proxy, self.profile)
+
+    @staticmethod
+    def _quit_quietly(driver) -> None:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reserve_slot(self) -> bool:
+        with self._cond:
+            if self._closed or self._total >= self.size:
+                return False
+            self._total += 1
+            return True
+
+    def _release_slot(self, leased: bool = True) -> None:
+        with self._cond:
+            self._total -= 1
+            if leased:
+                self._leased -= 1
+            self._cond.notify()
+
+    def _fill_slot(self, warming: Optional[Future] = None) -> None:
+        """Create a driver for a reserved slot; `warming` tells a waiting caller how it went."""
+        try:
+            pooled = self._create()
+        except Exception as e:
+            logger.error(f"Failed to warm pooled driver: {str(e)}")
+            if warming is not None:
+                warming.set_exception(e)
+            with self._cond:
+                self._total -= 1
+                self._cond.notify_all()
+            return
+        if warming is not None:
+            warming.set_result(None)
+        with self._cond:
+            if self._closed:
+                self._total -= 1
+                closed = True
+            else:
+                self._idle.append(pooled)
+                self._cond.notify_all()
+                closed = False
+        if closed:
+            pooled.quit()
+
+    def _discard(self, pooled: PooledDriver, leased: bool, replenish: bool) -> None:
+        pooled.quit()
+        self._release_slot(leased=leased)
+        if replenish and self._reserve_slot():
+            threading.Thread(target=self._fill_slot, daemon=True).start()
@@ -0,0 +1,115 @@
+# health_monitor.py
+import os
+import time
+import json
+import hashlib
+import threading
+import logging
+from typing import Callable, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields that define the health state; the ETag only changes when one of these does.
+ETAG_FIELDS = ("twitter_connected", "proxy_connected", "mongodb_connected", "error", "current_proxy",
+               "retry_count", "proxies")
+
+
+class HealthMonitor:
+    """Checks MongoDB, driver sessions, proxies and login on its own cadence.
+
+    Requests read the last snapshot from memory instead of probing anything.
+    The snapshot carries an ETag derived from the health fields only, so
+    clients can long-poll or stream until something they care about changes.
+    """
+
+    def __init__(self, scraper_provider: Callable[[], Any], interval: Optional[float] = None,
+                 missing_reason: Optional[Callable[[], str]] = None):
+        self.scraper_provider = scraper_provider
+        self.missing_reason = missing_reason or (lambda: "Twitter scraper initialization failed")
+        self.interval = interval or float(os.getenv('HEALTH_CHECK_INTERVAL', 15))
+        self._snapshot: Dict[str, Any] = {
+            "twitter_connected": False,
+            "proxy_connected": False,
+            "error": "Status check pending",
+        }
+        self._etag = self._make_etag(self._snapshot)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Take a first snapshot inline, then keep refreshing in the background."""
+        self.check()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def refresh(self) -> None:
+        """Ask the background thread to check now, e.g. after a reconnect."""
+        self._wake.set()
+
+    def get(self) -> Tuple[Dict[str, Any], str]:
+        with self._cond:
+            return self._snapshot, self._etag
+
+    def wait_for_change(self, etag: Optional[str], timeout: float) -> Tuple[Dict[str, Any], str]:
+        """Block until the ETag differs from `etag` or the timeout passes."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._etag == etag and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._snapshot, self._etag
+
+    def check(self) -> Dict[str, Any]:
+        """Probe everything once and publish the result."""
+        start = time.monotonic()
+        scraper = self.scraper_provider()
+        if scraper is None:
+            snapshot = {
+                "twitter_connected": False,
+                "proxy_connected": False,
+                "error": self.missing_reason(),
+            }
+        else:
+            try:
+                # Probing idle sessions is the driver liveness check; dead ones are replaced.
+                scraper.pool.prune()
+                snapshot = scraper.get_connection_status()
+            except Exception as e:
+                logger.error(f"Health check failed: {str(e)}")
+                snapshot = dict(self._snapshot, error=f"Health check failed: {str(e)}")
+        snapshot["checked_at"] = time.time()
+        snapshot["check_ms"] = round((time.monotonic() - start) * 1000, 1)
+
+        etag = self._make_etag(snapshot)
+        with self._cond:
+            self._snapshot = snapshot
+            if etag != self._etag:
+                self._etag = etag
+                self._cond.notify_all()
+        return snapshot
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.check()
+
+    @staticmethod
+    def _make_etag(snapshot: Dict[str, Any]) -> str:
+        state = {field: snapshot.get(field) for field in ETAG_FIELDS}
+        digest = hashlib.sha1(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return f'"{digest}"'
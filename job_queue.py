@@ -0,0 +1,108 @@
+# job_queue.py
+import os
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCESS = "success"
+ERROR = "error"
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting to run."""
+
+
+class Job:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCESS, ERROR)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "data": self.result,
+            "message": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class TrendJobQueue:
+    """Runs scrapes on a worker pool so web requests only enqueue and poll."""
+
+    def __init__(self, scrape: Callable[..., Dict[str, Any]], workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, retention: Optional[float] = None):
+        self.scrape = scrape
+        self.workers = workers or int(os.getenv('TREND_JOB_WORKERS', os.getenv('DRIVER_POOL_SIZE', 2)))
+        self.max_pending = max_pending or int(os.getenv('TREND_JOB_MAX_PENDING', 20))
+        self.retention = retention or float(os.getenv('TREND_JOB_RETENTION', 3600))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trend-job")
+        self._jobs: Dict[str, Job] = {}
+        self._cond = threading.Condition()
+
+    def submit(self, **kwargs) -> Job:
+        with self._cond:
+            self._expire()
+            pending = sum(1 for job in self._jobs.values() if not job.done)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} trend jobs already pending")
+            job = Job()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: Job, last_status: Optional[str], timeout: float) -> str:
+        """Block until the job's status differs from `last_status` or the timeout passes."""
+        with self._cond:
+            self._cond.wait_for(lambda: job.status != last_status, timeout)
+            return job.status
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, kwargs: Dict[str, Any]) -> None:
+        self._update(job, RUNNING, started_at=time.time())
+        try:
+            result = self.scrape(**kwargs)
+            if result.get("status") == "error":
+                self._update(job, ERROR, error=result.get("message"), finished_at=time.time())
+            else:
+                self._update(job, SUCCESS, result=result, finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Trend job {job.id} failed: {str(e)}")
+            self._update(job, ERROR, error=str(e), finished_at=time.time())
+
+    def _update(self, job: Job, status: str, **fields) -> None:
+        with self._cond:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.status = status
+            self._cond.notify_all()
+
+    def _expire(self) -> None:
+        # Must be called with self._cond held.
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,167 @@
+# metrics.py
+import time
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from scrape_errors import ScrapeError
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_SECONDS = 'trend_scrape_stage_seconds'
+STAGE_FAILURES = 'trend_scrape_stage_failures_total'
+SCRAPES_TOTAL = 'trend_scrapes_total'
+
+# Causes that point at the proxy (or the path through it) rather than the account or the page.
+PROXY_CAUSES = ('proxy', 'network', 'timeout')
+
+
+def failure_cause(error: BaseException) -> str:
+    """Coarse, low-cardinality label for why a stage failed."""
+    if isinstance(error, ScrapeError):
+        return error.cause
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    if 'too many requests' in message or 'rate limit' in message:
+        return 'rate_limited'
+    if 'timeout' in name or 'timed out' in message:
+        return 'timeout'
+    if 'login' in message or 'session rejected' in message:
+        return 'auth'
+    if 'proxy' in name or 'err_proxy' in message or 'err_tunnel' in message or 'proxy' in message:
+        return 'proxy'
+    if 'connect' in name or 'connection' in message or 'err_' in message:
+        return 'network'
+    if 'mongo' in message or 'bulkwrite' in name or 'pymongo' in type(error).__module__:
+        return 'mongodb'
+    return 'other'
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+
+class Metrics:
+    """In-process histograms and counters rendered in the Prometheus text format.
+
+    Stage timings go to one histogram labelled by stage, proxy and backend, and
+    stage failures to one counter that also carries a `cause` label.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[Tuple, _Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple], float] = {}
+        self._help: Dict[str, str] = {
+            STAGE_SECONDS: "Duration of successful scrape pipeline stages.",
+            STAGE_FAILURES: "Failed scrape pipeline stages by cause.",
+            SCRAPES_TOTAL: "Completed scrapes by backend and status.",
+        }
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, proxy: Optional[str] = None, backend: Optional[str] = None) -> None:
+        key = self._labels(stage=stage, proxy=proxy, backend=backend)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                histogram.counts[index] += 1
+            histogram.total += 1
+            histogram.sum += seconds
+
+    def count_failure(self, stage: str, cause: str, proxy: Optional[str] = None,
+                      backend: Optional[str] = None) -> None:
+        self.inc(STAGE_FAILURES, stage=stage, cause=cause, proxy=proxy, backend=backend)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, self._labels(**labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, help_text: Optional[str] = None, **labels) -> None:
+        with self._lock:
+            self._gauges[(name, self._labels(**labels))] = value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    @contextmanager
+    def timer(self, stage: str, proxy: Optional[str] = None, backend: Optional[str] = None):
+        """Time a stage; failures are counted by cause and re-raised, not observed as latency."""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.count_failure(stage, failure_cause(e), proxy, backend)
+            raise
+        self.observe(stage, time.monotonic() - start, proxy, backend)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.total, h.sum) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines: List[str] = []
+        if histograms:
+            lines += self._header(STAGE_SECONDS, 'histogram')
+            for labels, (counts, total, total_sum) in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{STAGE_SECONDS}_bucket{self._format(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{STAGE_SECONDS}_bucket{self._format(labels + (('le', '+Inf'),))} {total}")
+                lines.append(f"{STAGE_SECONDS}_sum{self._format(labels)} {total_sum}")
+                lines.append(f"{STAGE_SECONDS}_count{self._format(labels)} {total}")
+        lines += self._render_series(counters, 'counter')
+        lines += self._render_series(gauges, 'gauge')
+        return "\n".join(lines) + "\n"
+
+    def _render_series(self, series: Dict[Tuple[str, Tuple], float], kind: str) -> List[str]:
+        lines, current = [], None
+        for (name, labels), value in sorted(series.items()):
+            if name != current:
+                lines += self._header(name, kind)
+                current = name
+            lines.append(f"{name}{self._format(labels)} {value}")
+        return lines
+
+    def _header(self, name: str, kind: str) -> List[str]:
+        header = [f"# TYPE {name} {kind}"]
+        if name in self._help:
+            header.insert(0, f"# HELP {name} {self._help[name]}")
+        return header
+
+    @staticmethod
+    def _labels(**labels) -> Tuple:
+        return tuple(sorted((k, '' if v is None else str(v)) for k, v in labels.items()))
+
+    @staticmethod
+    def _format(labels: Tuple) -> str:
+        if not labels:
+            return ''
+        escape = lambda v: v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels) + '}'
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics shared by every stage of the pipeline."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
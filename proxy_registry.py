@@ -0,0 +1,183 @@
+# proxy_registry.py
+import os
+import json
+import time
+import random
+import socket
+import threading
+import logging
+from typing import Dict, Any, Iterable, List, Optional
+from proxy_fetcher import get_all_proxies
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyStats:
+    """Health record for a single proxy."""
+
+    def __init__(self, successes=0, failures=0, consecutive_failures=0, latency=None,
+                 last_failure=None, last_error=None, cooldown_until=0.0):
+        self.successes = successes
+        self.failures = failures
+        self.consecutive_failures = consecutive_failures
+        self.latency = latency  # exponentially weighted connect latency, seconds
+        self.last_failure = last_failure
+        self.last_error = last_error
+        self.cooldown_until = cooldown_until
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing so untested proxies start at 0.5 rather than 0 or 1.
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class ProxyRegistry:
+    """Tracks proxy health and hands out the fastest healthy proxies first."""
+
+    def __init__(self, proxies: Optional[Iterable[str]] = None, path: Optional[str] = None,
+                 top_k: Optional[int] = None, base_cooldown: Optional[float] = None,
+                 max_cooldown: Optional[float] = None):
+        self.path = path or os.getenv('PROXY_SCORES_PATH', 'proxy_scores.json')
+        self.top_k = top_k or int(os.getenv('PROXY_TOP_K', 5))
+        self.base_cooldown = base_cooldown or float(os.getenv('PROXY_BASE_COOLDOWN', 60))
+        self.max_cooldown = max_cooldown or float(os.getenv('PROXY_MAX_COOLDOWN', 3600))
+        self.default_latency = 5.0
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        saved = self._load()
+        if proxies is None:
+            # PROXY_LIST (comma-separated host:port) replaces the built-in list.
+            configured = os.getenv('PROXY_LIST')
+            proxies = [p.strip() for p in configured.split(',') if p.strip()] if configured else get_all_proxies()
+        self._stats: Dict[str, ProxyStats] = {proxy: saved.get(proxy, ProxyStats()) for proxy in proxies}
+
+    def proxies(self) -> List[str]:
+        with self._lock:
+            return list(self._stats)
+
+    def add(self, proxy: str) -> None:
+        with self._lock:
+            self._stats.setdefault(proxy, ProxyStats())
+
+    def score(self, proxy: str) -> float:
+        stats = self._stats[proxy]
+        latency = stats.latency if stats.latency is not None else self.default_latency
+        return stats.success_rate / max(latency, 0.01)
+
+    def is_healthy(self, proxy: str, now: Optional[float] = None) -> bool:
+        stats = self._stats.get(proxy)
+        return stats is None or stats.cooldown_until <= (now or time.time())
+
+    def ranked(self, exclude: Iterable[str] = ()) -> List[str]:
+        """Healthy proxies ordered best first."""
+        exclude = set(exclude)
+        now = time.time()
+        with self._lock:
+            healthy = [p for p in self._stats if p not in exclude and self.is_healthy(p, now)]
+            return sorted(healthy, key=self.score, reverse=True)
+
+    def select(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Pick one of the top-k healthy proxies, weighted by score."""
+        candidates = self.ranked(exclude)[:self.top_k]
+        if not candidates:
+            exclude = set(exclude)
+            with self._lock:
+                cooling = [p for p in self._stats if p not in exclude]
+                if not cooling:
+                    return None
+                # Everything is on cooldown: take the one that recovers soonest.
+                return min(cooling, key=lambda p: self._stats[p].cooldown_until)
+        with self._lock:
+            weights = [self.score(p) for p in candidates]
+        return random.choices(candidates, weights=weights, k=1)[0]
+
+    def record_success(self, proxy: str, latency: Optional[float] = None) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(proxy, ProxyStats())
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+            if latency is not None:
+                stats.latency = latency if stats.latency is None else 0.7 * stats.latency + 0.3 * latency
+        self._maybe_save()
+
+    def record_failure(self, proxy: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(proxy, ProxyStats())
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            stats.last_failure = time.time()
+            stats.last_error = error
+            cooldown = min(self.base_cooldown * 2 ** (stats.consecutive_failures - 1), self.max_cooldown)
+            stats.cooldown_until = stats.last_failure + cooldown
+        logger.info(f"Proxy {proxy} failed ({error}); cooling down for {cooldown:.0f}s")
+        self._maybe_save()
+
+    def check_connect(self, proxy: str, timeout: float = 5.0) -> Optional[float]:
+        """TCP-connect to the proxy and record the result. Returns latency in seconds or None."""
+        host, _, port = proxy.rpartition(':')
+        start = time.monotonic()
+        try:
+            with socket.create_connection((host, int(port)), timeout=timeout):
+                pass
+        except Exception as e:
+            self.record_failure(proxy, f"connect: {str(e)}")
+            return None
+        latency = time.monotonic() - start
+        self.record_success(proxy, latency)
+        return latency
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {p: s.to_dict() for p, s in self._stats.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            healthy = sum(1 for p in self._stats if self.is_healthy(p, now))
+            return {"total": len(self._stats), "healthy": healthy, "cooling_down": len(self._stats) - healthy}
+
+    def save(self) -> None:
+        """Persist scores so a restart keeps what it learned about dead proxies."""
+        try:
+            data = self.snapshot()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"  # scrape workers save the same file
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._last_save = time.time()
+        except Exception as e:
+            logger.error(f"Failed to save proxy scores: {str(e)}")
+
+    def _maybe_save(self, interval: float = 10.0) -> None:
+        if time.time() - self._last_save >= interval:
+            self.save()
+
+    def _load(self) -> Dict[str, ProxyStats]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            logger.info(f"Loaded scores for {len(data)} proxies")
+            return {p: ProxyStats(**s) for p, s in data.items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Failed to load proxy scores: {str(e)}")
+            return {}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_proxy_registry() -> ProxyRegistry:
+    """Process-wide registry shared by every driver."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ProxyRegistry()
+    return _registry
@@ -0,0 +1,106 @@
+# proxy_validator.py
+import os
+import time
+import asyncio
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional
+import httpx
+from proxy_registry import ProxyRegistry, get_proxy_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyValidator:
+    """Probes every known proxy concurrently and keeps a self-refreshing set of known-good ones."""
+
+    def __init__(self, registry: Optional[ProxyRegistry] = None, test_url: Optional[str] = None,
+                 concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 refresh_interval: Optional[float] = None):
+        self.registry = registry or get_proxy_registry()
+        self.test_url = test_url or os.getenv('PROXY_TEST_URL', 'https://x.com/robots.txt')
+        self.concurrency = concurrency or int(os.getenv('PROXY_VALIDATE_CONCURRENCY', 50))
+        self.timeout = timeout or float(os.getenv('PROXY_VALIDATE_TIMEOUT', 8))
+        self.refresh_interval = refresh_interval or float(os.getenv('PROXY_VALIDATE_INTERVAL', 300))
+        self.known_good: List[str] = []
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    async def probe(self, proxy: str, semaphore: asyncio.Semaphore) -> Optional[float]:
+        """Fetch the test URL through one proxy. Returns latency in seconds or None."""
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                async with httpx.AsyncClient(proxy=f"http://{proxy}", timeout=self.timeout,
+                                             follow_redirects=True, trust_env=False) as client:
+                    response = await client.get(self.test_url)
+                # 407 (proxy auth), 403 (proxy or target blocking) and the like are failures too.
+                if not 200 <= response.status_code < 400:
+                    raise Exception(f"HTTP {response.status_code}")
+            except Exception as e:
+                self.registry.record_failure(proxy, f"validate: {type(e).__name__}: {str(e)}")
+                return None
+            latency = time.monotonic() - start
+            self.registry.record_success(proxy, latency)
+            return latency
+
+    async def validate_async(self, proxies: Iterable[str]) -> Dict[str, Optional[float]]:
+        proxies = list(proxies)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies = await asyncio.gather(*(self.probe(proxy, semaphore) for proxy in proxies))
+        return dict(zip(proxies, latencies))
+
+    def validate(self, proxies: Optional[Iterable[str]] = None) -> List[str]:
+        """Run one validation pass and return the passing proxies, fastest first."""
+        proxies = self.registry.proxies() if proxies is None else list(proxies)
+        start = time.monotonic()
+        results = asyncio.run(self.validate_async(proxies))
+        good = sorted((p for p, latency in results.items() if latency is not None), key=results.get)
+        with self._lock:
+            self.known_good = good
+            self.last_run = time.time()
+        self.registry.save()
+        logger.info(f"Validated {len(proxies)} proxies in {time.monotonic() - start:.1f}s: {len(good)} passed")
+        return good
+
+    def get_known_good(self) -> List[str]:
+        with self._lock:
+            return list(self.known_good)
+
+    def start(self, validate_now: bool = True) -> None:
+        """Optionally run a first pass inline, then keep refreshing in a background thread."""
+        if validate_now:
+            self._safe_validate()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="proxy-validator", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            self._safe_validate()
+
+    def _safe_validate(self) -> None:
+        try:
+            self.validate()
+        except Exception as e:
+            logger.error(f"Proxy validation failed: {str(e)}")
+
+
+_validator = None
+_validator_lock = threading.Lock()
+
+
+def get_proxy_validator() -> ProxyValidator:
+    """Process-wide validator bound to the shared proxy registry."""
+    global _validator
+    if _validator is None:
+        with _validator_lock:
+            if _validator is None:
+                _validator = ProxyValidator()
+    return _validator
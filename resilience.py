@@ -0,0 +1,219 @@
+# resilience.py
+import os
+import time
+import random
+import threading
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from scraper_backend import ScraperBackend
+from metrics import get_metrics, failure_cause
+from scrape_errors import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+RETRIES_TOTAL = 'trend_scrape_retries_total'
+
+# Failure causes (see metrics.failure_cause) that say something about the account
+# rather than the proxy or the page, the ones not worth retrying right away, and
+# the ones that condemn the driver (or session) that served the attempt.
+ACCOUNT_CAUSES = {'auth', 'rate_limited'}
+NO_RETRY_CAUSES = {'rate_limited', 'mongodb', 'circuit_open', 'dom_changed'}
+RETIRE_CAUSES = {'proxy', 'network', 'timeout', 'auth'}
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Opens after `threshold` failures in a row (or at once for a tripping
+    failure such as a rate limit). Once `reset_timeout` has passed it is
+    half-open: one probe call goes through while the rest are refused, and a
+    success closes it while a failure re-opens it for twice as long, up to
+    `max_reset_timeout`. A probe that ends without either is given back with
+    `release()`.
+    """
+
+    def __init__(self, name: str, threshold: Optional[int] = None, reset_timeout: Optional[float] = None,
+                 max_reset_timeout: Optional[float] = None):
+        self.name = name
+        self.threshold = threshold or int(os.getenv('BREAKER_THRESHOLD', 3))
+        self.reset_timeout = reset_timeout or float(os.getenv('BREAKER_RESET_TIMEOUT', 300))
+        self.max_reset_timeout = max_reset_timeout or float(os.getenv('BREAKER_MAX_RESET_TIMEOUT', 3600))
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.last_error = None
+        self._probe_owner = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.trips == 0:
+            return CLOSED
+        return OPEN if time.time() < self.open_until else HALF_OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == OPEN or self._probe_owner is not None:
+                return False
+            self._probe_owner = threading.get_ident()
+            return True
+
+    def release(self) -> None:
+        """Give back this thread's half-open probe if it resolved nothing."""
+        with self._lock:
+            if self._probe_owner == threading.get_ident():
+                self._probe_owner = None
+
+    def retry_in(self) -> float:
+        return max(0.0, self.open_until - time.time())
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.trips:
+                logger.info(f"Circuit {self.name} closed")
+            self.consecutive_failures = 0
+            self.trips = 0
+            self.open_until = 0.0
+            self._probe_owner = None
+
+    def record_failure(self, error: Optional[str] = None, trip: bool = False) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = error
+            self._probe_owner = None
+            if self.state == OPEN:
+                return
+            if trip or self.trips or self.consecutive_failures >= self.threshold:
+                timeout = min(self.reset_timeout * 2 ** self.trips, self.max_reset_timeout)
+                self.trips += 1
+                self.open_until = time.time() + timeout
+                logger.info(f"Circuit {self.name} open for {timeout:.0f}s ({error})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "probing": self._probe_owner is not None,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": round(self.retry_in(), 1),
+            "last_error": self.last_error,
+        }
+
+
+class BreakerBoard:
+    """Circuit breakers by key, created on first use."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(key)
+            return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.to_dict() for breaker in breakers}
+
+
+_breakers: Optional[BreakerBoard] = None
+_breakers_lock = threading.Lock()
+
+
+def get_breakers() -> BreakerBoard:
+    global _breakers
+    with _breakers_lock:
+        if _breakers is None:
+            _breakers = BreakerBoard()
+        return _breakers
+
+
+class ResilientBackend(ScraperBackend):
+    """Wraps a backend with classified retries, backoff and a per-account circuit breaker.
+
+    Before retrying a driver or session failure the inner backend retires
+    whatever served the failed attempt, so the retry runs on another driver; a
+    changed page layout is not retried at all, since every driver would see
+    the same page. Proxy, network and timeout failures also put the proxy on
+    cooldown in the proxy registry (the per-proxy breaker), so replacement
+    drivers pick a different proxy. Login and rate-limit failures count against
+    the account's breaker instead; while it is open, scrapes fail fast with
+    CircuitOpen rather than hammering Twitter.
+    """
+
+    def __init__(self, backend: ScraperBackend, account: Optional[str] = None, max_retries: Optional[int] = None,
+                 base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        self.backend = backend
+        self.name = backend.name
+        self.account = account or os.getenv('TWITTER_USERNAME')
+        self.max_retries = int(os.getenv('SCRAPE_MAX_RETRIES', 3)) if max_retries is None else max_retries
+        self.base_delay = base_delay or float(os.getenv('SCRAPE_RETRY_BASE_DELAY', 1))
+        self.max_delay = max_delay or float(os.getenv('SCRAPE_RETRY_MAX_DELAY', 30))
+        self.breaker = get_breakers().get(f"account:{self.account}")
+        self.last_retries = 0
+
+    @property
+    def pool(self):
+        """The wrapped backend's driver pool, so owners can still close it."""
+        return getattr(self.backend, 'pool', None)
+
+    def fetch_trends(self, url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        if not self.breaker.allow():
+            raise CircuitOpen(f"Circuit open for account {self.account}, "
+                              f"retrying in {self.breaker.retry_in():.0f}s ({self.breaker.last_error})")
+        try:
+            return self._fetch_with_retries(url)
+        finally:
+            self.breaker.release()
+
+    def _fetch_with_retries(self, url: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        metrics = get_metrics()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt))
+            try:
+                result = self.backend.fetch_trends(url)
+            except Exception as e:
+                cause = failure_cause(e)
+                if cause in ACCOUNT_CAUSES:
+                    self.breaker.record_failure(str(e), trip=cause == 'rate_limited')
+                if cause in NO_RETRY_CAUSES or attempt >= self.max_retries or self.breaker.state == OPEN:
+                    self.last_retries = attempt
+                    raise
+                metrics.inc(RETRIES_TOTAL, backend=self.name, cause=cause)
+                logger.info(f"Scrape attempt {attempt + 1} failed ({cause}): {str(e)}; retrying")
+                if cause in RETIRE_CAUSES:
+                    # Do not retry on the driver (or worker, or connection) that just failed.
+                    self.backend.retire_failed()
+            else:
+                self.breaker.record_success()
+                self.last_retries = attempt
+                return result
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter, so parallel callers do not retry in lockstep."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def start(self) -> None:
+        self.backend.start()
+
+    def ready(self) -> bool:
+        return self.backend.ready()
+
+    def status(self) -> Dict[str, Any]:
+        return dict(self.backend.status(), max_retries=self.max_retries, last_retries=self.last_retries,
+                    account_breaker=self.breaker.to_dict())
+
+    def close(self) -> None:
+        self.backend.close()
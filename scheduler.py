@@ -0,0 +1,265 @@
+# scheduler.py
+import os
+import sys
+import json
+import heapq
+import time
+import random
+import signal
+import argparse
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from dotenv import load_dotenv
+from config import init_mongodb
+from driver_pool import DriverPool
+from scraper_backend import ScraperBackend, create_backend
+from trend_storage import TrendStorage
+from trend_rollups import TrendRollups
+from write_buffer import WriteBehindBuffer
+from twitter_scraper import build_trend_record
+from resilience import ResilientBackend
+from trend_deltas import TrendChangeDetector
+from metrics import get_metrics, failure_cause, SCRAPES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeTarget:
+    """One periodic scrape: an account collecting one region, optionally pinned to a proxy."""
+
+    def __init__(self, account: str, region: str, url: Optional[str], interval: float,
+                 proxy: Optional[str] = None):
+        self.account = account
+        self.region = region
+        self.url = url
+        self.interval = interval
+        self.proxy = proxy
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self.last_error = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.account}/{self.region}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "account": self.account, "region": self.region, "proxy": self.proxy,
+            "interval": self.interval, "runs": self.runs, "failures": self.failures,
+            "last_run": self.last_run, "last_error": self.last_error,
+        }
+
+
+class AccountLimiter:
+    """Allows one scrape at a time per account and enforces a minimum gap between them."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._busy = set()
+        self._next_allowed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, account: str) -> bool:
+        with self._lock:
+            if account in self._busy or time.monotonic() < self._next_allowed.get(account, 0.0):
+                return False
+            self._busy.add(account)
+            return True
+
+    def release(self, account: str) -> None:
+        with self._lock:
+            self._busy.discard(account)
+            self._next_allowed[account] = time.monotonic() + self.min_interval
+
+
+class TrendScheduler:
+    """Runs scrape targets on a thread pool at jittered intervals, rotating fairly across accounts."""
+
+    def __init__(self, targets: List[ScrapeTarget], backends: Dict[tuple, ScraperBackend], sink,
+                 workers: int = 2, jitter: float = 0.2, account_min_interval: float = 300):
+        self.targets = targets
+        self.backends = backends
+        self.sink = sink
+        self.change_detector = TrendChangeDetector()
+        self.jitter = jitter
+        self.limiter = AccountLimiter(account_min_interval)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduled-scrape")
+        self._slots = threading.BoundedSemaphore(workers)
+        self._stop = threading.Event()
+        self._queue: List = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+        # Stagger first runs so accounts do not all start at once.
+        now = time.monotonic()
+        for target in targets:
+            self._push(target, now + random.uniform(0, self.jitter * target.interval))
+
+    def run(self, once: bool = False) -> None:
+        """Dispatch due targets until stopped (or, with `once`, until each target ran one time)."""
+        logger.info(f"Scheduler started with {len(self.targets)} targets")
+        while not self._stop.is_set():
+            if once and all(target.runs + target.failures > 0 for target in self.targets):
+                break
+            if not self._slots.acquire(timeout=1):
+                continue
+            target = self._next_runnable()
+            if target is None:
+                self._slots.release()
+                self._stop.wait(0.25)
+                continue
+            self._executor.submit(self._execute, target)
+        self._executor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [target.to_dict() for target in self.targets]
+
+    def _execute(self, target: ScrapeTarget) -> None:
+        metrics = get_metrics()
+        backend = self.backends[(target.account, target.proxy)]
+        start = time.monotonic()
+        try:
+            trends, proxy = backend.fetch_trends(target.url)
+            metrics.observe('scrape', time.monotonic() - start, proxy, backend.name)
+            metrics.inc(SCRAPES_TOTAL, backend=backend.name, status='success')
+            record = build_trend_record(trends, proxy, backend.name, account=target.account, region=target.region)
+            self.sink.add(self.change_detector.process(record))
+            target.runs += 1
+            target.last_error = None
+            logger.info(f"Scraped {len(trends)} trends for {target.key}")
+        except Exception as e:
+            metrics.count_failure('scrape', failure_cause(e), target.proxy, backend.name)
+            metrics.inc(SCRAPES_TOTAL, backend=backend.name, status='error')
+            target.failures += 1
+            target.last_error = str(e)
+            logger.error(f"Scheduled scrape for {target.key} failed: {str(e)}")
+        finally:
+            target.last_run = time.time()
+            self.limiter.release(target.account)
+            self._slots.release()
+            delay = target.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._push(target, time.monotonic() + delay)
+
+    def _push(self, target: ScrapeTarget, when: float) -> None:
+        with self._lock:
+            self._counter += 1
+            heapq.heappush(self._queue, (when, self._counter, target))
+
+    def _next_runnable(self) -> Optional[ScrapeTarget]:
+        """The longest-overdue target whose account is free.
+
+        Targets keep their original due time while their account is busy or
+        cooling down, so whichever region waited longest goes next.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for entry in sorted(self._queue):
+                when, _, target = entry
+                if when > now:
+                    break
+                if self.limiter.try_acquire(target.account):
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    return target
+        return None
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Read the scheduler JSON config.
+
+    {
+      "interval": 900, "jitter": 0.2, "workers": 2, "account_min_interval": 300, "max_retries": 1,
+      "accounts": [{"username": "a", "password_env": "TWITTER_PASSWORD_A", "proxies": ["1.2.3.4:80"],
+                    "profile": "lean"}],
+      "regions": [{"name": "worldwide"}, {"name": "trending", "url": "https://x.com/explore/tabs/trending"}]
+    }
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_targets(config: Dict[str, Any]) -> List[ScrapeTarget]:
+    interval = float(config.get("interval", 900))
+    regions = config.get("regions") or [{"name": "default"}]
+    targets = []
+    for account in config["accounts"]:
+        proxies = account.get("proxies") or [None]
+        for i, region in enumerate(regions):
+            targets.append(ScrapeTarget(
+                account=account["username"],
+                region=region["name"],
+                url=region.get("url"),
+                interval=float(region.get("interval", interval)),
+                proxy=proxies[i % len(proxies)],
+            ))
+    return targets
+
+
+def build_backends(config: Dict[str, Any]) -> Dict[tuple, ScraperBackend]:
+    """One small driver pool and backend per (account, pinned proxy)."""
+    backends = {}
+    for account in config["accounts"]:
+        password = os.getenv(account.get("password_env", "TWITTER_PASSWORD"))
+        for proxy in account.get("proxies") or [None]:
+            pool = DriverPool(size=int(account.get("pool_size", 1)), username=account["username"],
+                              password=password, proxy=proxy,
+                              profile=account.get("profile", config.get("profile")))
+            backends[(account["username"], proxy)] = ResilientBackend(
+                create_backend(pool, config.get("backend")), account=account["username"],
+                max_retries=int(config.get("max_retries", 1)),
+            )
+    return backends
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Collect trends periodically without the web app.")
+    parser.add_argument('--config', default=os.getenv('SCHEDULER_CONFIG', 'scheduler.json'))
+    parser.add_argument('--once', action='store_true', help="run every target once and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+    config = load_config(args.config)
+
+    clients = []
+
+    def connect_storage() -> Optional[TrendStorage]:
+        client, db, _ = init_mongodb()
+        if db is None:
+            return None
+        clients.append(client)
+        return TrendStorage(db, rollups=TrendRollups(db))
+
+    # If MongoDB is down now, the buffer spills and keeps retrying the connection.
+    sink = WriteBehindBuffer(connect_storage(), connect=connect_storage)
+    backends = build_backends(config)
+    scheduler = TrendScheduler(
+        build_targets(config), backends, sink,
+        workers=int(config.get("workers", 2)),
+        jitter=float(config.get("jitter", 0.2)),
+        account_min_interval=float(config.get("account_min_interval", 300)),
+    )
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: scheduler.stop())
+    try:
+        scheduler.run(once=args.once)
+    finally:
+        for backend in backends.values():
+            backend.close()
+            if getattr(backend, 'pool', None):
+                backend.pool.close()
+        sink.close()
+        for client in clients:
+            client.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
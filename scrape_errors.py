@@ -0,0 +1,43 @@
+# scrape_errors.py
+
+
+class ScrapeError(Exception):
+    """A scrape failure whose cause is known where it is raised.
+
+    `cause` is the metrics.failure_cause label, so classification does not
+    depend on the wording of the message.
+    """
+
+    cause = 'other'
+
+
+class DomChanged(ScrapeError):
+    """The page loaded but the trends were not where the selectors or parser expect them."""
+
+    cause = 'dom_changed'
+
+
+class LoginRejected(ScrapeError):
+    """Twitter refused the credentials or the cached session."""
+
+    cause = 'auth'
+
+
+class LoginUnreachable(ScrapeError):
+    """The login flow never got as far as the credentials (dead proxy, navigation error)."""
+
+    cause = 'proxy'
+
+
+class CircuitOpen(ScrapeError):
+    """Raised instead of scraping while a circuit breaker is open."""
+
+    cause = 'circuit_open'
+
+
+class RemoteScrapeError(ScrapeError):
+    """A failure classified in a worker process and re-raised in the supervisor."""
+
+    def __init__(self, message: str, cause: str = 'other'):
+        super().__init__(message)
+        self.cause = cause
@@ -0,0 +1,291 @@
+# scraper_backend.py
+import os
+import time
+import threading
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+import httpx
+from driver_pool import DriverPool
+from proxy_registry import get_proxy_registry
+from session_store import SessionStore
+from wait_strategy import get_wait_strategy
+from trend_extractor import TrendExtractor, TRENDING_SECTION_SELECTOR, TREND_CELL_SELECTOR
+from cdp_capture import CdpTrendCapture
+from driver_manager import DriverManager
+from worker_supervisor import WorkerSupervisor
+from metrics import get_metrics, failure_cause, PROXY_CAUSES
+from config import twitter_url
+from scrape_errors import DomChanged, LoginRejected
+
+logger = logging.getLogger(__name__)
+
+EXPLORE_PATH = "/explore"
+# URL fragments of the requests that carry the explore page's trends (see cdp_capture).
+TREND_RESPONSE_URLS = ["/i/api/2/guide.json", "/ExplorePage", "/ExploreSidebar", "/GenericTimelineById"]
+TRENDS_READY_JS = f'return !!document.querySelector("{TRENDING_SECTION_SELECTOR} {TREND_CELL_SELECTOR}")'
+
+
+class ScraperBackend:
+    """Fetches the current trends. Implementations return (trends, proxy used)."""
+
+    name = "base"
+
+    def fetch_trends(self, url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        """Warm up whatever the backend needs before the first scrape."""
+        pass
+
+    def retire_failed(self) -> None:
+        """Stop reusing whatever served this thread's last failed fetch, so a retry gets a fresh one."""
+        pass
+
+    def ready(self) -> bool:
+        """Whether the backend can scrape without first logging in."""
+        return False
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class SeleniumBackend(ScraperBackend):
+    """Renders the explore page in a pooled, logged-in Chrome."""
+
+    name = "selenium"
+
+    def __init__(self, pool: DriverPool, capture_mode: Optional[str] = None):
+        self.pool = pool
+        self.capture_mode = (capture_mode or os.getenv('TREND_CAPTURE_MODE', 'dom')).lower()
+        self._local = threading.local()
+
+    def fetch_trends(self, url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        registry = get_proxy_registry()
+        self._local.failed = None
+        with self.pool.driver() as pooled:
+            logger.info(f"Fetching trending topics via {pooled.proxy}...")
+            try:
+                trends = self._scrape_trends(pooled.driver, url or twitter_url(EXPLORE_PATH), pooled.proxy)
+            except Exception as e:
+                self._local.failed = pooled
+                if failure_cause(e) in PROXY_CAUSES:
+                    registry.record_failure(pooled.proxy, str(e))
+                raise
+            registry.record_success(pooled.proxy)
+            pooled.record_page_load(DriverManager.page_load_ms(pooled.driver))
+        return trends, pooled.proxy
+
+    def start(self) -> None:
+        self.pool.start()
+
+    def retire_failed(self) -> None:
+        pooled, self._local.failed = getattr(self._local, 'failed', None), None
+        if pooled is not None:
+            self.pool.retire(pooled)
+
+    def ready(self) -> bool:
+        return self.pool.ready_count() > 0
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "capture_mode": self.capture_mode}
+
+    def _scrape_trends(self, driver, url: str, proxy: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Load the explore page on a leased driver and extract the trend records."""
+        metrics = get_metrics()
+        if self.capture_mode == 'network':
+            with metrics.timer('page_load', proxy, 'selenium-network'):
+                trends = CdpTrendCapture.capture(driver, url)
+            if trends:
+                return trends
+            logger.info("Network capture found no trends, falling back to the DOM")
+
+        waits = get_wait_strategy()
+        with metrics.timer('page_load', proxy, self.name):
+            driver.get(url)
+            if not waits.for_js_condition(driver, TRENDS_READY_JS, timeout=20):
+                # Either way the page loaded (driver.get would have raised otherwise); whether the
+                # trends data arrived tells a changed layout from a changed API.
+                if waits.for_response(driver, TREND_RESPONSE_URLS, timeout=1):
+                    raise DomChanged("Trending section did not load although the trends data arrived")
+                raise DomChanged("Trending section did not load and no trends request was seen")
+        waits.jitter(0.5, 1.5)
+
+        with metrics.timer('extraction', proxy, self.name):
+            trends = TrendExtractor.from_driver(driver)[:5]
+            if not trends:
+                raise DomChanged("No trends found")
+        return trends
+
+
+class HttpBackend(ScraperBackend):
+    """Calls the trends endpoint directly with cookies exported from a logged-in driver.
+
+    The web app's bearer token (TWITTER_WEB_BEARER_TOKEN) is required: without
+    it every call is refused, and each refusal would throw away a valid session.
+    """
+
+    name = "http"
+
+    def __init__(self, pool: Optional[DriverPool] = None, session_store: Optional[SessionStore] = None,
+                 base_url: Optional[str] = None, bearer_token: Optional[str] = None,
+                 timeout: Optional[float] = None, account: Optional[str] = None):
+        self.pool = pool
+        self.session_store = session_store or SessionStore()
+        self.base_url = (base_url or twitter_url()).rstrip('/')
+        self.bearer_token = bearer_token or os.getenv('TWITTER_WEB_BEARER_TOKEN')
+        if not self.bearer_token:
+            raise ValueError("The http backend requires TWITTER_WEB_BEARER_TOKEN")
+        self.timeout = timeout or float(os.getenv('HTTP_BACKEND_TIMEOUT', 15))
+        self.account = account or (pool and pool.username) or os.getenv('TWITTER_USERNAME')
+        self._clients: Dict[Optional[str], httpx.Client] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def fetch_trends(self, url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # `url` selects an explore page for the browser backend; the guide endpoint has no equivalent.
+        self._local.failed = False
+        session = self.session_store.load_latest(self.account) or self._export_session()
+        proxy = session.get("proxy")
+        self._local.failed, self._local.proxy = True, proxy
+        registry = get_proxy_registry()
+
+        metrics = get_metrics()
+        start = time.monotonic()
+        try:
+            with metrics.timer('page_load', proxy, self.name):
+                response = self._client(proxy).get(
+                    "/i/api/2/guide.json",
+                    params={"include_page_configuration": "false", "initial_tab_id": "trending"},
+                    headers=self._headers(session),
+                )
+        except httpx.TransportError as e:
+            if proxy:
+                registry.record_failure(proxy, f"http: {str(e)}")
+                # Drop the session so the next attempt exports one from a driver on another proxy.
+                self.session_store.invalidate(self.account, proxy)
+            raise
+
+        if response.status_code in (401, 403):
+            logger.info("Cached session rejected by the API, it will be re-exported on the next call")
+            self.session_store.invalidate(self.account, proxy)
+            raise LoginRejected(f"Session rejected with HTTP {response.status_code}")
+        response.raise_for_status()
+        if proxy:
+            registry.record_success(proxy, time.monotonic() - start)
+
+        with metrics.timer('extraction', proxy, self.name):
+            trends = CdpTrendCapture.parse_payload(response.json())
+            if not trends:
+                raise DomChanged("No trends found in the guide payload")
+        self._local.failed = False
+        return trends, proxy
+
+    def retire_failed(self) -> None:
+        """Drop the keep-alive connections the failed call used, so the retry opens fresh ones."""
+        if not getattr(self._local, 'failed', False):
+            return
+        self._local.failed = False
+        with self._lock:
+            client = self._clients.pop(self._local.proxy, None)
+        if client is not None:
+            client.close()
+
+    def start(self) -> None:
+        if self.pool is not None and not self.ready():
+            self.pool.start()
+
+    def ready(self) -> bool:
+        return self.session_store.load_latest(self.account) is not None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.name, "base_url": self.base_url, "open_clients": len(self._clients)}
+
+    def close(self) -> None:
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+    def _client(self, proxy: Optional[str]) -> httpx.Client:
+        """One keep-alive connection pool per proxy."""
+        with self._lock:
+            client = self._clients.get(proxy)
+            if client is None:
+                client = httpx.Client(
+                    base_url=self.base_url,
+                    proxy=f"http://{proxy}" if proxy else None,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_keepalive_connections=5, keepalive_expiry=60),
+                    trust_env=False,
+                )
+                self._clients[proxy] = client
+            return client
+
+    def _headers(self, session: Dict[str, Any]) -> Dict[str, str]:
+        cookies = {c["name"]: c["value"] for c in session.get("cookies", [])}
+        return {
+            "cookie": "; ".join(f"{name}={value}" for name, value in cookies.items()),
+            "x-csrf-token": cookies.get("ct0", ""),
+            "x-twitter-active-user": "yes",
+            "x-twitter-auth-type": "OAuth2Session",
+            "authorization": f"Bearer {self.bearer_token}",
+        }
+
+    def _export_session(self) -> Dict[str, Any]:
+        """Log in once through the driver pool; a successful login writes the session store."""
+        if self.pool is None:
+            raise Exception("No cached Twitter session and no driver pool to log in with")
+        with self.pool.driver() as pooled:
+            self.session_store.save(pooled.driver, self.account, pooled.proxy)
+        session = self.session_store.load(self.account, pooled.proxy)
+        if not session:
+            raise Exception("Could not export a Twitter session from the driver pool")
+        return session
+
+
+class ProcessBackend(ScraperBackend):
+    """Runs another backend inside supervised worker processes, away from the web process."""
+
+    name = "process"
+
+    def __init__(self, supervisor: Optional[WorkerSupervisor] = None):
+        self.supervisor = supervisor or WorkerSupervisor()
+
+    def fetch_trends(self, url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return self.supervisor.fetch_trends(url)
+
+    def start(self) -> None:
+        self.supervisor.start()
+
+    def retire_failed(self) -> None:
+        self.supervisor.retire_failed()
+
+    def ready(self) -> bool:
+        return self.supervisor.ready_count() > 0
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self.supervisor.last_error
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.name, "workers": self.supervisor.stats()}
+
+    def close(self) -> None:
+        self.supervisor.stop()
+
+
+def create_backend(pool: DriverPool, name: Optional[str] = None) -> ScraperBackend:
+    """Build the backend selected by SCRAPER_BACKEND."""
+    name = (name or os.getenv('SCRAPER_BACKEND', 'selenium')).lower()
+    if name == ProcessBackend.name:
+        return ProcessBackend(WorkerSupervisor(username=pool.username, password=pool.password,
+                                               proxy=pool.proxy, profile=pool.profile))
+    if name == HttpBackend.name:
+        return HttpBackend(pool=pool)
+    if name == SeleniumBackend.name:
+        return SeleniumBackend(pool)
+    raise ValueError(f"Unknown scraper backend: {name}")
@@ -0,0 +1,139 @@
+# scraper_runtime.py
+import os
+import time
+import threading
+import logging
+from typing import Dict, Any, Optional
+from health_monitor import HealthMonitor
+
+logger = logging.getLogger(__name__)
+
+IDLE = "idle"
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+
+
+class ScraperRuntime:
+    """Builds the TwitterScraper on a background thread so the web app can serve at once.
+
+    Nothing heavy happens at import or construction: the selenium/pymongo
+    imports, the MongoDB connection, the browser launch and the login all run
+    in the init thread started by `ensure_started()`. A failed start is retried
+    after SCRAPER_INIT_RETRY seconds. The runtime remembers the pid that
+    started it, so a forked worker (e.g. gunicorn with --preload) starts its
+    own scraper instead of inheriting half of the parent's.
+    """
+
+    def __init__(self, retry_interval: Optional[float] = None):
+        self.retry_interval = retry_interval or float(os.getenv('SCRAPER_INIT_RETRY', 30))
+        self.health_monitor = HealthMonitor(lambda: self.scraper, missing_reason=self.describe)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.scraper = None
+        self.state = IDLE
+        self.stage = None
+        self.error = None
+        self.attempts = 0
+        self.started_at = None
+        self.ready_at = None
+        self.failed_at = None
+        self._pid = os.getpid()
+        self._thread = None
+
+    def ensure_started(self) -> None:
+        """Start initialization in the background if it is not running or done. Never blocks."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked after the parent started: threads and browsers did not come along.
+                self._reset()
+                self.health_monitor = HealthMonitor(lambda: self.scraper, missing_reason=self.describe)
+            if self.state in (STARTING, READY):
+                return
+            if self.state == FAILED and time.time() - self.failed_at < self.retry_interval:
+                return
+            self.state = STARTING
+            self.stage = "queued"
+            self.attempts += 1
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._initialize, name="scraper-init", daemon=True)
+            self._thread.start()
+            if self.attempts == 1:
+                self.health_monitor.start()
+
+    def get(self):
+        """The scraper if it is ready, otherwise None (starting it if needed)."""
+        self.ensure_started()
+        return self.scraper
+
+    def wait_ready(self, timeout: float) -> bool:
+        self.ensure_started()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.state == READY
+
+    def describe(self) -> str:
+        if self.state == FAILED:
+            return f"Twitter scraper initialization failed: {self.error}"
+        if self.state == STARTING:
+            return f"Twitter scraper is starting ({self.stage})"
+        if self.state == IDLE:
+            return "Twitter scraper not started"
+        return "Twitter scraper ready"
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "state": self.state,
+            "stage": self.stage,
+            "error": self.error,
+            "attempts": self.attempts,
+            "elapsed": round(now - self.started_at, 1) if self.started_at and self.state == STARTING else None,
+            "startup_seconds": round(self.ready_at - self.started_at, 1) if self.ready_at else None,
+        }
+
+    def shutdown(self) -> None:
+        self.health_monitor.stop()
+        scraper = self.scraper
+        if scraper is not None:
+            scraper.cleanup()
+
+    def _progress(self, stage: str) -> None:
+        self.stage = stage
+        logger.info(f"Scraper start-up: {stage}")
+        self.health_monitor.refresh()
+
+    def _initialize(self) -> None:
+        try:
+            self._progress("importing")
+            from twitter_scraper import TwitterScraper
+            scraper = TwitterScraper(on_progress=self._progress)
+        except Exception as e:
+            logger.error(f"Failed to initialize TwitterScraper: {str(e)}")
+            with self._lock:
+                self.state = FAILED
+                self.error = str(e)
+                self.failed_at = time.time()
+            self.health_monitor.refresh()
+            return
+        with self._lock:
+            self.scraper = scraper
+            self.state = READY
+            self.stage = None
+            self.error = None
+            self.ready_at = time.time()
+        logger.info(f"Twitter scraper ready after {self.ready_at - self.started_at:.1f}s")
+        self.health_monitor.refresh()
+
+
+_runtime: Optional[ScraperRuntime] = None
+
+
+def get_runtime() -> ScraperRuntime:
+    global _runtime
+    if _runtime is None:
+        _runtime = ScraperRuntime()
+    return _runtime
@@ -0,0 +1,122 @@
+# session_store.py
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+LOCAL_STORAGE_DUMP = """
+var items = {};
+for (var i = 0; i < window.localStorage.length; i++) {
+    var key = window.localStorage.key(i);
+    items[key] = window.localStorage.getItem(key);
+}
+return items;
+"""
+
+LOCAL_STORAGE_LOAD = """
+var items = arguments[0];
+for (var key in items) {
+    window.localStorage.setItem(key, items[key]);
+}
+"""
+
+
+class SessionStore:
+    """On-disk cache of Twitter cookies and localStorage, keyed by account and proxy."""
+
+    def __init__(self, directory: Optional[str] = None, max_age: Optional[float] = None):
+        self.directory = directory or os.getenv('SESSION_STORE_DIR', '.sessions')
+        self.max_age = max_age or float(os.getenv('SESSION_MAX_AGE', 7 * 24 * 3600))
+
+    def _path(self, account: str, proxy: Optional[str]) -> str:
+        key = hashlib.sha256(f"{account}|{proxy or ''}".encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, account: str, proxy: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the cached session if present and not expired."""
+        path = self._path(account, proxy)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to read cached session {path}: {str(e)}")
+            return None
+
+        if time.time() - session.get("saved_at", 0) > self.max_age:
+            logger.info(f"Cached session for {account} has expired")
+            self.invalidate(account, proxy)
+            return None
+        return session
+
+    def load_latest(self, account: str) -> Optional[Dict[str, Any]]:
+        """Return the freshest unexpired session for an account, whichever proxy it was made on."""
+        latest = None
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return None
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    session = json.load(f)
+            except Exception:
+                continue
+            if session.get("account") != account or time.time() - session.get("saved_at", 0) > self.max_age:
+                continue
+            if latest is None or session["saved_at"] > latest["saved_at"]:
+                latest = session
+        return latest
+
+    def save(self, driver, account: str, proxy: Optional[str]) -> None:
+        """Snapshot the driver's cookies and localStorage to disk."""
+        try:
+            session = {
+                "account": account,
+                "proxy": proxy,
+                "saved_at": time.time(),
+                "cookies": driver.get_cookies(),
+                "local_storage": driver.execute_script(LOCAL_STORAGE_DUMP) or {},
+            }
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(account, proxy)
+            tmp_path = f"{path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(session, f)
+            os.replace(tmp_path, path)
+            logger.info(f"Saved session for {account}")
+        except Exception as e:
+            logger.error(f"Failed to save session: {str(e)}")
+
+    def apply(self, driver, session: Dict[str, Any]) -> bool:
+        """Load a cached session into a driver that is already on the x.com origin."""
+        try:
+            driver.delete_all_cookies()
+            for cookie in session.get("cookies", []):
+                cookie = {k: v for k, v in cookie.items() if k != "sameSite" or v in ("Strict", "Lax", "None")}
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as e:
+                    logger.debug(f"Skipping cookie {cookie.get('name')}: {str(e)}")
+            if session.get("local_storage"):
+                driver.execute_script(LOCAL_STORAGE_LOAD, session["local_storage"])
+            return True
+        except Exception as e:
+            logger.error(f"Failed to apply cached session: {str(e)}")
+            return False
+
+    def invalidate(self, account: str, proxy: Optional[str]) -> None:
+        try:
+            os.remove(self._path(account, proxy))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to remove cached session: {str(e)}")
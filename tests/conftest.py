@@ -0,0 +1,41 @@
+# tests/conftest.py
+import os
+import sys
+import socket
+import pytest
+
+# The app is a flat set of modules in the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import proxy_registry
+from proxy_registry import ProxyRegistry
+from benchmarks.fake_twitter import FakeTwitterServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def fixture_path(name: str) -> str:
+    return os.path.join(FIXTURES_DIR, name)
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """A fresh process-wide proxy registry that saves into the test's temp dir."""
+    fresh = ProxyRegistry(proxies=[], path=str(tmp_path / 'proxy_scores.json'))
+    monkeypatch.setattr(proxy_registry, '_registry', fresh)
+    return fresh
+
+
+def dead_proxy() -> str:
+    """host:port of a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.fixture
+def twitter():
+    """The benchmarks' fake Twitter server on a free local port."""
+    server = FakeTwitterServer().start()
+    yield server
+    server.stop()
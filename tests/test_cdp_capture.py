@@ -0,0 +1,82 @@
+# tests/test_cdp_capture.py
+import json
+import pytest
+from conftest import fixture_path
+from cdp_capture import CdpTrendCapture
+
+
+def load_fixture(name):
+    with open(fixture_path(name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def performance_log():
+    return load_fixture('performance_log.json')
+
+
+class RecordedDriver:
+    """Replays a recorded performance log in chunks and serves the recorded response bodies."""
+
+    def __init__(self, log, bodies, chunks=2):
+        size = -(-len(log) // chunks)
+        self.polls = [[]] + [log[i:i + size] for i in range(0, len(log), size)]  # first call discards
+        self.bodies = bodies
+        self.visited = []
+        self.body_requests = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def get_log(self, kind):
+        assert kind == 'performance'
+        return self.polls.pop(0) if self.polls else []
+
+    def execute_cdp_cmd(self, command, params):
+        assert command == 'Network.getResponseBody'
+        self.body_requests.append(params["requestId"])
+        if params["requestId"] not in self.bodies:
+            raise Exception("No resource with given identifier found")
+        return self.bodies[params["requestId"]]
+
+
+def test_parse_performance_log_skips_malformed_entries(performance_log):
+    events = CdpTrendCapture.parse_performance_log(performance_log)
+
+    assert len(events) == len(performance_log) - 2
+    assert all("method" in event for event in events)
+
+
+def test_matching_responses_picks_trend_endpoints_only(performance_log):
+    events = CdpTrendCapture.parse_performance_log(performance_log)
+
+    matches = CdpTrendCapture.matching_responses(events)
+
+    assert [request_id for request_id, _ in matches] == ["1000.12", "1000.15"]
+    assert "/i/api/2/guide.json" in matches[0][1]
+    assert "/ExplorePage" in matches[1][1]
+    assert set(CdpTrendCapture.finished_requests(events)) >= {"1000.12", "1000.15"}
+
+
+def test_capture_reads_trends_from_recorded_responses(performance_log):
+    driver = RecordedDriver(performance_log, load_fixture('cdp_response_bodies.json'))
+
+    trends = CdpTrendCapture.capture(driver, "https://x.com/explore/tabs/trending", timeout=5)
+
+    assert driver.visited == ["https://x.com/explore/tabs/trending"]
+    assert sorted(driver.body_requests) == ["1000.12", "1000.15"]
+    # guide.json first, then the base64-encoded GraphQL body; Bitcoin appears in both and is kept once.
+    assert [trend["name"] for trend in trends] == ["#ChampionsLeague", "Taylor Swift", "Bitcoin", "Formula 1"]
+    assert trends[0]["rank"] == 1
+    assert trends[0]["post_count"] == 48_200
+    assert trends[1]["context"] == "Trending with #Eras, #TS"
+    assert trends[2]["post_count"] is None
+
+
+def test_capture_returns_nothing_without_trend_responses(performance_log):
+    unrelated = [entry for entry in performance_log if "1000.12" not in entry.get("message", "")
+                 and "1000.15" not in entry.get("message", "")]
+    driver = RecordedDriver(unrelated, {})
+
+    assert CdpTrendCapture.capture(driver, timeout=0.5) == []
+    assert driver.body_requests == []
@@ -0,0 +1,19 @@
+# tests/test_driver_manager.py
+from unittest import mock
+import driver_manager
+from driver_manager import DriverManager
+
+
+def test_browser_is_quit_when_a_cdp_call_fails(monkeypatch):
+    driver = mock.Mock()
+    driver.execute_cdp_cmd.side_effect = [None, None, RuntimeError("cdp connection closed")]
+    monkeypatch.setattr(driver_manager.webdriver, 'Chrome', mock.Mock(return_value=driver))
+
+    assert DriverManager.setup_driver(proxy="127.0.0.1:8080", profile='lean') == (None, None)
+    driver.quit.assert_called_once()
+
+
+def test_launch_failure_has_nothing_to_quit(monkeypatch):
+    monkeypatch.setattr(driver_manager.webdriver, 'Chrome', mock.Mock(side_effect=RuntimeError("no chrome")))
+
+    assert DriverManager.setup_driver(proxy="127.0.0.1:8080", profile='lean') == (None, None)
@@ -0,0 +1,183 @@
+# tests/test_driver_pool.py
+import threading
+import time
+import pytest
+from driver_pool import DriverPool, DriverPoolExhausted, PooledDriver
+from scrape_errors import LoginRejected
+
+PROXY = "127.0.0.1:8080"
+
+
+class FakeBrowser:
+    """Answers the pool's health probe until it is told it died."""
+
+    def __init__(self):
+        self.alive = True
+        self.quit_calls = 0
+
+    def execute_script(self, script, *args):
+        if not self.alive:
+            raise RuntimeError("invalid session id")
+        return "complete"
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FakeFactory:
+    """Stands in for DriverPool._create: launches fake browsers, optionally slowly or failing."""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.created = []
+        self.threads = []
+
+    def __call__(self):
+        self.threads.append(threading.current_thread())
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        browser = FakeBrowser()
+        self.created.append(browser)
+        return PooledDriver(browser, PROXY)
+
+
+def make_pool(factory, size=1, **options):
+    pool = DriverPool(size=size, acquire_timeout=2, proxy=PROXY, **options)
+    pool._create = factory
+    return pool
+
+
+def eventually(check, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            pytest.fail("condition not reached in time")
+        time.sleep(0.01)
+
+
+def counts(pool):
+    stats = pool.stats()
+    return stats["idle"], stats["leased"], stats["starting"]
+
+
+def test_acquire_warms_a_driver_off_the_calling_thread():
+    factory = FakeFactory()
+    pool = make_pool(factory)
+
+    pooled = pool.acquire()
+
+    assert factory.threads and factory.threads[0] is not threading.current_thread()
+    assert pooled.uses == 1
+    assert counts(pool) == (0, 1, 0)
+
+
+def test_released_driver_is_reused():
+    factory = FakeFactory()
+    pool = make_pool(factory)
+
+    first = pool.acquire()
+    pool.release(first)
+    assert counts(pool) == (1, 0, 0)
+    second = pool.acquire()
+
+    assert second is first
+    assert len(factory.created) == 1
+    assert second.uses == 2
+
+
+def test_full_pool_times_out_and_forgets_the_waiter():
+    pool = make_pool(FakeFactory())
+    pool.acquire()
+
+    with pytest.raises(DriverPoolExhausted):
+        pool.acquire(timeout=0.1)
+
+    assert pool.stats()["waiting"] == 0
+    assert counts(pool) == (0, 1, 0)
+
+
+def test_failed_warm_up_reaches_the_caller_and_frees_the_slot():
+    pool = make_pool(FakeFactory(error=LoginRejected("Twitter rejected the login")))
+
+    with pytest.raises(LoginRejected):
+        pool.acquire()
+
+    assert counts(pool) == (0, 0, 0)
+
+
+def test_late_driver_is_kept_for_the_next_caller():
+    factory = FakeFactory(delay=0.3)
+    pool = make_pool(factory)
+
+    with pytest.raises(DriverPoolExhausted):
+        pool.acquire(timeout=0.05)
+    eventually(lambda: counts(pool) == (1, 0, 0))
+
+    assert pool.acquire() is not None
+    assert len(factory.created) == 1
+
+
+def test_retired_idle_driver_is_replaced():
+    factory = FakeFactory()
+    pool = make_pool(factory)
+    pooled = pool.acquire()
+    pool.release(pooled)
+
+    pool.retire(pooled)
+
+    assert pooled.driver.quit_calls == 1
+    eventually(lambda: counts(pool) == (1, 0, 0))
+    assert len(factory.created) == 2
+
+
+def test_retired_leased_driver_is_discarded_on_release():
+    factory = FakeFactory()
+    pool = make_pool(factory)
+    pooled = pool.acquire()
+
+    pool.retire(pooled)
+    assert pooled.driver.quit_calls == 0
+    pool.release(pooled)
+
+    assert pooled.driver.quit_calls == 1
+    eventually(lambda: counts(pool) == (1, 0, 0))
+    assert len(factory.created) == 2
+
+
+def test_worn_out_driver_is_recycled():
+    factory = FakeFactory()
+    pool = make_pool(factory, max_uses=1)
+
+    pooled = pool.acquire()
+    pool.release(pooled)
+
+    assert pooled.driver.quit_calls == 1
+    eventually(lambda: counts(pool) == (1, 0, 0))
+
+
+def test_prune_replaces_dead_drivers():
+    factory = FakeFactory()
+    pool = make_pool(factory, size=2)
+    pool.start()
+    assert counts(pool) == (2, 0, 0)
+    factory.created[0].alive = False
+
+    assert pool.prune() == 1
+
+    eventually(lambda: counts(pool) == (2, 0, 0))
+    assert len(factory.created) == 3
+    assert factory.created[0].quit_calls == 1
+
+
+def test_close_quits_idle_drivers_and_refuses_leases():
+    factory = FakeFactory()
+    pool = make_pool(factory, size=2)
+    pool.start()
+
+    pool.close()
+
+    assert all(browser.quit_calls == 1 for browser in factory.created)
+    with pytest.raises(DriverPoolExhausted):
+        pool.acquire(timeout=0.1)
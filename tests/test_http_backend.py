@@ -0,0 +1,107 @@
+# tests/test_http_backend.py
+import httpx
+import pytest
+from benchmarks.fake_twitter import FakeTwitterServer, CookieDriver, session_cookies
+from benchmarks.forward_proxy import ForwardProxy
+from conftest import dead_proxy
+from scraper_backend import HttpBackend
+from scrape_errors import LoginRejected
+from session_store import SessionStore
+
+ACCOUNT = "trends_bot"
+LOGGED_IN = session_cookies("a1b2c3")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(directory=str(tmp_path / 'sessions'))
+
+
+def base_url(server):
+    host, port = server.address
+    return f"http://{host}:{port}"
+
+
+def make_backend(store, url, cookies=LOGGED_IN, proxy=None):
+    store.save(CookieDriver(cookies), ACCOUNT, proxy)
+    return HttpBackend(session_store=store, base_url=url, bearer_token="test-token", account=ACCOUNT, timeout=5)
+
+
+def test_fetches_trends_with_a_cached_session(twitter, store, registry):
+    backend = make_backend(store, base_url(twitter))
+    try:
+        trends, proxy = backend.fetch_trends()
+    finally:
+        backend.close()
+
+    assert proxy is None
+    assert len(trends) == 30
+    assert trends[0] == {"name": "#WorldCupFinal", "rank": 1, "category": "Politics", "post_count": 1204,
+                         "post_count_text": "1,204 posts", "context": None}
+    assert backend.ready()
+
+
+def test_fetches_through_the_session_proxy(twitter, store, registry):
+    forward = ForwardProxy(twitter.address).start()
+    # The made-up host only resolves through the proxy, which forwards everything to the fake server.
+    backend = make_backend(store, "http://x.test", proxy=forward.proxy)
+    try:
+        trends, proxy = backend.fetch_trends()
+    finally:
+        backend.close()
+        forward.stop()
+
+    assert proxy == forward.proxy
+    assert trends[1]["name"] == "Taylor Swift"
+    assert forward.stats()["requests"] == 1
+    assert registry.is_healthy(forward.proxy)
+
+
+def test_rejected_session_is_dropped(twitter, store, registry):
+    backend = make_backend(store, base_url(twitter), cookies=[{"name": "auth_token", "value": "a1b2c3"}])
+    try:
+        with pytest.raises(LoginRejected):
+            backend.fetch_trends()
+    finally:
+        backend.close()
+
+    assert store.load(ACCOUNT, None) is None
+    assert not backend.ready()
+
+
+def test_a_bearer_token_is_required(store, monkeypatch):
+    monkeypatch.delenv('TWITTER_WEB_BEARER_TOKEN', raising=False)
+
+    with pytest.raises(ValueError):
+        HttpBackend(session_store=store, base_url="http://x.test", account=ACCOUNT)
+
+
+def test_server_errors_are_raised(store, registry):
+    server = FakeTwitterServer(failure_rate=1.0).start()
+    backend = make_backend(store, base_url(server))
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            backend.fetch_trends()
+    finally:
+        backend.close()
+        server.stop()
+
+    assert store.load(ACCOUNT, None) is not None  # a 503 says nothing about the session
+
+
+def test_dead_proxy_cools_down_and_drops_its_client(store, registry):
+    dead = dead_proxy()
+    backend = make_backend(store, "http://x.test", proxy=dead)
+    try:
+        with pytest.raises(httpx.TransportError):
+            backend.fetch_trends()
+        assert backend.status()["open_clients"] == 1
+
+        backend.retire_failed()
+
+        assert backend.status()["open_clients"] == 0
+    finally:
+        backend.close()
+
+    assert not registry.is_healthy(dead)
+    assert store.load(ACCOUNT, dead) is None
@@ -0,0 +1,106 @@
+# tests/test_proxy_validator.py
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from benchmarks.forward_proxy import ForwardProxy
+from conftest import dead_proxy
+from proxy_validator import ProxyValidator
+
+
+class AuthRequiredProxy:
+    """A stand-in proxy that answers every request with 407."""
+
+    def __init__(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(407, 'Proxy Authentication Required')
+                self.send_header('Proxy-Authenticate', 'Basic realm="proxy"')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def proxy(self):
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def good_proxy(twitter):
+    proxy = ForwardProxy(twitter.address).start()
+    yield proxy
+    proxy.stop()
+
+
+@pytest.fixture
+def auth_proxy():
+    proxy = AuthRequiredProxy()
+    yield proxy
+    proxy.stop()
+
+
+def make_validator(registry, path="/robots.txt", concurrency=None):
+    # The made-up host is only reachable through the stand-in proxies.
+    return ProxyValidator(registry=registry, test_url=f"http://x.test{path}", timeout=3, concurrency=concurrency)
+
+
+def test_working_proxy_is_known_good(registry, good_proxy):
+    validator = make_validator(registry)
+
+    assert validator.validate([good_proxy.proxy]) == [good_proxy.proxy]
+    assert validator.get_known_good() == [good_proxy.proxy]
+    assert registry.is_healthy(good_proxy.proxy)
+    assert good_proxy.stats()["requests"] == 1
+
+
+def test_proxy_demanding_auth_is_rejected(registry, auth_proxy):
+    validator = make_validator(registry)
+
+    assert validator.validate([auth_proxy.proxy]) == []
+    assert not registry.is_healthy(auth_proxy.proxy)
+    assert "HTTP 407" in registry.snapshot()[auth_proxy.proxy]["last_error"]
+
+
+def test_forbidden_response_is_a_failure(registry, good_proxy):
+    # guide.json answers 403 without a session, as a blocking target would.
+    validator = make_validator(registry, "/i/api/2/guide.json")
+
+    assert validator.validate([good_proxy.proxy]) == []
+    assert "HTTP 403" in registry.snapshot()[good_proxy.proxy]["last_error"]
+
+
+def test_validate_keeps_only_passing_proxies(registry, good_proxy, auth_proxy):
+    failing = ForwardProxy(good_proxy.upstream, failure_rate=1.0).start()
+    dead = dead_proxy()
+    try:
+        validator = make_validator(registry)
+        good = validator.validate([dead, auth_proxy.proxy, failing.proxy, good_proxy.proxy])
+    finally:
+        failing.stop()
+
+    assert good == [good_proxy.proxy]
+    assert [proxy for proxy in (dead, auth_proxy.proxy, failing.proxy) if registry.is_healthy(proxy)] == []
+
+
+def test_probes_never_exceed_the_concurrency_bound(registry, twitter):
+    slow = ForwardProxy(twitter.address, latency=0.2).start()
+    # Distinct proxy entries (by username) that all reach the same stand-in proxy.
+    proxies = [f"probe{i}:secret@{slow.proxy}" for i in range(12)]
+    try:
+        good = make_validator(registry, concurrency=3).validate(proxies)
+    finally:
+        slow.stop()
+
+    assert sorted(good) == sorted(proxies)
+    assert slow.stats()["requests"] == 12
+    assert 2 <= slow.stats()["peak_in_flight"] <= 3
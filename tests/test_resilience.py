@@ -0,0 +1,118 @@
+# tests/test_resilience.py
+import threading
+import pytest
+from resilience import CircuitBreaker, ResilientBackend, CLOSED, OPEN, HALF_OPEN
+from scrape_errors import CircuitOpen, DomChanged, LoginRejected
+from scraper_backend import ScraperBackend
+
+
+class ScriptedBackend(ScraperBackend):
+    """Raises the scripted errors in turn, then succeeds."""
+
+    name = "scripted"
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.retired = 0
+
+    def fetch_trends(self, url=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [{"name": "#A", "rank": 1}], None
+
+    def retire_failed(self):
+        self.retired += 1
+
+
+def resilient(backend, account):
+    return ResilientBackend(backend, account=account, max_retries=3, base_delay=0.001, max_delay=0.001)
+
+
+def test_dom_change_is_not_retried_and_keeps_the_driver():
+    backend = ScriptedBackend(DomChanged("No trends found"))
+
+    with pytest.raises(DomChanged):
+        resilient(backend, "dom").fetch_trends()
+
+    assert backend.calls == 1
+    assert backend.retired == 0
+
+
+def test_driver_failures_are_retried_on_a_fresh_driver():
+    backend = ScriptedBackend(TimeoutError("page load timed out"), ConnectionError("connection reset"))
+
+    trends, _ = resilient(backend, "flaky").fetch_trends()
+
+    assert trends[0]["name"] == "#A"
+    assert backend.calls == 3
+    assert backend.retired == 2
+
+
+def test_other_failures_are_retried_without_retiring():
+    backend = ScriptedBackend(ValueError("unexpected payload"))
+
+    resilient(backend, "odd").fetch_trends()
+
+    assert backend.calls == 2
+    assert backend.retired == 0
+
+
+def test_open_breaker_fails_fast():
+    backend = ScriptedBackend(*[LoginRejected("bad password")] * 3)
+    wrapped = resilient(backend, "locked")
+
+    with pytest.raises(LoginRejected):
+        wrapped.fetch_trends()
+    with pytest.raises(CircuitOpen):
+        wrapped.fetch_trends()
+
+    assert wrapped.breaker.state == OPEN
+    assert backend.calls == 3
+
+
+def test_half_open_admits_a_single_probe():
+    breaker = CircuitBreaker("probe", threshold=1, reset_timeout=60)
+    breaker.record_failure("boom")
+    breaker.open_until = 0  # reset timeout elapsed
+    assert breaker.state == HALF_OPEN
+
+    assert breaker.allow()
+    others = []
+    thread = threading.Thread(target=lambda: others.append(breaker.allow()))
+    thread.start()
+    thread.join()
+    assert others == [False]
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_released_probe_lets_the_next_call_through():
+    breaker = CircuitBreaker("released", threshold=1, reset_timeout=60)
+    breaker.record_failure("boom")
+    breaker.open_until = 0
+
+    assert breaker.allow()
+    breaker.release()
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(breaker.allow()))
+    thread.start()
+    thread.join()
+    assert results == [True]
+
+
+def test_failed_probe_reopens_for_longer():
+    breaker = CircuitBreaker("reopen", threshold=1, reset_timeout=60)
+    breaker.record_failure("boom")
+    breaker.open_until = 0
+
+    assert breaker.allow()
+    breaker.record_failure("still failing")
+
+    assert breaker.state == OPEN
+    assert 100 < breaker.retry_in() <= 120
+    assert not breaker.allow()
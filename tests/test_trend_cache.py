@@ -0,0 +1,36 @@
+# tests/test_trend_cache.py
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from trend_cache import TrendCache
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.trending_topics
+
+
+def scrape(name, seconds_ago=0, **extra):
+    return dict({"trends": [name], "datetime": datetime.now() - timedelta(seconds=seconds_ago)}, **extra)
+
+
+def test_serves_the_web_apps_latest_stored_record(collection):
+    collection.insert_many([scrape("Own", seconds_ago=5), scrape("Scheduled", account="bot", region="us")])
+    cache = TrendCache(lambda: pytest.fail("should not scrape"), collection=collection, ttl=60, use_store=True)
+
+    assert cache.get()["trends"] == ["Own"]
+
+
+def test_scrapes_when_only_other_targets_stored_recently(collection):
+    collection.insert_many([scrape("Old", seconds_ago=600), scrape("Scheduled", account="bot", region="us")])
+    cache = TrendCache(lambda: {"trends": ["Fresh"]}, collection=collection, ttl=60, use_store=True)
+
+    assert cache.get()["trends"] == ["Fresh"]
+
+
+def test_scope_selects_a_target(collection):
+    collection.insert_many([scrape("Own"), scrape("Scheduled", seconds_ago=5, account="bot", region="us")])
+    cache = TrendCache(lambda: pytest.fail("should not scrape"), collection=collection, ttl=60,
+                       use_store=True, scope={"account": "bot", "region": "us"})
+
+    assert cache.get()["trends"] == ["Scheduled"]
@@ -0,0 +1,119 @@
+# tests/test_trend_export.py
+import io
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from bson import json_util
+from trend_deltas import TrendChangeDetector
+from trend_export import TrendExporter, EXTRA_COLUMN
+from trend_storage import TrendStorage
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+START = datetime(2026, 3, 1, 9, 0)
+FORMATS = ('jsonl', 'parquet', 'arrow')
+
+
+@pytest.fixture(scope='module')
+def db():
+    db = mongomock.MongoClient().db
+    storage = TrendStorage(db)
+    storage.ensure_schema()
+    detector = TrendChangeDetector(snapshot_interval=3600, enabled=True)
+    scrapes = [["#A", "B", "C"], ["B", "#A", "D"], ["B", "#A", "D"]]
+    storage.insert_many([detector.process({
+        "_id": f"s{i}",
+        "datetime": START + timedelta(minutes=5 * i),
+        "trends": names,
+        "trend_details": [{"name": name, "rank": rank, "post_count_text": "12K posts"}
+                          for rank, name in enumerate(names, start=1)],
+        "proxy": "10.0.0.1:8080",
+        "backend": "selenium",
+        "account": "acc",
+        "region": "us",
+        "job_id": "job-1",  # not in the columnar schema, so it travels in `extra`
+    }) for i, names in enumerate(scrapes)])
+    return db
+
+
+def export(db, fmt, source, batch_size=2, **filters):
+    """Run an export and read it back as a list of dicts."""
+    data = b''.join(TrendExporter(db, batch_size=batch_size).stream(fmt, source, **filters))
+    if fmt == 'jsonl':
+        return [json_util.loads(line) for line in data.decode().splitlines()]
+    if fmt == 'parquet':
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_stream(data).read_all()
+    return table.to_pylist()
+
+
+def stored(db, collection):
+    return list(db[collection].find({}, sort=[("datetime", 1), ("_id", 1)]))
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_points_round_trip(db, fmt):
+    rows = export(db, fmt, 'points')
+
+    expected = stored(db, 'trend_points')
+    assert len(rows) == len(expected) == 9
+    key = lambda row: (row["datetime"], row["_id"])
+    for row, document in zip(sorted(rows, key=key), sorted(expected, key=key)):
+        assert {field: row[field] for field in document} == document
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_scrapes_round_trip(db, fmt):
+    rows = export(db, fmt, 'scrapes')
+
+    (document,) = stored(db, 'trending_topics')
+    (row,) = rows
+    assert row["_id"] == document["_id"] == "s0"
+    assert row["datetime"] == START
+    assert row["trends"] == ["#A", "B", "C"]
+    assert [detail["name"] for detail in row["trend_details"]] == ["#A", "B", "C"]
+    assert row["trend_details"][0]["post_count_text"] == "12K posts"
+    assert row["change"]["kind"] == "snapshot"
+    if fmt == 'jsonl':
+        assert row == document
+    else:
+        assert json_util.loads(row[EXTRA_COLUMN]) == {"job_id": "job-1"}
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_deltas_round_trip(db, fmt):
+    rows = export(db, fmt, 'deltas')
+
+    (document,) = stored(db, 'trend_deltas')
+    (row,) = rows
+    for field in ("_id", "datetime", "account", "region", "writer", "base", "prev", "left"):
+        assert row[field] == document[field]
+    assert [trend["name"] for trend in row["entered"]] == ["D"]
+    assert {(moved["name"], moved["from"], moved["to"]) for moved in row["rank_changed"]} == \
+        {("#A", 1, 2), ("B", 2, 1)}
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('source', ('points', 'scrapes', 'deltas'))
+def test_empty_range_is_a_valid_file(db, fmt, source):
+    since = START + timedelta(days=1)
+
+    assert export(db, fmt, source, since=since) == []
+
+
+@pytest.mark.parametrize('fmt', ('parquet', 'arrow'))
+def test_empty_columnar_export_keeps_the_schema(db, fmt):
+    data = b''.join(TrendExporter(db).stream(fmt, 'points', since=START + timedelta(days=1)))
+    table = pq.read_table(io.BytesIO(data)) if fmt == 'parquet' else pa.ipc.open_stream(data).read_all()
+
+    assert table.num_rows == 0
+    assert {"datetime", "trend", "rank", "scrape_id"} <= set(table.column_names)
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_filters_by_range_and_trend(db, fmt):
+    rows = export(db, fmt, 'points', since=START + timedelta(minutes=5), trends=["D"])
+
+    assert [(row["scrape_id"], row["trend"]) for row in rows] == [("s1", "D"), ("s2", "D")]
@@ -0,0 +1,54 @@
+# tests/test_trend_extractor.py
+import pytest
+from conftest import fixture_path
+from trend_extractor import TrendExtractor
+
+
+@pytest.fixture
+def explore_html():
+    with open(fixture_path('explore_trending.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_from_html_reads_the_trending_section_only(explore_html):
+    trends = TrendExtractor.from_html(explore_html)
+
+    assert [trend["name"] for trend in trends] == ["#ChampionsLeague", "Taylor Swift", "Bitcoin", "Formula 1"]
+    assert [trend["rank"] for trend in trends] == [1, 2, 3, 4]
+
+
+def test_from_html_parses_categories_counts_and_context(explore_html):
+    first, second, third, fourth = TrendExtractor.from_html(explore_html)
+
+    assert first["category"] == "Sports"
+    assert first["post_count"] == 48_200
+    assert second["category"] == "Trending in United States"
+    assert second["post_count"] == 1_204
+    assert second["context"].startswith("Trending with #Eras")
+    assert third["category"] == "Business & finance"
+    assert third["post_count"] == 2_400_000
+    assert fourth["category"] is None
+    assert fourth["post_count"] is None
+
+
+def test_from_html_without_trends():
+    assert TrendExtractor.from_html("<html><body><div data-testid='primaryColumn'></div></body></html>") == []
+
+
+@pytest.mark.parametrize("lines, expected", [
+    (["1 · Sports · Trending", "#Final", "12.3K posts"],
+     {"name": "#Final", "rank": 1, "category": "Sports", "post_count": 12_300, "post_count_text": "12.3K posts"}),
+    (["Trending", "Lakers"], {"name": "Lakers", "rank": 7, "category": None, "post_count": None}),
+    (["3 · Trending", "Elon", "Trending with Tesla, SpaceX", "98,100 posts"],
+     {"name": "Elon", "rank": 3, "context": "Trending with Tesla, SpaceX", "post_count": 98_100}),
+    (["Politics · Trending", "  #Budget  ", ""], {"name": "#Budget", "rank": 7, "category": "Politics"}),
+])
+def test_parse_trend_lines(lines, expected):
+    trend = TrendExtractor.parse_trend_lines(lines, 7)
+
+    for key, value in expected.items():
+        assert trend[key] == value
+
+
+def test_parse_trend_lines_without_a_name():
+    assert TrendExtractor.parse_trend_lines(["1 · Sports · Trending", "12K posts"], 1) is None
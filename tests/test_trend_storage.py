@@ -0,0 +1,215 @@
+# tests/test_trend_storage.py
+from datetime import datetime, timedelta
+from unittest import mock
+import mongomock
+import pytest
+from trend_deltas import TrendChangeDetector
+from trend_rollups import TrendRollups, RebuildUnsupported
+from trend_storage import TrendStorage
+
+START = datetime(2026, 3, 1, 9, 0)
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def storage(db):
+    storage = TrendStorage(db, rollups=TrendRollups(db))
+    storage.ensure_schema()
+    storage.rollups.ensure_indexes()
+    return storage
+
+
+def scrape(scrape_id, names, minutes=0, account="acc", region="us"):
+    return {
+        "_id": scrape_id,
+        "datetime": START + timedelta(minutes=minutes),
+        "trends": names,
+        "trend_details": [{"name": name, "rank": rank} for rank, name in enumerate(names, start=1)],
+        "proxy": "10.0.0.1:8080",
+        "backend": "selenium",
+        "account": account,
+        "region": region,
+    }
+
+
+def annotate(*records, detector=None):
+    detector = detector or TrendChangeDetector(snapshot_interval=3600, enabled=True)
+    return [detector.process(record) for record in records]
+
+
+def appearances(db, trend):
+    return db.trend_summaries.find_one({"_id": trend})["appearances"]
+
+
+def test_snapshot_is_stored_with_one_point_per_trend(storage, db):
+    storage.insert_many(annotate(scrape("s1", ["#A", "B"])))
+
+    assert db.trending_topics.count_documents({}) == 1
+    points = list(db.trend_points.find({}, sort=[("rank", 1)]))
+    assert [point["_id"] for point in points] == ["s1|#A", "s1|B"]
+    assert [point["trend"] for point in points] == ["#A", "B"]
+    assert points[0]["account"] == "acc"
+    assert appearances(db, "#A") == 1
+    assert db.trend_rollups_hourly.find_one({"trend": "B"})["count"] == 1
+
+
+def test_delta_stores_changes_and_a_point_for_every_trend(storage, db):
+    records = annotate(scrape("s1", ["#A", "B", "C"]), scrape("s2", ["B", "#A", "D"], minutes=5))
+    storage.insert_many(records)
+
+    delta = db.trend_deltas.find_one({"_id": "s2"})
+    assert [trend["name"] for trend in delta["entered"]] == ["D"]
+    assert delta["left"] == ["C"]
+    assert {moved["name"] for moved in delta["rank_changed"]} == {"#A", "B"}
+    assert delta["base"] == "s1" and delta["prev"] == "s1"
+    assert sorted(point["trend"] for point in db.trend_points.find({"scrape_id": "s2"})) == ["#A", "B", "D"]
+    assert appearances(db, "#A") == 2
+    assert appearances(db, "D") == 1
+
+
+def test_state_at_replays_deltas_onto_the_snapshot(storage):
+    storage.insert_many(annotate(
+        scrape("s1", ["#A", "B", "C"]),
+        scrape("s2", ["B", "#A", "D"], minutes=5),
+        scrape("s3", ["B", "#A", "D"], minutes=10),
+    ))
+
+    state = storage.state_at(START + timedelta(minutes=7), "acc", "us")
+
+    assert state["snapshot_id"] == "s1"
+    assert state["as_of"] == START + timedelta(minutes=5)
+    assert state["trends"] == ["B", "#A", "D"]
+    assert storage.state_at(START - timedelta(minutes=1), "acc", "us") is None
+
+
+def test_state_at_replays_only_the_latest_writers_chain(storage):
+    # Two workers scrape the same key, each diffing against its own memory.
+    first = TrendChangeDetector(snapshot_interval=3600, enabled=True)
+    second = TrendChangeDetector(snapshot_interval=3600, enabled=True)
+    second.writer = "other-host:2"
+    storage.insert_many(annotate(scrape("a1", ["#A", "B"]), detector=first))
+    storage.insert_many(annotate(scrape("b1", ["X", "Y"], minutes=1), detector=second))
+    storage.insert_many(annotate(scrape("a2", ["B", "#A", "C"], minutes=2), detector=first))
+
+    state = storage.state_at(START + timedelta(minutes=3), "acc", "us")
+
+    assert state["snapshot_id"] == "a1"
+    assert state["trends"] == ["B", "#A", "C"]
+    assert storage.state_at(START + timedelta(minutes=1), "acc", "us")["trends"] == ["X", "Y"]
+
+
+def test_state_at_falls_back_to_points_after_a_lost_delta(storage, db):
+    storage.insert_many(annotate(
+        scrape("s1", ["#A", "B"]),
+        scrape("s2", ["B", "#A"], minutes=5),
+        scrape("s3", ["B", "C"], minutes=10),
+    ))
+    db.trend_deltas.delete_one({"_id": "s2"})
+
+    state = storage.state_at(START + timedelta(minutes=11), "acc", "us")
+
+    assert state["scrape_id"] == "s3"
+    assert state["as_of"] == START + timedelta(minutes=10)
+    assert state["trends"] == ["B", "C"]
+
+
+def test_unchanged_scrapes_store_points_only(storage, db):
+    storage.insert_many(annotate(scrape("s1", ["#A"]), scrape("s2", ["#A"], minutes=5)))
+
+    assert db.trending_topics.count_documents({}) == 1
+    assert db.trend_deltas.count_documents({}) == 0
+    assert db.trend_points.count_documents({}) == 2
+    assert appearances(db, "#A") == 2
+    assert [point["datetime"] for point in storage.history("#A")] == [START, START + timedelta(minutes=5)]
+
+
+def test_rebuild_reproduces_rollups_written_in_delta_mode(storage, db):
+    storage.insert_many(annotate(scrape("s1", ["#A", "B"]), scrape("s2", ["B", "#A"], minutes=5),
+                                 scrape("s3", ["B", "#A"], minutes=10)))
+    hourly = list(db.trend_rollups_hourly.find({}, {"_id": 0}).sort("trend", 1))
+
+    assert storage.rollups.rebuild(db.trend_points) == 6
+
+    assert list(db.trend_rollups_hourly.find({}, {"_id": 0}).sort("trend", 1)) == hourly
+    assert appearances(db, "#A") == 3
+
+
+def test_rebuild_refuses_ranges_with_sparse_legacy_deltas(storage, db):
+    db.trend_deltas.insert_one({"_id": "old", "datetime": START, "account": "acc", "region": "us",
+                                "entered": [], "left": ["#A"], "rank_changed": []})
+
+    with pytest.raises(RebuildUnsupported):
+        storage.rollups.rebuild(db.trend_points)
+    assert storage.rollups.rebuild(db.trend_points, since=START + timedelta(days=1)) == 0
+
+
+def test_repeated_batch_is_stored_and_counted_once(storage, db):
+    records = annotate(scrape("s1", ["#A", "B"]), scrape("s2", ["B", "C"], minutes=5),
+                       scrape("s3", ["B", "C"], minutes=10))
+
+    storage.insert_many(records)
+    storage.insert_many(records)
+
+    assert db.trending_topics.count_documents({}) == 1
+    assert db.trend_deltas.count_documents({}) == 1
+    assert db.trend_points.count_documents({}) == 6
+    assert appearances(db, "B") == 3
+    assert appearances(db, "C") == 2
+
+
+def test_retry_after_failed_points_write_fills_the_gap(storage, db):
+    records = annotate(scrape("s1", ["#A", "B"]))
+
+    with mock.patch.object(storage.points, 'insert_many', side_effect=RuntimeError("connection reset")):
+        with pytest.raises(RuntimeError):
+            storage.insert_many(records)
+    assert db.trending_topics.count_documents({}) == 1
+    assert db.trend_points.count_documents({}) == 0
+
+    storage.insert_many(records)
+
+    assert db.trend_points.count_documents({}) == 2
+    assert appearances(db, "#A") == 1
+
+
+def test_migrate_legacy_is_safe_to_rerun(storage, db):
+    db.trending_topics.insert_many([
+        {"datetime": START, "trends": ["Old", "Older"]},
+        {"datetime": START + timedelta(hours=1), "trends": ["Old"]},
+    ])
+
+    assert storage.migrate_legacy(batch_size=1) == 2
+    # A crash before the documents were flagged means the next run sees them again.
+    db.trending_topics.update_many({}, {"$unset": {"points_migrated": ""}})
+    assert storage.migrate_legacy() == 2
+
+    assert db.trend_points.count_documents({"trend": "Old"}) == 2
+    assert appearances(db, "Old") == 2
+    assert storage.first_seen("Older") == START
+    assert [point["datetime"] for point in storage.history("Old")] == [START, START + timedelta(hours=1)]
+
+
+def test_stored_points_lookup_is_bounded_by_time_and_trend(storage):
+    records = annotate(scrape("s1", ["#A", "B"]), scrape("s2", ["B", "C"], minutes=5))
+
+    with mock.patch.object(storage.points, 'find', wraps=storage.points.find) as find:
+        storage.insert_many(records)
+
+    query = find.call_args.args[0]
+    assert query["datetime"] == {"$gte": START, "$lte": START + timedelta(minutes=5)}
+    assert sorted(query["trend"]["$in"]) == ["#A", "B", "C"]
+
+
+def test_timeline_includes_the_bucket_the_window_starts_in(storage):
+    seen = datetime.now() - timedelta(hours=1, minutes=50)
+    storage.rollups.update([{"datetime": seen, "trend": "#A", "rank": 1}])
+
+    hourly = storage.rollups.timeline("#A", timedelta(hours=1, minutes=55))
+    daily = storage.rollups.timeline("#A", timedelta(hours=1, minutes=55), granularity='day')
+
+    assert [row["bucket"] for row in hourly] == [seen.replace(minute=0, second=0, microsecond=0)]
+    assert [row["bucket"] for row in daily] == [seen.replace(hour=0, minute=0, second=0, microsecond=0)]
@@ -0,0 +1,65 @@
+# tests/test_twitter_login.py
+import pytest
+from selenium.common.exceptions import WebDriverException
+from scrape_errors import LoginUnreachable
+from session_store import SessionStore
+from twitter_login import TwitterLogin
+
+ACCOUNT = "trends_bot"
+PROXY = "127.0.0.1:8080"
+
+
+class BrowserStub:
+    """A driver whose page loads end on a chosen URL, or fail like a dead proxy."""
+
+    def __init__(self, lands_on=None, error=None):
+        self.lands_on = lands_on
+        self.error = error
+        self.current_url = "about:blank"
+
+    def get(self, url):
+        if self.error:
+            raise WebDriverException(self.error)
+        self.current_url = self.lands_on if url.endswith("/home") and self.lands_on else url
+
+    def get_cookies(self):
+        return [{"name": "auth_token", "value": "a1b2c3"}, {"name": "ct0", "value": "csrf123"}]
+
+    def delete_all_cookies(self):
+        pass
+
+    def add_cookie(self, cookie):
+        pass
+
+    def execute_script(self, script, *args):
+        return {}
+
+    def find_elements(self, by, selector):
+        return [object()] if self.current_url.endswith("/home") else []
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(directory=str(tmp_path / 'sessions'))
+    store.save(BrowserStub(), ACCOUNT, PROXY)
+    return store
+
+
+def test_valid_session_is_restored(store):
+    assert TwitterLogin.restore_session(BrowserStub(), store, ACCOUNT, PROXY)
+    assert store.load(ACCOUNT, PROXY) is not None
+
+
+def test_network_error_keeps_the_session(store):
+    driver = BrowserStub(error="unknown error: net::ERR_PROXY_CONNECTION_FAILED")
+
+    with pytest.raises(LoginUnreachable):
+        TwitterLogin.restore_session(driver, store, ACCOUNT, PROXY)
+    assert store.load(ACCOUNT, PROXY) is not None
+
+
+def test_login_redirect_drops_the_session(store):
+    driver = BrowserStub(lands_on="https://x.com/i/flow/login")
+
+    assert not TwitterLogin.restore_session(driver, store, ACCOUNT, PROXY)
+    assert store.load(ACCOUNT, PROXY) is None
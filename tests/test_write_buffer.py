@@ -0,0 +1,174 @@
+# tests/test_write_buffer.py
+import os
+import time
+from datetime import datetime
+import mongomock
+import pytest
+from pymongo.errors import AutoReconnect
+from write_buffer import WriteBehindBuffer
+
+START = datetime(2026, 3, 1, 9, 0)
+
+
+class FlakyCollection:
+    """A mongomock collection that refuses writes while `down`, or after `fail_after` inserts."""
+
+    def __init__(self, collection, down=False, fail_after=None):
+        self.collection = collection
+        self.down = down
+        self.fail_after = fail_after
+        self.inserts = 0
+
+    def insert_many(self, documents, ordered=True):
+        if self.down or (self.fail_after is not None and self.inserts >= self.fail_after):
+            raise AutoReconnect("connection refused")
+        self.inserts += 1
+        return self.collection.insert_many(documents, ordered=ordered)
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.trending_topics
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    return str(tmp_path / 'pending_writes.jsonl')
+
+
+def records(count, start=0):
+    return [{"_id": f"s{i}", "datetime": START, "trends": [f"#T{i}"]} for i in range(start, start + count)]
+
+
+def make_buffer(collection, spill_path, **options):
+    options.setdefault('flush_interval', 60)
+    return WriteBehindBuffer(collection, batch_size=options.pop('batch_size', 2), max_retries=1,
+                             spill_path=spill_path, **options)
+
+
+def eventually(check, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            pytest.fail("condition not reached in time")
+        time.sleep(0.01)
+
+
+def spilled_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [line for line in f if line.strip()]
+
+
+def test_full_batch_is_written_without_waiting_for_the_interval(collection, spill_path):
+    buffer = make_buffer(collection, spill_path)
+    try:
+        for record in records(2):
+            buffer.add(record)
+        eventually(lambda: collection.count_documents({}) == 2)
+    finally:
+        buffer.close()
+
+    assert buffer.stats()["written"] == 2
+
+
+def test_failed_batch_spills_to_disk(collection, spill_path):
+    buffer = make_buffer(FlakyCollection(collection, down=True), spill_path, batch_size=10)
+    for record in records(3):
+        buffer.add(record)
+
+    buffer.flush()
+
+    assert len(spilled_lines(spill_path)) == 3
+    assert collection.count_documents({}) == 0
+    assert buffer.stats()["spilled"] == 3
+    buffer.collection.down = False
+    buffer.close()
+
+
+def test_spill_is_replayed_after_a_restart(collection, spill_path):
+    down = make_buffer(FlakyCollection(collection, down=True), spill_path, batch_size=10)
+    for record in records(3):
+        down.add(record)
+    down.close()
+    assert os.path.exists(spill_path)
+
+    restarted = make_buffer(collection, spill_path, flush_interval=0.05)
+    try:
+        eventually(lambda: collection.count_documents({}) == 3)
+    finally:
+        restarted.close()
+
+    assert not os.path.exists(spill_path)
+    assert not os.path.exists(f"{spill_path}.replay")
+    # Extended JSON keeps BSON types across the spill file.
+    assert collection.find_one({"_id": "s0"})["datetime"] == START
+
+
+def test_replay_file_left_by_a_crash_is_finished_first(collection, spill_path):
+    down = make_buffer(FlakyCollection(collection, down=True), spill_path, batch_size=10)
+    for record in records(2):
+        down.add(record)
+    down.close()
+    os.replace(spill_path, f"{spill_path}.replay")
+    collection.insert_one(records(1)[0])  # written before the crash
+
+    buffer = make_buffer(collection, spill_path)
+    buffer._replay_spill()
+    buffer.close()
+
+    assert collection.count_documents({}) == 2
+    assert not os.path.exists(f"{spill_path}.replay")
+
+
+def test_interrupted_replay_requeues_the_rest(collection, spill_path):
+    down = make_buffer(FlakyCollection(collection, down=True), spill_path, batch_size=10)
+    for record in records(5):
+        down.add(record)
+    down.close()
+
+    flaky = FlakyCollection(collection, fail_after=1)
+    buffer = make_buffer(flaky, spill_path)
+    buffer._replay_spill()
+
+    assert collection.count_documents({}) == 2
+    assert len(spilled_lines(spill_path)) == 3
+    assert not os.path.exists(f"{spill_path}.replay")
+
+    flaky.fail_after = None
+    buffer._next_replay = 0
+    buffer._replay_spill()
+    buffer.close()
+
+    assert collection.count_documents({}) == 5
+    assert not os.path.exists(spill_path)
+
+
+def test_unwritable_spill_file_loses_the_batch_without_raising(collection, tmp_path):
+    buffer = make_buffer(FlakyCollection(collection, down=True), str(tmp_path / 'missing' / 'spill.jsonl'))
+    buffer.add(records(1)[0])
+
+    buffer.flush()
+
+    assert buffer.stats()["spilled"] == 0
+    assert collection.count_documents({}) == 0
+    buffer.close()
+
+
+def test_reconnects_when_started_without_mongodb(collection, spill_path):
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        return collection if len(attempts) > 1 else None
+
+    buffer = make_buffer(None, spill_path, batch_size=10, connect=connect, reconnect_interval=0.01)
+    buffer.add(records(1)[0])
+    buffer.flush()
+    assert len(spilled_lines(spill_path)) == 1
+
+    time.sleep(0.02)
+    buffer._replay_spill()
+    buffer.close()
+
+    assert collection.count_documents({}) == 1
+    assert len(attempts) == 2
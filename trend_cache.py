@@ -0,0 +1,98 @@
+# trend_cache.py
+import os
+import time
+import threading
+import logging
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TrendCache:
+    """TTL cache in front of a trend scrape that coalesces concurrent misses into one scrape.
+
+    With a collection it can also serve the newest stored record, but only one
+    matching `scope`. By default that is records without an account or region,
+    the ones the web app writes itself, never another scheduler target's.
+    """
+
+    def __init__(self, fetch: Callable[[], Dict[str, Any]], collection=None,
+                 ttl: Optional[float] = None, use_store: Optional[bool] = None,
+                 scope: Optional[Dict[str, Any]] = None):
+        self.fetch = fetch
+        self.collection = collection
+        self.scope = scope if scope is not None else {"account": None, "region": None}
+        self.ttl = ttl if ttl is not None else float(os.getenv('TREND_CACHE_TTL', 60))
+        if use_store is None:
+            use_store = os.getenv('TREND_CACHE_USE_STORE', 'true').lower() == 'true'
+        self.use_store = use_store
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._record = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[Future] = None
+
+    def get(self, force: bool = False) -> Dict[str, Any]:
+        """Return a fresh-enough record, scraping at most once however many callers miss together."""
+        with self._lock:
+            if not force and self._record is not None and time.time() - self._fetched_at < self.ttl:
+                self.hits += 1
+                return self._record
+            future = self._inflight
+            leader = future is None
+            if leader:
+                future = self._inflight = Future()
+                self.misses += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            record = None if force else self._latest_stored()
+            if record is not None:
+                fetched_at = record["datetime"].timestamp()
+            else:
+                record = self.fetch()
+                fetched_at = time.time()
+            if record.get("status") != "error":
+                with self._lock:
+                    self._record = record
+                    self._fetched_at = fetched_at
+            future.set_result(record)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight = None
+        return future.result()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._record = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "age": time.time() - self._fetched_at if self._record is not None else None,
+            }
+
+    def _latest_stored(self) -> Optional[Dict[str, Any]]:
+        """Serve the newest MongoDB record if it is still within the TTL."""
+        if not self.use_store or self.collection is None:
+            return None
+        try:
+            cutoff = datetime.now() - timedelta(seconds=self.ttl)
+            record = self.collection.find_one(dict(self.scope, datetime={"$gte": cutoff}),
+                                              sort=[("datetime", -1)])
+            if record:
+                logger.info("Serving trends from latest stored record")
+            return record
+        except Exception as e:
+            logger.error(f"Failed to read latest trends from MongoDB: {str(e)}")
+            return None
@@ -0,0 +1,107 @@
+# trend_deltas.py
+import os
+import socket
+import threading
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+UNCHANGED = "unchanged"
+
+
+def diff_trends(previous: Dict[str, int], trends: List[Dict[str, Any]]) -> Dict[str, List]:
+    """What changed between the last known ranks and a new trend list."""
+    current = {trend["name"]: trend.get("rank") for trend in trends if trend.get("name")}
+    return {
+        "entered": [trend for trend in trends if trend.get("name") and trend["name"] not in previous],
+        "left": [name for name in previous if name not in current],
+        "rank_changed": [
+            {"name": name, "from": previous[name], "to": rank}
+            for name, rank in current.items() if name in previous and previous[name] != rank
+        ],
+    }
+
+
+def apply_change(state: Dict[str, Dict[str, Any]], change: Dict[str, Any]) -> None:
+    """Advance a {name: trend} state by one stored snapshot or delta."""
+    if change.get("kind") == SNAPSHOT:
+        state.clear()
+        state.update({trend["name"]: dict(trend) for trend in change.get("trends", [])})
+        return
+    for name in change.get("left", []):
+        state.pop(name, None)
+    for trend in change.get("entered", []):
+        state[trend["name"]] = dict(trend)
+    for moved in change.get("rank_changed", []):
+        if moved["name"] in state:
+            state[moved["name"]]["rank"] = moved["to"]
+
+
+class TrendChangeDetector:
+    """Classifies each scrape as a full snapshot, a delta, or unchanged.
+
+    The last trend ranks per (account, region) live in an in-memory LRU. A key
+    that is new, was evicted, or has not had a snapshot within
+    `snapshot_interval` gets a snapshot; otherwise only entered/left/rank
+    changes are recorded, and an identical list is marked unchanged. With
+    TREND_PERSISTENCE=full records pass through untouched and are stored whole.
+
+    That state is per process, so every change names the `writer` that diffed
+    it, and each delta names the snapshot its chain starts from (`base`) and
+    the stored change before it (`prev`). Readers replay a single chain and can
+    tell when a write in it went missing, however many workers share a key.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, snapshot_interval: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = os.getenv('TREND_PERSISTENCE', 'delta').lower() == 'delta'
+        self.enabled = enabled
+        self.capacity = capacity or int(os.getenv('TREND_DELTA_LRU_SIZE', 256))
+        self.snapshot_interval = timedelta(
+            seconds=snapshot_interval or float(os.getenv('TREND_SNAPSHOT_INTERVAL', 3600))
+        )
+        self.writer = f"{socket.gethostname()}:{os.getpid()}"
+        self.counts = {SNAPSHOT: 0, DELTA: 0, UNCHANGED: 0}
+        self._states: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def process(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Annotate a scrape record with a `change` section describing what to persist."""
+        if not self.enabled:
+            return record
+        key = (record.get("account"), record.get("region"))
+        trends = record.get("trend_details") or []
+        ranks = {trend["name"]: trend.get("rank") for trend in trends if trend.get("name")}
+        seen_at = record["datetime"]
+
+        with self._lock:
+            state = self._states.pop(key, None)
+            if state is None or seen_at - state["snapshot_at"] >= self.snapshot_interval:
+                change = {"kind": SNAPSHOT}
+                state = {"snapshot_at": seen_at, "base": record["_id"]}
+            else:
+                change = diff_trends(state["ranks"], trends)
+                change["kind"] = DELTA if any(change.values()) else UNCHANGED
+                if change["kind"] == DELTA:
+                    change.update(base=state["base"], prev=state["prev"])
+            change["writer"] = self.writer
+            if change["kind"] != UNCHANGED:
+                state["prev"] = record["_id"]
+            state["ranks"] = ranks
+            self._states[key] = state
+            while len(self._states) > self.capacity:
+                self._states.popitem(last=False)
+            self.counts[change["kind"]] += 1
+
+        record["change"] = change
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counts, enabled=self.enabled, tracked=len(self._states))
@@ -0,0 +1,289 @@
+# trend_export.py
+import os
+import sys
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+from bson import ObjectId, json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from pymongo import ASCENDING
+from trend_storage import SCRAPES_COLLECTION, POINTS_COLLECTION, DELTAS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+SOURCES = {
+    'points': POINTS_COLLECTION,
+    'scrapes': SCRAPES_COLLECTION,
+    'deltas': DELTAS_COLLECTION,
+}
+FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+
+
+def build_query(source: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                trends: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Date-range and trend filters expressed as a Mongo query so they run on the server."""
+    query: Dict[str, Any] = {}
+    if since or until:
+        query["datetime"] = {}
+        if since:
+            query["datetime"]["$gte"] = since
+        if until:
+            query["datetime"]["$lt"] = until
+    if trends:
+        if source == 'points':
+            query["trend"] = {"$in": trends}
+        elif source == 'scrapes':
+            query["trends"] = {"$in": trends}
+        else:
+            query["$or"] = [
+                {"entered.name": {"$in": trends}},
+                {"left": {"$in": trends}},
+                {"rank_changed.name": {"$in": trends}},
+            ]
+    return query
+
+
+def _load_pyarrow():
+    """pyarrow is only needed for columnar exports, so it is imported on demand."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow exports require pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+# Columnar exports use a fixed schema per source, so an all-null column or a
+# field that first appears late in the export cannot break or thin the stream.
+# Fields a scrape or delta carries beyond the schema go into `extra` as JSON.
+EXTRA_COLUMN = 'extra'
+
+
+def _trend_type(pa):
+    return pa.struct([
+        ("name", pa.string()),
+        ("rank", pa.int64()),
+        ("category", pa.string()),
+        ("post_count", pa.int64()),
+        ("post_count_text", pa.string()),
+        ("context", pa.string()),
+    ])
+
+
+def _points_schema(pa):
+    return pa.schema([
+        ("_id", pa.string()),
+        ("datetime", pa.timestamp('ms')),
+        ("trend", pa.string()),
+        ("rank", pa.int64()),
+        ("category", pa.string()),
+        ("post_count", pa.int64()),
+        ("proxy", pa.string()),
+        ("backend", pa.string()),
+        ("account", pa.string()),
+        ("region", pa.string()),
+        ("scrape_id", pa.string()),
+    ])
+
+
+def _scrapes_schema(pa):
+    return pa.schema([
+        ("_id", pa.string()),
+        ("datetime", pa.timestamp('ms')),
+        ("trends", pa.list_(pa.string())),
+        ("trend_details", pa.list_(_trend_type(pa))),
+        ("proxy", pa.string()),
+        ("backend", pa.string()),
+        ("account", pa.string()),
+        ("region", pa.string()),
+        ("change", pa.struct([("kind", pa.string()), ("writer", pa.string())])),
+        ("points_migrated", pa.bool_()),
+        (EXTRA_COLUMN, pa.string()),
+    ])
+
+
+def _deltas_schema(pa):
+    return pa.schema([
+        ("_id", pa.string()),
+        ("datetime", pa.timestamp('ms')),
+        ("account", pa.string()),
+        ("region", pa.string()),
+        ("proxy", pa.string()),
+        ("backend", pa.string()),
+        ("writer", pa.string()),
+        ("base", pa.string()),
+        ("prev", pa.string()),
+        ("entered", pa.list_(_trend_type(pa))),
+        ("left", pa.list_(pa.string())),
+        ("rank_changed", pa.list_(pa.struct([("name", pa.string()), ("from", pa.int64()), ("to", pa.int64())]))),
+        ("points_migrated", pa.bool_()),
+        (EXTRA_COLUMN, pa.string()),
+    ])
+
+
+SCHEMAS = {
+    'points': _points_schema,
+    'scrapes': _scrapes_schema,
+    'deltas': _deltas_schema,
+}
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller in chunks."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class TrendExporter:
+    """Streams trend history out of MongoDB as JSONL, Parquet or Arrow.
+
+    Documents come from a server-side cursor in `batch_size` batches and are
+    encoded one batch at a time, so memory stays flat however large the export.
+    """
+
+    def __init__(self, db, batch_size: Optional[int] = None):
+        self.db = db
+        self.batch_size = batch_size or int(os.getenv('EXPORT_BATCH_SIZE', 5000))
+
+    def documents(self, source: str = 'points', since: Optional[datetime] = None,
+                  until: Optional[datetime] = None, trends: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        if source not in SOURCES:
+            raise ValueError(f"Unknown export source: {source}")
+        cursor = self.db[SOURCES[source]].find(
+            build_query(source, since, until, trends),
+            batch_size=self.batch_size,
+            no_cursor_timeout=True,
+        ).sort("datetime", ASCENDING)
+        try:
+            for document in cursor:
+                yield document
+        finally:
+            cursor.close()
+
+    def batches(self, documents: Iterator[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def stream(self, fmt: str = 'jsonl', source: str = 'points', since: Optional[datetime] = None,
+               until: Optional[datetime] = None, trends: Optional[List[str]] = None) -> Iterator[bytes]:
+        """Encoded export chunks, one per cursor batch."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        if source not in SOURCES:
+            raise ValueError(f"Unknown export source: {source}")
+        documents = self.documents(source, since, until, trends)
+        if fmt == 'jsonl':
+            return self._jsonl(documents)
+        return self._columnar(documents, fmt, source, *_load_pyarrow())
+
+    def _jsonl(self, documents: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        for batch in self.batches(documents):
+            yield ''.join(json_util.dumps(document, json_options=RELAXED_JSON_OPTIONS) + '\n'
+                          for document in batch).encode()
+
+    def _columnar(self, documents: Iterator[Dict[str, Any]], fmt: str, source: str, pa, pq) -> Iterator[bytes]:
+        sink = _ChunkSink()
+        schema = SCHEMAS[source](pa)
+        # The schema is known up front, so even an empty export is a valid file.
+        writer = pq.ParquetWriter(sink, schema) if fmt == 'parquet' else pa.ipc.new_stream(sink, schema)
+        try:
+            for batch in self.batches(documents):
+                rows = [self._columnar_row(document, schema.names) for document in batch]
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        tail = sink.drain()
+        if tail:
+            yield tail
+
+    @staticmethod
+    def _columnar_row(document: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+        row = {key: str(value) if isinstance(value, ObjectId) else value for key, value in document.items()}
+        if EXTRA_COLUMN in columns:
+            extra = {key: row.pop(key) for key in list(row) if key not in columns}
+            row[EXTRA_COLUMN] = json_util.dumps(extra, json_options=RELAXED_JSON_OPTIONS) if extra else None
+        return row
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def main(argv: List[str]) -> int:
+    """`python trend_export.py --format parquet --since 2025-01-01 -o trends.parquet`"""
+    import argparse
+    from dotenv import load_dotenv
+    from config import init_mongodb
+
+    parser = argparse.ArgumentParser(description="Export trend history from MongoDB.")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='jsonl')
+    parser.add_argument('--source', choices=sorted(SOURCES), default='points')
+    parser.add_argument('--since', help="ISO date or datetime, inclusive")
+    parser.add_argument('--until', help="ISO date or datetime, exclusive")
+    parser.add_argument('--trend', action='append', dest='trends', help="repeat to export several trends")
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('-o', '--output', help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+    try:
+        since, until = parse_datetime(args.since), parse_datetime(args.until)
+    except ValueError as e:
+        parser.error(str(e))
+
+    client, db, _ = init_mongodb()
+    if db is None:
+        return 1
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        exporter = TrendExporter(db, batch_size=args.batch_size)
+        for chunk in exporter.stream(args.format, args.source, since, until, args.trends):
+            out.write(chunk)
+        return 0
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    finally:
+        if args.output:
+            out.close()
+        client.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
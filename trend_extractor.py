@@ -0,0 +1,115 @@
+# trend_extractor.py
+import re
+import logging
+from typing import Dict, Any, List, Optional
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+TREND_CELL_SELECTOR = "div[data-testid='trend']"
+TRENDING_SECTION_SELECTOR = "div[aria-label='Timeline: Trending now']"
+
+# Collects the visible text lines of every trend cell in one WebDriver round-trip.
+EXTRACT_TRENDS_JS = """
+var section = document.querySelector(arguments[0]) || document;
+return Array.prototype.map.call(section.querySelectorAll(arguments[1]), function (cell) {
+    return Array.prototype.filter.call(cell.querySelectorAll("div[dir='ltr']"), function (line) {
+        var outer = line.parentElement && line.parentElement.closest("div[dir='ltr']");
+        return !outer || !cell.contains(outer);
+    }).map(function (line) {
+        return line.innerText.replace(/\\s+/g, ' ').trim();
+    });
+});
+"""
+
+POST_COUNT_RE = re.compile(r'^([\d.,]+)\s*([KMB]?)\s+(posts|Tweets|tweets)$')
+RANK_RE = re.compile(r'^\d+$')
+MULTIPLIERS = {'': 1, 'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}
+
+
+class TrendExtractor:
+    """Turns explore-page trend cells into structured records."""
+
+    @staticmethod
+    def from_driver(driver) -> List[Dict[str, Any]]:
+        """Extract every trend with a single execute_script call, falling back to page_source."""
+        try:
+            cells = driver.execute_script(EXTRACT_TRENDS_JS, TRENDING_SECTION_SELECTOR, TREND_CELL_SELECTOR)
+            trends = TrendExtractor.parse_cells(cells or [])
+            if trends:
+                return trends
+        except Exception as e:
+            logger.error(f"Script trend extraction failed, parsing page source: {str(e)}")
+        return TrendExtractor.from_html(driver.page_source)
+
+    @staticmethod
+    def from_html(html: str) -> List[Dict[str, Any]]:
+        """Extract trends from a saved or live explore page."""
+        soup = BeautifulSoup(html, 'lxml')
+        section = soup.select_one(TRENDING_SECTION_SELECTOR) or soup
+        cells = []
+        for cell in section.select(TREND_CELL_SELECTOR):
+            lines = [
+                ' '.join(line.get_text(' ', strip=True).split())
+                for line in cell.select("div[dir='ltr']")
+                if not TrendExtractor._has_line_ancestor(line, cell)
+            ]
+            cells.append(lines)
+        return TrendExtractor.parse_cells(cells)
+
+    @staticmethod
+    def parse_cells(cells: List[List[str]]) -> List[Dict[str, Any]]:
+        trends = []
+        for position, lines in enumerate(cells, start=1):
+            trend = TrendExtractor.parse_trend_lines(lines, position)
+            if trend:
+                trends.append(trend)
+        return trends
+
+    @staticmethod
+    def parse_trend_lines(lines: List[str], position: int) -> Optional[Dict[str, Any]]:
+        """Parse one cell, e.g. ["1 · Sports · Trending", "#Final", "12.3K posts"]."""
+        trend = {
+            "name": None,
+            "rank": position,
+            "category": None,
+            "post_count": None,
+            "post_count_text": None,
+            "context": None,
+        }
+        for line in (l.strip() for l in lines):
+            if not line:
+                continue
+            post_match = POST_COUNT_RE.match(line)
+            if post_match:
+                trend["post_count_text"] = line
+                trend["post_count"] = TrendExtractor.parse_count(post_match.group(1), post_match.group(2))
+            elif trend["name"] is None and (' · ' in line or line.startswith('Trending')):
+                parts = [p.strip() for p in line.split('·')]
+                if parts and RANK_RE.match(parts[0]):
+                    trend["rank"] = int(parts.pop(0))
+                categories = [p for p in parts if p and p != 'Trending']
+                if categories:
+                    trend["category"] = ' · '.join(categories)
+            elif trend["name"] is None:
+                trend["name"] = line
+            else:
+                # e.g. "Trending with #Foo, #Bar" below the name
+                trend["context"] = f"{trend['context']} {line}" if trend["context"] else line
+        return trend if trend["name"] else None
+
+    @staticmethod
+    def parse_count(number: str, suffix: str) -> Optional[int]:
+        try:
+            return int(float(number.replace(',', '')) * MULTIPLIERS[suffix])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _has_line_ancestor(line, cell) -> bool:
+        for parent in line.parents:
+            if parent is cell:
+                return False
+            if parent.name == 'div' and parent.get('dir') == 'ltr':
+                return True
+        return False
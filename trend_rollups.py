@@ -0,0 +1,246 @@
+# trend_rollups.py
+import os
+import re
+import sys
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from write_buffer import DUPLICATE_KEY
+from trend_storage import POINTS_COLLECTION, DELTAS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+HOURLY_COLLECTION = 'trend_rollups_hourly'
+DAILY_COLLECTION = 'trend_rollups_daily'
+SUMMARY_COLLECTION = 'trend_summaries'
+APPLIED_COLLECTION = 'trend_rollups_applied'
+
+
+class RebuildUnsupported(Exception):
+    """Raised when the stored points cannot reproduce the rollups."""
+
+
+WINDOW_RE = re.compile(r'^(\d+)([mhdw])$')
+WINDOW_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def parse_window(window: str) -> timedelta:
+    """Parse windows such as '30m', '24h', '7d' or '2w'."""
+    match = WINDOW_RE.match(window.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid window: {window}")
+    return timedelta(**{WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+
+
+class TrendRollups:
+    """Per-hour and per-day trend counters kept up to date as points are written.
+
+    Each rollup document holds the appearance count, best rank, and first/last
+    time seen within its bucket; dwell time is last_seen - first_seen. A per-trend
+    summary document answers "when did X first trend" without touching raw data.
+    `trend_rollups_applied` remembers which scrapes were already counted, so a
+    batch retried or replayed from the spill file is not counted twice.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.hourly = db[HOURLY_COLLECTION]
+        self.daily = db[DAILY_COLLECTION]
+        self.summaries = db[SUMMARY_COLLECTION]
+        self.applied = db[APPLIED_COLLECTION]
+        self.applied_ttl = int(os.getenv('ROLLUP_APPLIED_TTL', 7 * 86400))
+
+    def ensure_indexes(self) -> None:
+        for collection in (self.hourly, self.daily):
+            collection.create_index([("bucket", ASCENDING), ("trend", ASCENDING)], name="bucket_trend")
+            collection.create_index([("trend", ASCENDING), ("bucket", ASCENDING)], name="trend_bucket")
+        self.summaries.create_index([("last_seen", DESCENDING)], name="last_seen_desc")
+        self.applied.create_index([("applied_at", ASCENDING)], name="applied_at_ttl",
+                                  expireAfterSeconds=self.applied_ttl)
+
+    def apply_scrapes(self, points_by_scrape: Dict[Any, List[Dict[str, Any]]]) -> int:
+        """Fold each scrape's points into the rollups once, however often the scrape is written.
+
+        A scrape is marked applied right after its counters are updated, so only
+        a crash between those two writes can count it twice.
+        """
+        if not points_by_scrape:
+            return 0
+        done = {row["_id"] for row in self.applied.find({"_id": {"$in": list(points_by_scrape)}}, {"_id": 1})}
+        fresh = [scrape_id for scrape_id in points_by_scrape if scrape_id not in done]
+        if not fresh:
+            return 0
+        self.update([point for scrape_id in fresh for point in points_by_scrape[scrape_id]])
+        applied_at = datetime.now()
+        try:
+            self.applied.insert_many([{"_id": scrape_id, "applied_at": applied_at} for scrape_id in fresh],
+                                     ordered=False)
+        except BulkWriteError as e:
+            # Another writer marked some of them first.
+            if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                raise
+        return len(fresh)
+
+    def update(self, points: Iterable[Dict[str, Any]], summaries: bool = True) -> None:
+        """Fold newly written points into the rollups with upserts."""
+        hourly, daily, summary_updates = [], [], []
+        for point in points:
+            seen = point["datetime"]
+            trend = point["trend"]
+            rank = point.get("rank")
+            hour = seen.replace(minute=0, second=0, microsecond=0)
+            day = hour.replace(hour=0)
+            hourly.append(self._bucket_update(trend, hour, seen, rank))
+            daily.append(self._bucket_update(trend, day, seen, rank))
+            summary_updates.append(self._summary_update(trend, seen, rank))
+        if hourly:
+            self.hourly.bulk_write(hourly, ordered=False)
+            self.daily.bulk_write(daily, ordered=False)
+            if summaries:
+                self.summaries.bulk_write(summary_updates, ordered=False)
+
+    def rebuild(self, points_collection, since: Optional[datetime] = None, batch_size: int = 1000) -> int:
+        """Recompute rollups from raw points, e.g. after a migration. Clears the affected range first.
+
+        A partial rebuild (`since`) recomputes whole days of buckets and leaves the
+        per-trend summaries alone; a full rebuild recomputes everything.
+
+        Every scrape stores a point per trend, whatever TREND_PERSISTENCE says.
+        Deltas written before that stored points for the changed trends only, so
+        a rebuild over them would replace correct counters with a fraction of
+        them; it refuses while the range holds any.
+        """
+        query = {}
+        if since:
+            since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+            query = {"datetime": {"$gte": since}}
+        sparse = dict(query, points_migrated={"$ne": True})
+        if self.db[DELTAS_COLLECTION].find_one(sparse, {"_id": 1}) is not None:
+            raise RebuildUnsupported("Rollups cannot be rebuilt over deltas that only stored points "
+                                     "for changed trends; pick a window after them")
+        if since:
+            for collection in (self.hourly, self.daily):
+                collection.delete_many({"bucket": {"$gte": since}})
+        else:
+            for collection in (self.hourly, self.daily, self.summaries):
+                collection.delete_many({})
+
+        count = 0
+        batch: List[Dict[str, Any]] = []
+        for point in points_collection.find(query, {"_id": 0}, batch_size=batch_size):
+            batch.append(point)
+            if len(batch) >= batch_size:
+                self.update(batch, summaries=since is None)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.update(batch, summaries=since is None)
+            count += len(batch)
+        logger.info(f"Rebuilt rollups from {count} points")
+        return count
+
+    def top(self, window: timedelta, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most frequently trending names in the window, from hourly or daily buckets."""
+        since = datetime.now() - window
+        if window <= timedelta(days=2):
+            collection = self.hourly
+            since = since.replace(minute=0, second=0, microsecond=0)
+        else:
+            collection = self.daily
+            since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        pipeline = [
+            {"$match": {"bucket": {"$gte": since}}},
+            {"$group": {
+                "_id": "$trend",
+                "appearances": {"$sum": "$count"},
+                "best_rank": {"$min": "$best_rank"},
+                "first_seen": {"$min": "$first_seen"},
+                "last_seen": {"$max": "$last_seen"},
+                "dwell_ms": {"$sum": {"$subtract": ["$last_seen", "$first_seen"]}},
+            }},
+            {"$sort": {"appearances": -1, "best_rank": 1}},
+            {"$limit": limit},
+        ]
+        rows = []
+        for row in collection.aggregate(pipeline):
+            row["trend"] = row.pop("_id")
+            row["dwell_seconds"] = row.pop("dwell_ms") / 1000
+            rows.append(row)
+        return rows
+
+    def timeline(self, trend: str, window: timedelta, granularity: str = 'hour') -> List[Dict[str, Any]]:
+        """Hourly or daily buckets for one trend, including the bucket the window starts in."""
+        since = (datetime.now() - window).replace(minute=0, second=0, microsecond=0)
+        if granularity == 'day':
+            collection = self.daily
+            since = since.replace(hour=0)
+        else:
+            collection = self.hourly
+        cursor = collection.find(
+            {"trend": trend, "bucket": {"$gte": since}}, {"_id": 0}
+        ).sort("bucket", ASCENDING)
+        return [self._with_dwell(row) for row in cursor]
+
+    def history(self, limit: int = 50, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Recently seen trends with when they first trended and their best rank."""
+        query = {"last_seen": {"$gte": since}} if since else {}
+        cursor = self.summaries.find(query).sort("last_seen", DESCENDING).limit(limit)
+        return [dict(row, trend=row.pop("_id")) for row in cursor]
+
+    @staticmethod
+    def _bucket_update(trend: str, bucket: datetime, seen: datetime, rank: Optional[int]) -> UpdateOne:
+        update = {
+            "$setOnInsert": {"trend": trend, "bucket": bucket},
+            "$inc": {"count": 1},
+            "$min": {"first_seen": seen},
+            "$max": {"last_seen": seen},
+        }
+        if rank is not None:
+            update["$min"]["best_rank"] = rank
+        return UpdateOne({"_id": f"{trend}|{bucket.isoformat()}"}, update, upsert=True)
+
+    @staticmethod
+    def _summary_update(trend: str, seen: datetime, rank: Optional[int]) -> UpdateOne:
+        update = {
+            "$inc": {"appearances": 1},
+            "$min": {"first_seen": seen},
+            "$max": {"last_seen": seen},
+        }
+        if rank is not None:
+            update["$min"]["best_rank"] = rank
+        return UpdateOne({"_id": trend}, update, upsert=True)
+
+    @staticmethod
+    def _with_dwell(row: Dict[str, Any]) -> Dict[str, Any]:
+        if row.get("first_seen") and row.get("last_seen"):
+            row["dwell_seconds"] = (row["last_seen"] - row["first_seen"]).total_seconds()
+        return row
+
+
+def main(argv: List[str]) -> int:
+    """`python trend_rollups.py rebuild [WINDOW]` recomputes rollups from trend_points."""
+    from config import init_mongodb
+
+    if not argv or argv[0] != 'rebuild' or len(argv) > 2:
+        print("usage: python trend_rollups.py rebuild [WINDOW]")
+        return 2
+    client, db, _ = init_mongodb()
+    if db is None:
+        return 1
+    try:
+        since = datetime.now() - parse_window(argv[1]) if len(argv) == 2 else None
+        try:
+            count = TrendRollups(db).rebuild(db[POINTS_COLLECTION], since)
+        except RebuildUnsupported as e:
+            print(str(e))
+            return 1
+        print(f"Rebuilt rollups from {count} points")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
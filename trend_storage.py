@@ -0,0 +1,310 @@
+# trend_storage.py
+import os
+import sys
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+from write_buffer import DUPLICATE_KEY
+from trend_deltas import SNAPSHOT, DELTA, apply_change
+
+logger = logging.getLogger(__name__)
+
+SCRAPES_COLLECTION = 'trending_topics'
+POINTS_COLLECTION = 'trend_points'
+DELTAS_COLLECTION = 'trend_deltas'
+
+
+class TrendStorage:
+    """Stores each scrape document plus one time-series point per trend per scrape.
+
+    `trending_topics` keeps the original scrape documents. `trend_points` is a
+    MongoDB time-series collection (timeField `datetime`, metaField `trend`) when
+    the server supports it, otherwise a regular collection with the same shape.
+    It exposes `insert_many` so it can sit behind the WriteBehindBuffer.
+
+    Records annotated by the TrendChangeDetector are stored by their change
+    kind: snapshots as full scrape documents, deltas as entered/left/rank
+    changes in `trend_deltas`, and unchanged scrapes not at all. Every scrape
+    still gets a point per trend, so history, first-seen and rollup rebuilds
+    see each appearance. `state_at` rebuilds the full list.
+
+    Every write is safe to repeat: points have deterministic ids
+    (`scrape_id|trend`) and are derived for already-stored scrapes too, and
+    rollups are applied once per scrape, so a retried batch, a spill-file replay
+    or a re-run migration fills in whatever the failed attempt missed.
+    """
+
+    def __init__(self, db, rollups=None, granularity: Optional[str] = None):
+        self.db = db
+        self.rollups = rollups
+        self.granularity = granularity or os.getenv('TREND_POINTS_GRANULARITY', 'minutes')
+        self.scrapes = db[SCRAPES_COLLECTION]
+        self.points = db[POINTS_COLLECTION]
+        self.deltas = db[DELTAS_COLLECTION]
+        self.timeseries = False
+
+    def ensure_schema(self) -> None:
+        """Create the points collection and the history indexes if they are missing."""
+        if POINTS_COLLECTION not in self.db.list_collection_names():
+            try:
+                self.db.create_collection(POINTS_COLLECTION, timeseries={
+                    "timeField": "datetime",
+                    "metaField": "trend",
+                    "granularity": self.granularity,
+                })
+                self.timeseries = True
+                logger.info(f"Created time-series collection {POINTS_COLLECTION}")
+            except (CollectionInvalid, OperationFailure, TypeError, NotImplementedError) as e:
+                # Servers before 5.0 (and mongomock) fall back to a plain collection.
+                logger.info(f"Time-series collections unavailable, using a regular collection: {str(e)}")
+                try:
+                    self.db.create_collection(POINTS_COLLECTION)
+                except CollectionInvalid:
+                    pass
+        else:
+            options = self.points.options()
+            self.timeseries = 'timeseries' in options
+
+        self.points.create_index([("trend", ASCENDING), ("datetime", ASCENDING)], name="trend_datetime")
+        self.points.create_index([("datetime", ASCENDING)], name="datetime")
+        try:
+            self.points.create_index([("scrape_id", ASCENDING)], name="scrape_id")
+        except OperationFailure as e:
+            # Time-series collections only take indexes on measurement fields from MongoDB 6.0.
+            logger.info(f"Skipping scrape_id index on {POINTS_COLLECTION}: {str(e)}")
+        self.scrapes.create_index([("datetime", DESCENDING)], name="datetime_desc")
+        self.scrapes.create_index([("account", ASCENDING), ("region", ASCENDING), ("datetime", DESCENDING)],
+                                  name="account_region_datetime")
+        self.deltas.create_index([("account", ASCENDING), ("region", ASCENDING), ("datetime", ASCENDING)],
+                                 name="account_region_datetime")
+        self.deltas.create_index([("base", ASCENDING), ("datetime", ASCENDING)], name="base_datetime")
+
+    @staticmethod
+    def _details(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return record.get("trend_details") or [
+            {"name": name, "rank": rank} for rank, name in enumerate(record.get("trends", []), start=1)
+        ]
+
+    @staticmethod
+    def explode(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """One point per trend in a scrape document."""
+        points = []
+        for detail in TrendStorage._details(record):
+            if not detail.get("name"):
+                continue
+            points.append({
+                "datetime": record["datetime"],
+                "trend": detail["name"],
+                "rank": detail.get("rank"),
+                "category": detail.get("category"),
+                "post_count": detail.get("post_count"),
+                "proxy": record.get("proxy"),
+                "backend": record.get("backend"),
+                "account": record.get("account"),
+                "region": record.get("region"),
+                "scrape_id": record["_id"],
+            })
+        return points
+
+    @staticmethod
+    def delta_document(record: Dict[str, Any]) -> Dict[str, Any]:
+        change = record["change"]
+        return {
+            "_id": record["_id"],
+            "datetime": record["datetime"],
+            "account": record.get("account"),
+            "region": record.get("region"),
+            "proxy": record.get("proxy"),
+            "backend": record.get("backend"),
+            "writer": change.get("writer"),
+            "base": change.get("base"),
+            "prev": change.get("prev"),
+            "entered": change.get("entered", []),
+            "left": change.get("left", []),
+            "rank_changed": change.get("rank_changed", []),
+            "points_migrated": True,
+        }
+
+    @staticmethod
+    def _change_kind(record: Dict[str, Any]) -> str:
+        return (record.get("change") or {}).get("kind", SNAPSHOT)
+
+    @staticmethod
+    def _insert_new(collection, documents: List[Dict[str, Any]], ordered: bool) -> List[Dict[str, Any]]:
+        """Insert documents, returning the ones that were not already stored."""
+        if not documents:
+            return []
+        try:
+            collection.insert_many(documents, ordered=ordered)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors) or e.details.get("writeConcernErrors"):
+                raise
+            duplicates = {err["index"] for err in errors}
+            return [document for i, document in enumerate(documents) if i not in duplicates]
+        return documents
+
+    @staticmethod
+    def point_id(point: Dict[str, Any]) -> str:
+        return f"{point['scrape_id']}|{point['trend']}"
+
+    def _insert_points(self, points: List[Dict[str, Any]], ordered: bool) -> int:
+        """Insert the points not already stored.
+
+        Time-series collections do not enforce unique `_id`s, so the stored ids
+        of these scrapes are looked up first instead of relying on duplicate-key errors.
+        The lookup is bounded by the batch's time range and trend names, so the
+        (trend, datetime) index serves it rather than a scan on scrape_id, which
+        time-series collections cannot index before MongoDB 6.0.
+        """
+        fresh = {}
+        for point in points:
+            fresh.setdefault(self.point_id(point), point)
+        if not fresh:
+            return 0
+        times = [point["datetime"] for point in fresh.values()]
+        query = {
+            "trend": {"$in": list({point["trend"] for point in fresh.values()})},
+            "datetime": {"$gte": min(times), "$lte": max(times)},
+            "scrape_id": {"$in": list({point["scrape_id"] for point in fresh.values()})},
+        }
+        for stored in self.points.find(query, {"scrape_id": 1, "trend": 1}):
+            fresh.pop(self.point_id(stored), None)
+        documents = [dict(point, _id=point_id) for point_id, point in fresh.items()]
+        return len(self._insert_new(self.points, documents, ordered))
+
+    def insert_many(self, records: List[Dict[str, Any]], ordered: bool = False) -> None:
+        """Store each record by its change kind; repeating a batch only fills in what is missing."""
+        records = [dict(record, points_migrated=True) for record in records]
+        snapshots = [record for record in records if self._change_kind(record) == SNAPSHOT]
+        deltas = [record for record in records if self._change_kind(record) == DELTA]
+
+        self._insert_new(self.scrapes, snapshots, ordered)
+        self._insert_new(self.deltas, [self.delta_document(record) for record in deltas], ordered)
+
+        # Points come from every record, not just the newly inserted ones: a retry
+        # after a failed points write must still produce them.
+        points_by_scrape = {record["_id"]: self.explode(record) for record in records}
+        self._insert_points([point for points in points_by_scrape.values() for point in points], ordered)
+        if self.rollups is not None:
+            self.rollups.apply_scrapes(points_by_scrape)
+
+    def state_at(self, when: datetime, account: Optional[str] = None,
+                 region: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Rebuild the full trend list for an account/region as it stood at `when`.
+
+        The latest stored change decides which chain is replayed: its base
+        snapshot plus that chain's deltas, so deltas diffed by another worker
+        never land on the wrong snapshot. If a link in the chain is missing (a
+        lost write, or deltas from before chains were recorded), the list comes
+        from the points of the latest scrape instead.
+        """
+        key = {"account": account, "region": region}
+        window = dict(key, datetime={"$lte": when})
+        snapshot = self.scrapes.find_one(window, sort=[("datetime", DESCENDING)])
+        latest = self.deltas.find_one(window, sort=[("datetime", DESCENDING)])
+        if latest is not None and (snapshot is None or latest["datetime"] > snapshot["datetime"]):
+            snapshot = self.scrapes.find_one({"_id": latest["base"]}) if latest.get("base") else None
+            if snapshot is None:
+                return self._state_from_points(when, key)
+        elif snapshot is None:
+            return self._state_from_points(when, key)
+
+        state: Dict[str, Dict[str, Any]] = {}
+        apply_change(state, {"kind": SNAPSHOT, "trends": self._details(snapshot)})
+        as_of, last_id = snapshot["datetime"], snapshot["_id"]
+        chain = self.deltas.find({"base": snapshot["_id"], "datetime": {"$gt": as_of, "$lte": when}})
+        for delta in chain.sort("datetime", ASCENDING):
+            if delta.get("prev") != last_id:
+                return self._state_from_points(when, key)
+            apply_change(state, delta)
+            as_of, last_id = delta["datetime"], delta["_id"]
+        return self._state(when, key, as_of, state.values(), snapshot_id=snapshot["_id"])
+
+    def _state_from_points(self, when: datetime, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        latest = self.points.find_one(dict(key, datetime={"$lte": when}), sort=[("datetime", DESCENDING)])
+        if latest is None:
+            return None
+        points = self.points.find({"datetime": latest["datetime"], "scrape_id": latest["scrape_id"]})
+        trends = [{"name": point["trend"], "rank": point.get("rank"), "category": point.get("category"),
+                   "post_count": point.get("post_count")} for point in points]
+        return self._state(when, key, latest["datetime"], trends, scrape_id=latest["scrape_id"])
+
+    @staticmethod
+    def _state(when: datetime, key: Dict[str, Any], as_of: datetime, trends: Iterable[Dict[str, Any]],
+               **source) -> Dict[str, Any]:
+        trends = sorted(trends, key=lambda trend: (trend.get("rank") is None, trend.get("rank") or 0))
+        return dict(
+            key,
+            datetime=when,
+            as_of=as_of,
+            trends=[trend["name"] for trend in trends],
+            trend_details=trends,
+            **source,
+        )
+
+    def migrate_legacy(self, batch_size: int = 500) -> int:
+        """Backfill points for scrape documents written before the points collection existed."""
+        migrated = 0
+        batch: List[Dict[str, Any]] = []
+        cursor = self.scrapes.find({"points_migrated": {"$ne": True}}, batch_size=batch_size)
+        for record in cursor:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                migrated += self._migrate_batch(batch)
+                batch = []
+        if batch:
+            migrated += self._migrate_batch(batch)
+        return migrated
+
+    def _migrate_batch(self, batch: List[Dict[str, Any]]) -> int:
+        # Idempotent, so re-running after a crash mid-batch neither duplicates nor loses points.
+        self._insert_points([point for record in batch for point in self.explode(record)], ordered=False)
+        if self.rollups is not None:
+            self.rollups.apply_scrapes({record["_id"]: self.explode(record) for record in batch})
+        self.scrapes.update_many(
+            {"_id": {"$in": [record["_id"] for record in batch]}},
+            {"$set": {"points_migrated": True}},
+        )
+        logger.info(f"Migrated {len(batch)} scrape documents")
+        return len(batch)
+
+    def first_seen(self, trend: str) -> Optional[datetime]:
+        point = self.points.find_one({"trend": trend}, sort=[("datetime", ASCENDING)])
+        return point["datetime"] if point else None
+
+    def history(self, trend: str, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> Iterable[Dict[str, Any]]:
+        query: Dict[str, Any] = {"trend": trend}
+        if since or until:
+            query["datetime"] = {}
+            if since:
+                query["datetime"]["$gte"] = since
+            if until:
+                query["datetime"]["$lt"] = until
+        return self.points.find(query, {"_id": 0}).sort("datetime", ASCENDING)
+
+
+def main(argv: List[str]) -> int:
+    """`python trend_storage.py migrate` backfills points for existing scrape documents."""
+    from config import init_mongodb
+    from trend_rollups import TrendRollups
+
+    if len(argv) != 1 or argv[0] != 'migrate':
+        print("usage: python trend_storage.py migrate")
+        return 2
+    client, db, _ = init_mongodb()
+    if db is None:
+        return 1
+    try:
+        migrated = TrendStorage(db, rollups=TrendRollups(db)).migrate_legacy()
+        print(f"Migrated {migrated} documents")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
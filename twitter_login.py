@@ -1,42 +1,78 @@
 # twitter_login.py
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-import random
+from selenium.common.exceptions import TimeoutException
 import os
 import logging
 from datetime import datetime
+from config import twitter_url
+from session_store import SessionStore
+from wait_strategy import get_wait_strategy
+from scrape_errors import LoginUnreachable
 
 logger = logging.getLogger(__name__)
 
+# Evaluates every candidate locator in one round-trip and returns [index, element] for the first match.
+FIND_FIRST_JS = """
+const candidates = arguments[0], clickable = arguments[1];
+for (let i = 0; i < candidates.length; i++) {
+  const kind = candidates[i][0], locator = candidates[i][1];
+  let nodes = [];
+  if (kind === 'css') {
+    nodes = Array.from(document.querySelectorAll(locator));
+  } else {
+    const found = document.evaluate(locator, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let j = 0; j < found.snapshotLength; j++) nodes.push(found.snapshotItem(j));
+  }
+  for (const el of nodes) {
+    if (el.nodeType !== 1) continue;
+    if (!clickable) return [i, el];
+    const rect = el.getBoundingClientRect();
+    const style = window.getComputedStyle(el);
+    if (rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none'
+        && !el.disabled && el.getAttribute('aria-disabled') !== 'true') return [i, el];
+  }
+}
+return null;
+"""
+
 class TwitterLogin:
+    # Locator group -> the locator that matched last time, tried first on the next login.
+    _last_matched = {}
+
     @staticmethod
     def random_delay(min_time=2, max_time=5):
-        time.sleep(random.uniform(min_time, max_time))
+        get_wait_strategy().jitter(min_time, max_time)
 
     @staticmethod
-    def login(driver):
-        """Log in to Twitter with enhanced error handling."""
+    def login(driver, proxy=None, session_store=None, username=None, password=None):
+        """Log in to Twitter, reusing a cached session for this account and proxy when possible.
+
+        Returns False when Twitter does not accept the credentials. Raises
+        LoginUnreachable when the flow never reached the username form or the
+        browser hit a network error, which points at the proxy, not the account.
+        """
+        session_store = session_store or SessionStore()
+        account = username or os.getenv('TWITTER_USERNAME')
+        password = password or os.getenv('TWITTER_PASSWORD')
+        if TwitterLogin.restore_session(driver, session_store, account, proxy):
+            return True
+
+        waits = get_wait_strategy()
+        reached_form = False
         try:
             driver.delete_all_cookies()
-            driver.get("https://x.com/i/flow/login")
-            TwitterLogin.random_delay(1, 2)
+            driver.get(twitter_url("/i/flow/login"))
 
             # Username input
             username_xpath = "//input[@autocomplete='username']"
-            username_field = WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, username_xpath))
-            )
+            username_field = waits.for_element(driver, (By.XPATH, username_xpath), timeout=20)
+            reached_form = True
 
             username_field.click()
-            TwitterLogin.random_delay(1, 2)
-
-            for char in os.getenv('TWITTER_USERNAME'):
-                username_field.send_keys(char)
-                time.sleep(random.uniform(0.1, 0.3))
-
-            TwitterLogin.random_delay(1, 2)
+            TwitterLogin.random_delay(0.3, 0.8)
+            waits.type_text(username_field, account)
+            TwitterLogin.random_delay(0.3, 0.8)
 
             # Next button handling
             next_button = TwitterLogin._find_next_button(driver)
@@ -45,7 +81,6 @@ class TwitterLogin:
                 raise Exception("Next button not found")
 
             driver.execute_script("arguments[0].click();", next_button)
-            TwitterLogin.random_delay(3, 5)
 
             # Password input handling
             password_field = TwitterLogin._find_password_field(driver)
@@ -53,14 +88,11 @@ class TwitterLogin:
                 driver.save_screenshot("password_field_not_found.png")
                 raise Exception("Password field not found")
 
+            TwitterLogin.random_delay(0.5, 1)
             password_field.click()
-            TwitterLogin.random_delay(1, 2)
-
-            for char in os.getenv('TWITTER_PASSWORD'):
-                password_field.send_keys(char)
-                time.sleep(random.uniform(0.1, 0.3))
-
-            TwitterLogin.random_delay(2, 3)
+            TwitterLogin.random_delay(0.3, 0.8)
+            waits.type_text(password_field, password)
+            TwitterLogin.random_delay(0.3, 0.8)
 
             # Login button handling
             login_button = TwitterLogin._find_login_button(driver)
@@ -76,12 +108,66 @@ class TwitterLogin:
                 raise Exception("Could not verify successful login")
 
             logger.info("Successfully logged into Twitter")
+            session_store.save(driver, account, proxy)
             return True
 
         except Exception as e:
-            logger.error(f"Twitter login failed: {str(e)}")
-            driver.save_screenshot(f'login_failure_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+            unreachable = not reached_form or 'net::err_' in str(e).lower()
+            logger.error(f"Twitter login {'unreachable' if unreachable else 'failed'}: {str(e)}")
+            try:
+                driver.save_screenshot(f'login_failure_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png')
+            except Exception:
+                pass
+            if unreachable:
+                raise LoginUnreachable(f"Login page unreachable via {proxy}: {str(e)}")
+            return False
+
+    @staticmethod
+    def restore_session(driver, session_store, account, proxy=None):
+        """Restore cached cookies/localStorage and confirm them with one authenticated page load.
+
+        The cached session is dropped only when Twitter answers with its login
+        page. A navigation error keeps it and raises LoginUnreachable, since a
+        dead proxy says nothing about the session; an inconclusive check keeps
+        it and falls back to the credential login.
+        """
+        session = session_store.load(account, proxy)
+        if not session:
+            return False
+
+        try:
+            # Cookies can only be set for the origin the driver is currently on.
+            driver.get(twitter_url("/robots.txt"))
+            if not session_store.apply(driver, session):
+                return False
+            driver.get(twitter_url("/home"))
+        except Exception as e:
+            logger.error(f"Failed to restore cached session: {str(e)}")
+            raise LoginUnreachable(f"Session check unreachable via {proxy}: {str(e)}")
+
+        authenticated = TwitterLogin._is_session_authenticated(driver)
+        if authenticated:
+            logger.info(f"Restored cached Twitter session for {account}")
+            return True
+        if authenticated is None:
+            logger.info("Could not confirm the cached session, falling back to credential login")
             return False
+        logger.info("Cached session is no longer valid, falling back to credential login")
+        session_store.invalidate(account, proxy)
+        return False
+
+    @staticmethod
+    def _is_session_authenticated(driver, timeout=10):
+        """True on the logged-in home page, False when sent to the login flow, None if neither showed up."""
+        try:
+            WebDriverWait(driver, timeout).until(
+                lambda d: "/login" in d.current_url or "/i/flow" in d.current_url or d.find_elements(
+                    By.CSS_SELECTOR, "[data-testid='SideNav_AccountSwitcher_Button'], [data-testid='primaryColumn']"
+                )
+            )
+            return "/login" not in driver.current_url and "/i/flow" not in driver.current_url
+        except Exception:
+            return None
 
     @staticmethod
     def _find_next_button(driver):
@@ -120,27 +206,34 @@ class TwitterLogin:
             "//div[@aria-label='Home timeline']",
             "//a[@aria-label='Profile']"
         ]
-        for locator in success_locators:
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located(
-                        (By.CSS_SELECTOR if locator.startswith('[') else By.XPATH, locator)
-                    )
-                )
-                return True
-            except:
-                continue
-        return False
+        candidates = [
+            (By.CSS_SELECTOR if locator.startswith('[') else By.XPATH, locator) for locator in success_locators
+        ]
+        return TwitterLogin._wait_for_any(driver, candidates, timeout=20, clickable=False) is not None
 
     @staticmethod
-    def _find_element_with_locators(driver, locators, by_type):
-        for locator in locators:
-            try:
-                element = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((by_type, locator))
-                )
-                logger.info(f"Found element with locator: {locator}")
-                return element
-            except:
-                continue
-        return None
\ No newline at end of file
+    def _find_element_with_locators(driver, locators, by_type, timeout=10):
+        return TwitterLogin._wait_for_any(driver, [(by_type, locator) for locator in locators], timeout)
+
+    @staticmethod
+    def _wait_for_any(driver, candidates, timeout=10, clickable=True):
+        """Wait once for whichever candidate locator matches first, starting with the last one that worked."""
+        group = tuple(locator for _, locator in candidates)
+        preferred = TwitterLogin._last_matched.get(group)
+        ordered = sorted(candidates, key=lambda candidate: candidate[1] != preferred)
+        script_args = [['css' if by == By.CSS_SELECTOR else 'xpath', locator] for by, locator in ordered]
+
+        try:
+            index, element = WebDriverWait(driver, timeout, poll_frequency=0.25).until(
+                lambda d: d.execute_script(FIND_FIRST_JS, script_args, clickable)
+            )
+        except TimeoutException:
+            return None
+        except Exception as e:
+            logger.error(f"Locator lookup failed: {str(e)}")
+            return None
+
+        locator = ordered[index][1]
+        TwitterLogin._last_matched[group] = locator
+        logger.info(f"Found element with locator: {locator}")
+        return element
@@ -1,90 +1,130 @@
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-import random
 import os
+import time
 import uuid
 from datetime import datetime
 import logging
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional
 from config import validate_env_variables, init_mongodb
-from driver_manager import DriverManager
-from twitter_login import TwitterLogin
+from driver_pool import DriverPool
+from proxy_registry import get_proxy_registry
+from proxy_validator import get_proxy_validator
+from trend_cache import TrendCache
+from scraper_backend import create_backend, ProcessBackend
+from resilience import ResilientBackend, get_breakers
+from write_buffer import WriteBehindBuffer
+from trend_storage import TrendStorage
+from trend_deltas import TrendChangeDetector
+from trend_rollups import TrendRollups
+from metrics import get_metrics, failure_cause, SCRAPES_TOTAL
 
 logger = logging.getLogger(__name__)
 
+def build_trend_record(trends: List[Dict[str, Any]], proxy, backend: str, **extra) -> Dict[str, Any]:
+    """Shape extracted trends into the document stored in MongoDB."""
+    record = {
+        "_id": str(uuid.uuid4()),
+        "trends": [trend["name"] for trend in trends],
+        "trend_details": trends,
+        "datetime": datetime.now(),
+        "proxy": proxy,
+        "backend": backend
+    }
+    record.update(extra)
+    return record
+
 class TwitterScraper:
-    def __init__(self):
-        """Initialize the TwitterScraper with configurations."""
+    def __init__(self, on_progress: Optional[Callable[[str], None]] = None):
+        """Initialize the TwitterScraper with configurations; `on_progress` hears each start-up stage."""
+        progress = on_progress or (lambda stage: None)
         validate_env_variables()
-        self.twitter_connected = False
-        self.proxy_connected = False
-        self.connection_error = None
-        self.driver = None
         self.current_proxy = None
-        self.retry_count = 0
-        self.max_retries = 3
+        self.max_retries = int(os.getenv('SCRAPE_MAX_RETRIES', 3))
+        self.pool = DriverPool()
+        self.backend = ResilientBackend(create_backend(self.pool), account=self.pool.username,
+                                        max_retries=self.max_retries)
+        self._closed = False
+        self.proxy_validator = get_proxy_validator()
 
         # Initialize MongoDB connection
-        self.client, self.db, self.collection = init_mongodb()
+        progress("connecting_mongodb")
+        self.client = self.db = self.collection = self.rollups = self.storage = None
+        self.trend_cache = TrendCache(self.get_trending_topics)
+        self._connect_storage()
+        # If MongoDB is down now, the buffer spills and keeps retrying the connection.
+        self.write_buffer = WriteBehindBuffer(self.storage, connect=self._connect_storage)
+        self.change_detector = TrendChangeDetector()
+        progress("starting_backend")
         self._init_connection()
 
+    def _connect_storage(self) -> Optional[TrendStorage]:
+        """Connect to MongoDB and build the trend storage; None while it is unreachable."""
+        client, db, collection = init_mongodb()
+        if db is None:
+            return None
+        self.client, self.db, self.collection = client, db, collection
+        self.rollups = TrendRollups(db)
+        self.storage = TrendStorage(db, rollups=self.rollups)
+        self.trend_cache.collection = collection
+        return self.storage
+
+    @property
+    def retry_count(self) -> int:
+        """Retries the most recent scrape needed."""
+        return self.backend.last_retries
+
+    @property
+    def twitter_connected(self) -> bool:
+        return self.backend.ready()
+
+    @property
+    def proxy_connected(self) -> bool:
+        return self.backend.ready()
+
+    @property
+    def connection_error(self):
+        # Worker processes log in with their own pools; the supervisor hears their errors.
+        if isinstance(self.backend.backend, ProcessBackend):
+            return self.backend.backend.last_error
+        return self.pool.last_error
+
     def _init_connection(self):
-        """Initialize driver and Twitter connection."""
+        """Validate proxies, then warm the backend (logged-in browsers or worker processes)."""
         try:
-            self.driver, self.current_proxy = DriverManager.setup_driver()
-            if self.driver:
-                self.proxy_connected = True
-                login = TwitterLogin()
-                self.twitter_connected = login.login(self.driver)
+            self.proxy_validator.start(validate_now=not self.proxy_validator.get_known_good())
+            self.backend.start()
         except Exception as e:
             logger.error(f"Connection initialization failed: {str(e)}")
-            self.connection_error = str(e)
+            self.pool.last_error = str(e)
+
+    def ensure_connection(self) -> bool:
+        """Probe pooled sessions and re-establish the pool if every driver has died."""
+        self.pool.prune()
+        if not self.backend.ready():
+            self._init_connection()
+        return self.twitter_connected
+
+    def get_trends(self, force: bool = False) -> Dict[str, Any]:
+        """Return cached trends if still fresh, otherwise scrape (shared by concurrent callers)."""
+        return self.trend_cache.get(force=force)
 
-   
     def get_trending_topics(self) -> Dict[str, Any]:
         """Fetch and store trending topics."""
-        if not all([self.twitter_connected, self.proxy_connected]):
-            return {
-                "status": "error",
-                "message": "Not connected to Twitter or proxy"
-            }
-
+        metrics = get_metrics()
+        start = time.monotonic()
         try:
-            logger.info("Fetching trending topics...")
-            self.driver.get("https://twitter.com/explore")
-            time.sleep(random.uniform(3, 5))
-
-            trending_section = WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, "//div[@aria-label='Timeline: Trending now']"))
-            )
-
-            trends = trending_section.find_elements(By.XPATH, ".//div[@data-testid='trend']")[:5]
-            trend_texts = []
-
-            for trend in trends:
-                try:
-                    trend_text = trend.find_element(By.XPATH, ".//span").text
-                    trend_texts.append(trend_text)
-                except:
-                    continue
-
-            if not trend_texts:
-                raise Exception("No trends found")
-
-            record = {
-                "_id": str(uuid.uuid4()),
-                "trends": trend_texts,
-                "datetime": datetime.now(),
-                "proxy": self.current_proxy
-            }
-
-            self.collection.insert_one(record)
-            logger.info("Successfully saved trending topics")
+            trends, proxy = self.backend.fetch_trends()
+            metrics.observe('scrape', time.monotonic() - start, proxy, self.backend.name)
+            metrics.inc(SCRAPES_TOTAL, backend=self.backend.name, status='success')
+            self.current_proxy = proxy
+            record = self.change_detector.process(build_trend_record(trends, proxy, self.backend.name))
+
+            self.write_buffer.add(record)
+            logger.info("Queued trending topics for storage")
             return record
 
         except Exception as e:
+            metrics.count_failure('scrape', failure_cause(e), backend=self.backend.name)
+            metrics.inc(SCRAPES_TOTAL, backend=self.backend.name, status='error')
             error_msg = f"Error fetching trends: {str(e)}"
             logger.error(error_msg)
             return {"status": "error", "message": error_msg}
@@ -97,9 +137,36 @@ class TwitterScraper:
             "current_proxy": self.current_proxy,
             "error": self.connection_error,
             "retry_count": self.retry_count,
+            "backend": self.backend.status(),
+            "driver_pool": self.pool.stats(),
+            "proxies": get_proxy_registry().summary(),
+            "circuit_breakers": get_breakers().stats(),
+            "trend_cache": self.trend_cache.stats(),
+            "mongodb_writes": self.write_buffer.stats(),
+            "trend_changes": self.change_detector.stats(),
             "mongodb_connected": self._check_mongodb_connection()
         }
 
+    def export_metrics(self) -> None:
+        """Refresh the point-in-time gauges shown on /metrics."""
+        metrics = get_metrics()
+        pool = self.pool.stats()
+        writes = self.write_buffer.stats()
+        cache = self.trend_cache.stats()
+        proxies = get_proxy_registry().summary()
+        metrics.set_gauge('trend_driver_pool_drivers', pool["idle"], "Pooled drivers by state.", state="idle")
+        metrics.set_gauge('trend_driver_pool_drivers', pool["leased"], state="leased")
+        metrics.set_gauge('trend_driver_pool_drivers', pool["starting"], state="starting")
+        metrics.set_gauge('trend_driver_pool_waiting', pool["waiting"], "Callers waiting for a driver.")
+        metrics.set_gauge('trend_write_buffer_records', writes["pending"], "Write buffer records by state.",
+                          state="pending")
+        metrics.set_gauge('trend_write_buffer_records', writes["written"], state="written")
+        metrics.set_gauge('trend_write_buffer_records', writes["spilled"], state="spilled")
+        metrics.set_gauge('trend_cache_requests', cache["hits"], "Trend cache lookups by result.", result="hit")
+        metrics.set_gauge('trend_cache_requests', cache["misses"], result="miss")
+        metrics.set_gauge('trend_proxies', proxies["healthy"], "Known proxies by health.", state="healthy")
+        metrics.set_gauge('trend_proxies', proxies["cooling_down"], state="cooling_down")
+
     def _check_mongodb_connection(self) -> bool:
         """Check MongoDB connection status."""
         try:
@@ -110,9 +177,15 @@ class TwitterScraper:
 
     def cleanup(self) -> None:
         """Clean up resources."""
+        if self._closed:
+            return
+        self._closed = True
         try:
-            if self.driver:
-                self.driver.quit()
+            self.proxy_validator.stop()
+            self.backend.close()
+            self.pool.close()
+            get_proxy_registry().save()
+            self.write_buffer.close()
             if self.client:
                 self.client.close()
             logger.info("Cleanup completed successfully")
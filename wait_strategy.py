@@ -0,0 +1,109 @@
+# wait_strategy.py
+import os
+import time
+import random
+import logging
+from typing import List, Optional, Union
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+logger = logging.getLogger(__name__)
+
+# Resolves as soon as `condition` holds, re-checking on every DOM mutation instead of polling.
+MUTATION_WAIT_JS = """
+var condition = new Function(arguments[0]);
+var timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var check = function () { try { return !!condition(); } catch (e) { return false; } };
+if (check()) { done(true); return; }
+var observer = new MutationObserver(function () {
+    if (check()) { clearTimeout(timer); observer.disconnect(); done(true); }
+});
+var timer = setTimeout(function () { observer.disconnect(); done(check()); }, timeoutMs);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+"""
+
+# Resolves once the Resource Timing buffer has an entry whose URL contains one of `patterns`.
+RESPONSE_WAIT_JS = """
+var patterns = arguments[0];
+var timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var matches = function (e) { return patterns.some(function (p) { return e.name.indexOf(p) !== -1; }); };
+var seen = function () { return performance.getEntriesByType('resource').some(matches); };
+if (seen()) { done(true); return; }
+var observer = new PerformanceObserver(function (list) {
+    if (list.getEntries().some(matches)) {
+        clearTimeout(timer); observer.disconnect(); done(true);
+    }
+});
+var timer = setTimeout(function () { observer.disconnect(); done(seen()); }, timeoutMs);
+observer.observe({type: 'resource', buffered: true});
+"""
+
+
+class WaitStrategy:
+    """Waits on real page signals; human-like pauses come from a separate, scalable jitter budget."""
+
+    def __init__(self, jitter_scale: Optional[float] = None, timeout: Optional[float] = None):
+        self.jitter_scale = jitter_scale if jitter_scale is not None else float(os.getenv('HUMAN_JITTER_SCALE', 1.0))
+        self.timeout = timeout or float(os.getenv('WAIT_TIMEOUT', 20))
+
+    def jitter(self, min_time: float, max_time: float) -> None:
+        """Human-like pause; a jitter scale of 0 skips it entirely for trusted runs."""
+        if self.jitter_scale > 0:
+            time.sleep(random.uniform(min_time, max_time) * self.jitter_scale)
+
+    def type_text(self, element, text: str) -> None:
+        """Type with per-keystroke jitter, or in one call when jitter is disabled."""
+        if self.jitter_scale <= 0:
+            element.send_keys(text)
+            return
+        for char in text:
+            element.send_keys(char)
+            self.jitter(0.1, 0.3)
+
+    def for_element(self, driver, locator, timeout: Optional[float] = None, clickable: bool = False):
+        condition = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+        return WebDriverWait(driver, timeout or self.timeout).until(condition(locator))
+
+    def for_js_condition(self, driver, condition_js: str, timeout: Optional[float] = None) -> bool:
+        """Wait until a JS expression body (e.g. "return !!document.querySelector(...)") is truthy."""
+        return self._async_wait(driver, MUTATION_WAIT_JS, condition_js, timeout)
+
+    def for_response(self, driver, url_patterns: Union[str, List[str]], timeout: Optional[float] = None) -> bool:
+        """Wait until the page has received a response whose URL contains one of `url_patterns`."""
+        patterns = [url_patterns] if isinstance(url_patterns, str) else list(url_patterns)
+        return self._async_wait(driver, RESPONSE_WAIT_JS, patterns, timeout)
+
+    def _async_wait(self, driver, script: str, argument, timeout: Optional[float]) -> bool:
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        try:
+            driver.set_script_timeout(timeout + 5)
+            if driver.execute_async_script(script, argument, int(timeout * 1000)):
+                return True
+        except Exception as e:
+            # A navigation mid-wait discards the script context; fall back to polling for the rest.
+            logger.debug(f"Async wait interrupted: {str(e)}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            WebDriverWait(driver, remaining, poll_frequency=0.25).until(
+                lambda d: d.execute_async_script(script, argument, 0)
+            )
+            return True
+        except Exception:
+            return False
+
+
+_wait_strategy = None
+
+
+def get_wait_strategy() -> WaitStrategy:
+    """Process-wide wait strategy configured from the environment."""
+    global _wait_strategy
+    if _wait_strategy is None:
+        _wait_strategy = WaitStrategy()
+    return _wait_strategy
@@ -0,0 +1,304 @@
+# worker_supervisor.py
+import os
+import time
+import signal
+import threading
+import logging
+import multiprocessing
+from typing import Dict, Any, List, Optional, Tuple
+from scrape_errors import RemoteScrapeError
+
+logger = logging.getLogger(__name__)
+
+READY = "ready"
+OK = "ok"
+ERROR = "error"
+
+
+class WorkerUnavailable(Exception):
+    """Raised when no scrape worker became free within the acquire timeout."""
+
+
+def _worker_main(conn, backend_name: str, pool_options: Dict[str, Any]) -> None:
+    """Entry point of a scrape worker process: owns one driver pool and serves fetch requests."""
+    # Own process group, so the supervisor can kill chromedriver and Chrome along with the worker.
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO,
+                        format=f'%(asctime)s - worker {os.getpid()} - %(levelname)s - %(message)s')
+
+    from driver_pool import DriverPool
+    from proxy_registry import get_proxy_registry
+    from scraper_backend import create_backend
+    from metrics import failure_cause
+
+    pool = DriverPool(size=1, **pool_options)
+    backend = create_backend(pool, backend_name)
+    try:
+        backend.start()
+        conn.send((READY, backend.ready(), pool.last_error))
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            _, url = message
+            try:
+                trends, proxy = backend.fetch_trends(url)
+                conn.send((OK, trends, proxy))
+            except Exception as e:
+                conn.send((ERROR, str(e), failure_cause(e)))
+    except (EOFError, OSError):
+        pass  # supervisor went away
+    finally:
+        backend.close()
+        pool.close()
+        get_proxy_registry().save()
+
+
+class WorkerHandle:
+    """Supervisor-side view of one worker process."""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.started_at = time.monotonic()
+        self.last_used = self.started_at
+        self.ready = False  # started and answering requests
+        self.connected = False  # has a logged-in driver
+        self.busy = False
+        self.tasks = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def kill(self) -> None:
+        """Kill the worker and every browser it started."""
+        try:
+            if hasattr(os, 'killpg') and self.process.pid:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, OSError):
+            pass  # not yet its own group leader, or already gone
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def stop(self, timeout: float = 15) -> None:
+        """Ask the worker to quit its drivers and exit, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+
+class WorkerSupervisor:
+    """Runs scrapes in separate worker processes, each with its own browser and login.
+
+    A hung or crashed worker only fails the scrape it was running: the watchdog
+    kills its whole process group and a replacement is started. Workers are
+    added while every one is busy (up to max_workers) and retired after sitting
+    idle above min_workers. Each worker's driver pool logs in with the given
+    account and pins the given proxy and profile, like an in-process pool would.
+    """
+
+    def __init__(self, min_workers: Optional[int] = None, max_workers: Optional[int] = None,
+                 task_timeout: Optional[float] = None, start_timeout: Optional[float] = None,
+                 idle_timeout: Optional[float] = None, acquire_timeout: Optional[float] = None,
+                 backend: Optional[str] = None, username: Optional[str] = None,
+                 password: Optional[str] = None, proxy: Optional[str] = None,
+                 profile: Optional[str] = None):
+        self.min_workers = min_workers or int(os.getenv('WORKER_MIN', 1))
+        self.max_workers = max(self.min_workers, max_workers or int(os.getenv('WORKER_MAX', min(os.cpu_count() or 1, 4))))
+        self.task_timeout = task_timeout or float(os.getenv('WORKER_TASK_TIMEOUT', 120))
+        self.start_timeout = start_timeout or float(os.getenv('WORKER_START_TIMEOUT', 180))
+        self.idle_timeout = idle_timeout or float(os.getenv('WORKER_IDLE_TIMEOUT', 600))
+        self.acquire_timeout = acquire_timeout or float(os.getenv('WORKER_ACQUIRE_TIMEOUT', 240))
+        self.backend = (backend or os.getenv('WORKER_BACKEND', 'selenium')).lower()
+        self.pool_options = {"username": username, "password": password, "proxy": proxy, "profile": profile}
+        self.restarts = 0
+        self.last_error = None
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._workers: List[WorkerHandle] = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._monitor = None
+        self._local = threading.local()
+
+    def start(self) -> None:
+        with self._cond:
+            while len(self._workers) < self.min_workers:
+                self._spawn()
+        if self._monitor is None:
+            self._monitor = threading.Thread(target=self._watch, name="worker-supervisor", daemon=True)
+            self._monitor.start()
+        logger.info(f"Worker supervisor started {self.min_workers} {self.backend} worker(s)")
+
+    def fetch_trends(self, url: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Run one scrape on a free worker, restarting it if it hangs or dies."""
+        handle = self._lease()
+        self._local.failed = None
+        try:
+            handle.conn.send(("fetch", url))
+            if not handle.conn.poll(self.task_timeout):
+                raise TimeoutError(f"worker {handle.pid} did not answer within {self.task_timeout:.0f}s")
+            # OK carries (trends, proxy); ERROR carries (message, failure cause).
+            status, payload, detail = handle.conn.recv()
+        except (TimeoutError, EOFError, OSError) as e:
+            reason = str(e) or f"worker {handle.pid} exited"
+            self._replace(handle, reason)
+            raise Exception(f"Scrape worker failed: {reason}")
+
+        with self._cond:
+            handle.busy = False
+            handle.last_used = time.monotonic()
+            handle.tasks += 1
+            if status == OK:
+                handle.connected = True  # the worker logged in lazily on this scrape
+            elif detail == 'auth':
+                handle.connected = False
+            self._cond.notify()
+        if status == ERROR:
+            self._local.failed = handle
+            raise RemoteScrapeError(payload, detail or 'other')
+        return payload, detail
+
+    def retire_failed(self) -> None:
+        """Restart the worker behind this thread's last failed scrape, unless it is already serving again."""
+        handle, self._local.failed = getattr(self._local, 'failed', None), None
+        if handle is None:
+            return
+        with self._cond:
+            if handle.busy or handle not in self._workers:
+                return
+            handle.busy = True  # keep it from being leased while it is replaced
+        self._replace(handle, "recycled after a failed scrape")
+
+    def ready_count(self) -> int:
+        """Workers with a logged-in driver; a started worker whose login failed does not count."""
+        with self._cond:
+            return sum(1 for handle in self._workers if handle.ready and handle.connected)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "backend": self.backend,
+                "account": self.pool_options["username"],
+                "proxy": self.pool_options["proxy"],
+                "min": self.min_workers,
+                "max": self.max_workers,
+                "workers": len(self._workers),
+                "ready": sum(1 for h in self._workers if h.ready),
+                "connected": sum(1 for h in self._workers if h.ready and h.connected),
+                "busy": sum(1 for h in self._workers if h.busy),
+                "restarts": self.restarts,
+                "last_error": self.last_error,
+                "pids": [h.pid for h in self._workers],
+            }
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            workers, self._workers = self._workers, []
+            self._cond.notify_all()
+        for handle in workers:
+            handle.stop()
+        if self._monitor is not None:
+            self._monitor.join(5)
+        logger.info("Worker supervisor stopped")
+
+    def _lease(self) -> WorkerHandle:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._stop.is_set():
+                    raise WorkerUnavailable("Worker supervisor is stopped")
+                for handle in self._workers:
+                    if handle.ready and not handle.busy:
+                        handle.busy = True
+                        return handle
+                # Every worker is busy: scale up unless one is already starting.
+                starting = any(not handle.ready for handle in self._workers)
+                if not starting and len(self._workers) < self.max_workers:
+                    self._spawn()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WorkerUnavailable("Timed out waiting for a scrape worker")
+                self._cond.wait(min(remaining, 1.0))
+
+    def _spawn(self) -> WorkerHandle:
+        # Must be called with self._cond held.
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn, self.backend, self.pool_options),
+                                    name="scrape-worker", daemon=True)
+        process.start()
+        child_conn.close()
+        handle = WorkerHandle(process, parent_conn)
+        self._workers.append(handle)
+        logger.info(f"Started scrape worker {handle.pid}")
+        return handle
+
+    def _remove(self, handle: WorkerHandle) -> bool:
+        # Must be called with self._cond held.
+        if handle in self._workers:
+            self._workers.remove(handle)
+            self._cond.notify_all()
+            return True
+        return False
+
+    def _replace(self, handle: WorkerHandle, reason: str) -> None:
+        logger.error(f"Restarting scrape worker {handle.pid}: {reason}")
+        with self._cond:
+            removed = self._remove(handle)
+            if removed:
+                self.restarts += 1
+                self.last_error = reason
+        handle.kill()
+        with self._cond:
+            if not self._stop.is_set() and len(self._workers) < self.min_workers:
+                self._spawn()
+
+    def _watch(self) -> None:
+        """Watchdog: finish worker start-up, replace dead or stuck workers, retire idle ones."""
+        while not self._stop.wait(1.0):
+            now = time.monotonic()
+            failed, retired = [], []
+            with self._cond:
+                for handle in list(self._workers):
+                    if handle.busy:
+                        continue  # the leasing caller enforces the task timeout
+                    if not handle.process.is_alive():
+                        failed.append((handle, f"exited with code {handle.process.exitcode}"))
+                    elif not handle.ready:
+                        try:
+                            if handle.conn.poll(0):
+                                _, connected, error = handle.conn.recv()
+                                # Leasable either way (its pool retries the login on the next
+                                # scrape), but only counted by ready_count() once logged in.
+                                handle.ready = True
+                                handle.connected = bool(connected)
+                                handle.last_used = now
+                                if not connected and error:
+                                    self.last_error = error
+                                self._cond.notify_all()
+                            elif now - handle.started_at > self.start_timeout:
+                                failed.append((handle, f"not ready after {self.start_timeout:.0f}s"))
+                        except (EOFError, OSError) as e:
+                            failed.append((handle, f"start-up failed: {str(e)}"))
+                    elif len(self._workers) > self.min_workers and \
+                            now - handle.last_used > self.idle_timeout:
+                        self._remove(handle)
+                        retired.append(handle)
+
+            for handle, reason in failed:
+                self._replace(handle, reason)
+            for handle in retired:
+                logger.info(f"Retiring idle scrape worker {handle.pid}")
+                handle.stop()
+            with self._cond:
+                while not self._stop.is_set() and len(self._workers) < self.min_workers:
+                    self._spawn()
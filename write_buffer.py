@@ -0,0 +1,177 @@
+# write_buffer.py
+import os
+import time
+import threading
+import logging
+from typing import Callable, Dict, Any, List, Optional
+from bson import json_util
+from pymongo.errors import BulkWriteError
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBehindBuffer:
+    """Buffers records off the scrape path and bulk-inserts them into MongoDB.
+
+    Batches that cannot be written after retrying are appended to a local JSONL
+    spill file, which is replayed once MongoDB accepts writes again. Without a
+    collection (MongoDB was down at start-up), `connect` is retried every
+    `reconnect_interval` seconds until it returns one.
+    """
+
+    def __init__(self, collection, batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 max_retries: Optional[int] = None, spill_path: Optional[str] = None,
+                 connect: Optional[Callable[[], Any]] = None, reconnect_interval: Optional[float] = None):
+        self.collection = collection
+        self.connect = connect
+        self.reconnect_interval = reconnect_interval or float(os.getenv('MONGO_RECONNECT_INTERVAL', 30))
+        self.batch_size = batch_size or int(os.getenv('MONGO_BATCH_SIZE', 50))
+        self.flush_interval = flush_interval or float(os.getenv('MONGO_FLUSH_INTERVAL', 2))
+        self.max_retries = max_retries or int(os.getenv('MONGO_WRITE_RETRIES', 3))
+        self.spill_path = spill_path or os.getenv('MONGO_SPILL_PATH', 'pending_writes.jsonl')
+        self.written = 0
+        self.spilled = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._closed = False
+        self._next_replay = 0.0
+        self._next_connect = 0.0
+        self._thread = threading.Thread(target=self._run, name="mongo-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Queue a record; returns immediately."""
+        with self._cond:
+            if self._closed:
+                raise Exception("Write buffer is closed")
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self) -> None:
+        """Write everything buffered so far from the calling thread."""
+        with self._cond:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+
+    def close(self, timeout: float = 10) -> None:
+        """Stop the writer thread and flush whatever is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        self.flush()
+        logger.info(f"Write buffer closed ({self.written} written, {self.spilled} spilled)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._buffer)
+        return {"pending": pending, "written": self.written, "spilled": self.spilled,
+                "spill_file": os.path.exists(self.spill_path)}
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+                batch, self._buffer = self._buffer, []
+            try:
+                if batch:
+                    self._write(batch)
+                self._replay_spill()
+            except Exception as e:
+                # Keep the writer alive; spilled records are retried on the next pass.
+                logger.error(f"Write buffer error: {str(e)}")
+
+    def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        for attempt in range(self.max_retries):
+            try:
+                with get_metrics().timer('mongo_write', backend='mongodb'):
+                    self._insert(batch)
+                self.written += len(batch)
+                return True
+            except Exception as e:
+                delay = min(0.5 * 2 ** attempt, 10)
+                logger.error(f"Bulk write of {len(batch)} records failed (attempt {attempt + 1}): {str(e)}")
+                if attempt + 1 < self.max_retries:
+                    time.sleep(delay)
+        self._spill(batch)
+        return False
+
+    def _connected(self) -> bool:
+        if self.collection is None and self.connect is not None and time.time() >= self._next_connect:
+            self._next_connect = time.time() + self.reconnect_interval
+            try:
+                self.collection = self.connect()
+            except Exception as e:
+                logger.error(f"MongoDB reconnect failed: {str(e)}")
+            if self.collection is not None:
+                logger.info("Write buffer reconnected to MongoDB")
+        return self.collection is not None
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        if not self._connected():
+            raise Exception("MongoDB is not connected")
+        try:
+            self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Records already present (e.g. a replayed spill) are fine; anything else is not.
+            errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+            if errors or e.details.get("writeConcernErrors"):
+                raise
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    for record in batch:
+                        f.write(json_util.dumps(record) + '\n')
+                self.spilled += len(batch)
+                logger.info(f"Spilled {len(batch)} records to {self.spill_path}")
+            except Exception as e:
+                logger.error(f"Failed to spill records, {len(batch)} lost: {str(e)}")
+
+    def _replay_spill(self) -> None:
+        replay_path = f"{self.spill_path}.replay"
+        if time.time() < self._next_replay or not self._connected():
+            return
+        if not (os.path.exists(self.spill_path) or os.path.exists(replay_path)):
+            return
+        with self._spill_lock:
+            try:
+                # A replay file left by a crash is finished before taking the next spill file.
+                if not os.path.exists(replay_path):
+                    os.replace(self.spill_path, replay_path)
+                with open(replay_path, 'r', encoding='utf-8') as f:
+                    records = [json_util.loads(line) for line in f if line.strip()]
+            except Exception as e:
+                logger.error(f"Failed to read spill file: {str(e)}")
+                return
+
+            try:
+                for i in range(0, len(records), self.batch_size):
+                    self._insert(records[i:i + self.batch_size])
+            except Exception as e:
+                logger.error(f"Spill replay failed, keeping records for later: {str(e)}")
+                self._next_replay = time.time() + 30
+                # Put the unreplayed records back; duplicates of the written ones are ignored on the next replay.
+                try:
+                    with open(self.spill_path, 'a', encoding='utf-8') as f:
+                        for record in records[i:]:
+                            f.write(json_util.dumps(record) + '\n')
+                    os.remove(replay_path)
+                except Exception as write_error:
+                    # The replay file stays and is replayed whole next time.
+                    logger.error(f"Failed to requeue spilled records: {str(write_error)}")
+                return
+
+            os.remove(replay_path)
+            self.written += len(records)
+            logger.info(f"Replayed {len(records)} spilled records into MongoDB")